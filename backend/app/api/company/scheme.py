@@ -3,7 +3,7 @@ from typing import List, Optional
 from backend.app.api.stop.scheme import StopDTO
 from pydantic import BaseModel
 
-from backend.app.schemas.enums import CompanyTypeEnum
+from backend.app.schemas.enums import CompanyTypeEnum, PeriodEnum
 
 
 class StrategiesInputDTO(BaseModel):
@@ -34,3 +34,17 @@ class CompanyModelPatchDTO(CompanyModelInputDTO):
     tiker: Optional[str] = None
     type: Optional[CompanyTypeEnum] = None
     strategies: Optional[List[StrategiesInputDTO]] = []
+
+
+class TAParamsInputDTO(BaseModel):
+    """Параметры TA компании или стратегии, пустые поля - по умолчанию."""
+
+    bottom_border: Optional[float] = None
+    top_border: Optional[float] = None
+    buy_border: Optional[float] = None
+    stoch_k: Optional[int] = None
+    stoch_d: Optional[int] = None
+    stoch_smooth_k: Optional[int] = None
+    adx_length: Optional[int] = None
+    periods: Optional[List[PeriodEnum]] = None
+    indicators: Optional[List[str]] = None
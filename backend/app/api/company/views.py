@@ -7,8 +7,12 @@ from backend.app.api.company.scheme import (
     CompanyModelDTO,
     CompanyModelInputDTO,
     CompanyModelPatchDTO,
+    TAParamsInputDTO,
 )
 from backend.app.auth import CurrentUser, check_owner_or_superuser
+from backend.app.services.ta_service import TAService
+from backend.app.settings import settings
+from backend.app.worker.tasks import ta_rebuild_indicators_task
 from fastapi import APIRouter, Depends
 
 router = APIRouter()
@@ -108,6 +112,26 @@ async def update_company(
     )
 
 
+@router.put("/{company_id}/ta-params")
+async def update_company_ta_params(
+    company_id: int,
+    ta_params: TAParamsInputDTO,
+    current_user: CurrentUser,
+    company_dao: CompanyDAO = Depends(),
+    ta_service: TAService = Depends(),
+) -> None:
+    exist_company = await company_dao.get_company_model(company_id)
+    await check_owner_or_superuser(exist_company.user_id, current_user)
+
+    tikers = await ta_service.save_ta_params(
+        ta_params.model_dump(),
+        company_id=company_id,
+    )
+    # Состояния со старыми длинами окон больше не нужны
+    if tikers and settings.ta_incremental_indicators:
+        ta_rebuild_indicators_task.delay(tikers)
+
+
 @router.delete("/{company_id}", status_code=204)
 async def delete_company(
     company_id: int,
@@ -1,19 +1,47 @@
-import asyncio
 import logging
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 
-from backend.app.db.dao.companies import CompanyDAO
 from backend.app.db.dao.ta_decisions import TADecisionDAO
-from backend.app.schemas.ta import TAMessageResponse, DecisionDTO
+from backend.app.schemas.ta import TAMessageResponse, DecisionDTO, TADecisionChanges
 from backend.app.services.ta_service import TAService
-from backend.app.worker.tasks import start_generate_task
+from backend.app.settings import settings
+from backend.app.worker import codec
+from backend.app.worker.tasks import (
+    start_generate_task,
+    start_users_generate_task,
+    ta_history_cleanup_task,
+)
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
+@router.post("/ta/generate")
+async def internal_start_users_generate_ta_decisions(  # noqa: WPS211
+    user_ids: Optional[List[int]] = Query(None),
+    period: str = "All",
+    send_messages: bool = True,
+    update_db: bool = True,
+    send_test_message: bool = False,
+    ta_service: TAService = Depends(),
+) -> TAMessageResponse:
+    """Расчет TA по всем активным пользователям или по списку user_ids."""
+    message = await ta_service.fill_start_users_generate_message(
+        user_ids=user_ids,
+        period=period,
+        send_messages=send_messages,
+        update_db=update_db,
+        send_test_message=send_test_message,
+    )
+
+    result = start_users_generate_task.delay(codec.dumps(message))
+    logging.debug(f"********* users payload: {result}")
+
+    return TAMessageResponse(id=result.id, status=result.status)
+
+
 @router.post("/ta/{user_id}/generate")
 async def internal_start_generate_ta_decisions(  # noqa: WPS211
     user_id: int,
@@ -31,33 +59,36 @@ async def internal_start_generate_ta_decisions(  # noqa: WPS211
         send_test_message=send_test_message,
     )
 
-    payload_str = str(message.model_dump_json())
-    result = start_generate_task.delay(payload_str)
+    result = start_generate_task.delay(codec.dumps(message))
     logging.debug(f"********* payload: {result}")
 
     return TAMessageResponse(id=result.id, status=result.status)
 
 
+@router.post("/ta/history/cleanup")
+async def internal_cleanup_ta_history() -> TAMessageResponse:
+    """Удаление истории решений старше settings.ta_decision_history_days."""
+    result = ta_history_cleanup_task.delay()
+    return TAMessageResponse(id=result.id, status=result.status)
+
+
+@router.post("/ta/changes")
+async def internal_get_decision_changes(
+    users_decisions: dict[int, List[DecisionDTO]],
+    ta_service: TAService = Depends(),
+) -> dict[int, TADecisionChanges]:
+    """Изменения решений пользователей относительно сохраненных (для воркера)."""
+    return await ta_service.get_decision_changes(users_decisions)
+
+
 @router.post("/ta/{user_id}")
 async def internal_update_db_decisions(
     user_id: int,
     decisions: List[DecisionDTO],
     decisions_dao: TADecisionDAO = Depends(),
-    company_dao: CompanyDAO = Depends(),
 ):
-    tasks = []
-    for decision in decisions:
-        company = await company_dao.get_company_model_by_tiker(
-            tiker=decision.tiker, user_id=user_id
-        )
-        task = decisions_dao.update_or_create_ta_decision_model(
-            company=company,
-            period=decision.period,
-            decision=decision.decision,
-            k=decision.k,
-            d=decision.d,
-            last_price=decision.last_price,
-        )
-        tasks.append(task)
-
-    await asyncio.gather(*tasks)
+    await decisions_dao.bulk_upsert_ta_decisions(
+        user_id=user_id,
+        decisions=decisions,
+        history=settings.ta_decision_history,
+    )
@@ -2,8 +2,12 @@ from typing import List
 
 from backend.app.db.dao.strategies import StrategiesDAO
 from backend.app.db.models.company import StrategyModel
+from backend.app.api.company.scheme import TAParamsInputDTO
 from backend.app.api.strategy.scheme import StrategiesDTO, StrategiesInputDTO
 from backend.app.auth import CurrentUser, check_owner_or_superuser
+from backend.app.services.ta_service import TAService
+from backend.app.settings import settings
+from backend.app.worker.tasks import ta_rebuild_indicators_task
 from fastapi import APIRouter, Depends
 
 router = APIRouter()
@@ -58,6 +62,26 @@ async def update_strategy(
     )
 
 
+@router.put("/{strategy_id}/ta-params")
+async def update_strategy_ta_params(
+    strategy_id: int,
+    ta_params: TAParamsInputDTO,
+    current_user: CurrentUser,
+    dao: StrategiesDAO = Depends(),
+    ta_service: TAService = Depends(),
+) -> None:
+    exist_strategy = await dao.get_strategy_model(strategy_id)
+    await check_owner_or_superuser(exist_strategy.user_id, current_user)
+
+    tikers = await ta_service.save_ta_params(
+        ta_params.model_dump(),
+        strategy_id=strategy_id,
+    )
+    # Состояния со старыми длинами окон больше не нужны
+    if tikers and settings.ta_incremental_indicators:
+        ta_rebuild_indicators_task.delay(tikers)
+
+
 @router.delete("/{strategy_id}", status_code=204)
 async def delete_strategy(
     strategy_id: int,
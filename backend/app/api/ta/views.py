@@ -1,15 +1,22 @@
 import logging
-from typing import List
+from typing import List, Optional
 
 from backend.app.db.dao.ta_decisions import TADecisionDAO
 from backend.app.schemas.ta import DecisionDTO
 from backend.app.schemas.ta import (
     TAMessageResponse,
     TAMessageStatus,
+    TARunStatus,
 )
-from fastapi import APIRouter, Depends
+from backend.app.utils.ta.ta_run import (
+    MAX_WAIT_SECONDS,
+    get_ta_run_reader,
+    get_ta_run_tracker,
+)
+from fastapi import APIRouter, Depends, HTTPException, Query
 
 from backend.app.auth import CurrentUser
+from backend.app.worker import codec
 from backend.app.worker.tasks import start_generate_task
 from backend.app.services.ta_service import TAService
 
@@ -34,7 +41,7 @@ async def run_generate_ts_decisions(
         send_test_message=send_test_message,
     )
 
-    result = start_generate_task.delay(str(message.model_dump_json()))
+    result = start_generate_task.delay(codec.dumps(message))
     return TAMessageResponse(id=result.id, status=result.status)
 
 
@@ -43,12 +50,42 @@ def get_task_status(task_id: str) -> TAMessageStatus:
     task = start_generate_task.AsyncResult(task_id)
     logging.info(f"********* Get task result: {str(task)}")
 
-    response = TAMessageStatus(id=task.id, status=task.status, result=task.result)
+    # Задача запуска завершается сразу, ход самого расчета хранит TARunTracker
+    tracker = get_ta_run_tracker()
+    run = tracker.get_run(task_id) if tracker else None
+    response = TAMessageStatus(
+        id=task.id,
+        status=task.status,
+        result=task.result,
+        progress=run.progress if run else None,
+    )
     logging.info(f"********* Get task message: {str(response)}")
 
     return response
 
 
+@router.get("/runs/{run_id}")
+async def get_run_status(
+    run_id: str,
+    cursor: Optional[str] = None,
+    offset: int = Query(default=0, ge=0),
+    timeout: float = Query(default=25, gt=0, le=MAX_WAIT_SECONDS),
+) -> TARunStatus:
+    """
+    Ход расчета и готовые решения (long-poll).
+
+    Без cursor статус возвращается сразу. С cursor из предыдущего ответа
+    запрос ждет следующего изменения расчета, но не дольше timeout секунд.
+    С offset из предыдущего ответа возвращаются только новые решения.
+    """
+    reader = get_ta_run_reader()
+    run = await reader.wait_run(run_id, cursor, timeout, offset) if reader else None
+    if not run:
+        raise HTTPException(status_code=404, detail="Расчет не найден")
+
+    return run
+
+
 class TADecisionDTO:
     pass
 
@@ -45,4 +45,5 @@ async def create_user(
         password=new_user_object.password,
         is_superuser=new_user_object.is_superuser,
         is_active=new_user_object.is_active,
+        telegram_chat_id=new_user_object.telegram_chat_id,
     )
@@ -0,0 +1,120 @@
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+from backend.app.db.db import get_session
+from backend.app.db.models.ta_decision_history import TADecisionHistoryModel
+from backend.app.schemas.ta import TADecisionHistoryDTO
+from fastapi import Depends
+from sqlalchemy import and_, delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Только поля индекса (company_id, period, date) INCLUDE (...), без id
+HISTORY_COLUMNS = (
+    TADecisionHistoryModel.company_id,
+    TADecisionHistoryModel.period,
+    TADecisionHistoryModel.date,
+    TADecisionHistoryModel.decision,
+    TADecisionHistoryModel.k,
+    TADecisionHistoryModel.d,
+    TADecisionHistoryModel.last_price,
+)
+
+
+class TADecisionHistoryDAO:
+    def __init__(self, session: AsyncSession = Depends(get_session)):
+        self.session = session
+
+    async def add_decisions(self, rows: List[dict], date: datetime) -> int:
+        """Добавляет строки stoch_decisions (company_id, period, decision, ...)."""
+        if not rows:
+            return 0
+
+        await self.session.execute(
+            insert(TADecisionHistoryModel).values(
+                [
+                    {
+                        "company_id": row["company_id"],
+                        "period": row["period"],
+                        "date": date,
+                        "decision": row["decision"],
+                        "k": row["k"],
+                        "d": row["d"],
+                        "last_price": row["last_price"],
+                    }
+                    for row in rows
+                ],
+            ),
+        )
+        return len(rows)
+
+    async def get_history(
+        self,
+        company_ids: Iterable[int],
+        date_from: datetime,
+        date_to: Optional[datetime] = None,
+        period: Optional[str] = None,
+    ) -> List[TADecisionHistoryDTO]:
+        """Решения компаний с date_from до date_to по порядку дат."""
+        query = select(*HISTORY_COLUMNS).where(
+            TADecisionHistoryModel.company_id.in_(set(company_ids)),
+            TADecisionHistoryModel.date >= date_from,
+        )
+        if date_to is not None:
+            query = query.where(TADecisionHistoryModel.date < date_to)
+        if period:
+            query = query.where(TADecisionHistoryModel.period == period)
+        query = query.order_by(
+            TADecisionHistoryModel.company_id,
+            TADecisionHistoryModel.period,
+            TADecisionHistoryModel.date,
+        )
+
+        rows = await self.session.execute(query)
+        return [TADecisionHistoryDTO.model_validate(row._mapping) for row in rows]
+
+    async def get_latest(
+        self,
+        company_ids: Iterable[int],
+        period: Optional[str] = None,
+        before: Optional[datetime] = None,
+    ) -> List[TADecisionHistoryDTO]:
+        """
+        Последнее решение по каждой компании и периоду (до даты before).
+
+        Максимальная дата группы и сами поля берутся из одного индекса.
+        """
+        company_ids = set(company_ids)
+        last = select(
+            TADecisionHistoryModel.company_id,
+            TADecisionHistoryModel.period,
+            func.max(TADecisionHistoryModel.date).label("date"),
+        ).where(TADecisionHistoryModel.company_id.in_(company_ids))
+        if period:
+            last = last.where(TADecisionHistoryModel.period == period)
+        if before is not None:
+            last = last.where(TADecisionHistoryModel.date < before)
+        last = last.group_by(
+            TADecisionHistoryModel.company_id,
+            TADecisionHistoryModel.period,
+        ).subquery()
+
+        query = (
+            select(*HISTORY_COLUMNS)
+            .join(
+                last,
+                and_(
+                    TADecisionHistoryModel.company_id == last.c.company_id,
+                    TADecisionHistoryModel.period == last.c.period,
+                    TADecisionHistoryModel.date == last.c.date,
+                ),
+            )
+            .order_by(TADecisionHistoryModel.company_id, TADecisionHistoryModel.period)
+        )
+        rows = await self.session.execute(query)
+        return [TADecisionHistoryDTO.model_validate(row._mapping) for row in rows]
+
+    async def delete_before(self, date: datetime) -> int:
+        result = await self.session.execute(
+            delete(TADecisionHistoryModel).where(TADecisionHistoryModel.date < date),
+        )
+        return result.rowcount
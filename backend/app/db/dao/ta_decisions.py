@@ -1,12 +1,26 @@
-from typing import List
+import logging
+from datetime import datetime
+from collections import defaultdict
+from typing import Iterable, List, Optional
 
+from backend.app.db.dao.ta_decision_history import TADecisionHistoryDAO
 from backend.app.db.db import get_session
 from backend.app.db.models.company import CompanyModel
 from backend.app.db.models.ta_decision import TADecisionModel
+from backend.app.schemas.enums import DecisionEnum, PeriodEnum
+from backend.app.schemas.ta import DecisionDTO
 from fastapi import Depends, HTTPException
 from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession
 
+logger = logging.getLogger(__name__)
+
+UPSERT_DIALECTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
 
 class TADecisionDAO:
     def __init__(self, session: AsyncSession = Depends(get_session)):
@@ -52,6 +66,42 @@ class TADecisionDAO:
 
         return ta_decisions.scalars().one_or_none()
 
+    async def get_users_decisions(
+        self,
+        user_ids: Iterable[int],
+        tikers: Optional[Iterable[str]] = None,
+    ) -> dict[int, List[DecisionDTO]]:
+        """Сохраненные решения пользователей (по тикерам) одним запросом."""
+        query = (
+            select(
+                CompanyModel.user_id,
+                CompanyModel.tiker,
+                TADecisionModel.period,
+                TADecisionModel.decision,
+                TADecisionModel.k,
+                TADecisionModel.d,
+                TADecisionModel.last_price,
+            )
+            .join(CompanyModel, TADecisionModel.company_id == CompanyModel.id)
+            .where(CompanyModel.user_id.in_(set(user_ids)))
+        )
+        if tikers is not None:
+            query = query.where(CompanyModel.tiker.in_(set(tikers)))
+
+        decisions = defaultdict(list)
+        for row in (await self.session.execute(query)).all():
+            decisions[row.user_id].append(
+                DecisionDTO(
+                    tiker=row.tiker,
+                    period=PeriodEnum(row.period),
+                    decision=DecisionEnum(row.decision),
+                    k=row.k,
+                    d=row.d,
+                    last_price=row.last_price,
+                ),
+            )
+        return dict(decisions)
+
     async def update_or_create_ta_decision_model(  # noqa:WPS211
         self,
         company: CompanyModel,
@@ -83,3 +133,70 @@ class TADecisionDAO:
         exist_decision.last_price = last_price
 
         return exist_decision
+
+    async def bulk_upsert_ta_decisions(
+        self,
+        user_id: int,
+        decisions: List[DecisionDTO],
+        history: bool = False,
+    ) -> int:
+        """
+        Сохраняет решения пачкой.
+
+        Компании ищутся одним запросом по списку тикеров, все решения пишутся
+        одним INSERT ... ON CONFLICT (company_id, period) DO UPDATE.
+        history=True - те же решения добавляются в stoch_decision_history.
+        """
+        if not decisions:
+            return 0
+
+        raw_companies = await self.session.execute(
+            select(CompanyModel.tiker, CompanyModel.id).where(
+                CompanyModel.user_id == user_id,
+                CompanyModel.tiker.in_({dec.tiker for dec in decisions}),
+            ),
+        )
+        company_ids = dict(raw_companies.all())
+
+        now = datetime.utcnow()
+        rows = {}
+        for dec in decisions:
+            company_id = company_ids.get(dec.tiker)
+            if company_id is None:
+                logger.warning(f"Компания {dec.tiker} не найдена, решение пропущено")
+                continue
+
+            # Одна строка на (company_id, period), иначе ON CONFLICT упадет
+            rows[(company_id, dec.period.value)] = {
+                "company_id": company_id,
+                "period": dec.period.value,
+                "decision": dec.decision.value,
+                "k": dec.k,
+                "d": dec.d,
+                "last_price": dec.last_price,
+                "last_updated": now,
+            }
+
+        if not rows:
+            return 0
+
+        insert = UPSERT_DIALECTS[self.session.get_bind().dialect.name]
+        query = insert(TADecisionModel).values(list(rows.values()))
+        query = query.on_conflict_do_update(
+            index_elements=["company_id", "period"],
+            set_={
+                "decision": query.excluded.decision,
+                "k": query.excluded.k,
+                "d": query.excluded.d,
+                "last_price": query.excluded.last_price,
+                "last_updated": query.excluded.last_updated,
+            },
+        )
+        await self.session.execute(query)
+        if history:
+            await TADecisionHistoryDAO(self.session).add_decisions(
+                list(rows.values()),
+                date=now,
+            )
+
+        return len(rows)
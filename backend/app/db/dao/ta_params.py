@@ -0,0 +1,164 @@
+from typing import Iterable, Optional
+
+from backend.app.db.db import get_session
+from backend.app.db.models.company import CompanyModel, CompanyStrategy, TAParamsModel
+from backend.app.schemas.company import TAParamsDTO
+from backend.app.schemas.enums import PeriodEnum
+from backend.app.utils.ta.ta_registry import get_indicator
+from fastapi import Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+from sqlalchemy.ext.asyncio import AsyncSession
+
+PARAM_FIELDS = (
+    "bottom_border",
+    "top_border",
+    "buy_border",
+    "stoch_k",
+    "stoch_d",
+    "stoch_smooth_k",
+    "adx_length",
+    "periods",
+    "indicators",
+)
+LIST_SEPARATOR = ","
+
+
+class TAParamsDAO:
+    def __init__(self, session: AsyncSession = Depends(get_session)):
+        self.session = session
+
+    async def get_companies_params(
+        self,
+        company_ids: Iterable[int],
+    ) -> dict[int, TAParamsDTO]:
+        """
+        Параметры TA компаний одним запросом.
+
+        Параметры компании и всех ее стратегий загружаются одним join,
+        непустые поля компании важнее полей стратегий.
+        """
+        company_params = aliased(TAParamsModel)
+        strategy_params = aliased(TAParamsModel)
+        query = (
+            select(CompanyModel.id, company_params, strategy_params)
+            .outerjoin(company_params, company_params.company_id == CompanyModel.id)
+            .outerjoin(CompanyStrategy, CompanyStrategy.company_id == CompanyModel.id)
+            .outerjoin(
+                strategy_params,
+                strategy_params.strategy_id == CompanyStrategy.strategy_id,
+            )
+            .where(CompanyModel.id.in_(set(company_ids)))
+            .order_by(CompanyModel.id, CompanyStrategy.strategy_id)
+        )
+        rows = await self.session.execute(query)
+
+        layers: dict[int, list[TAParamsModel]] = {}
+        for company_id, company_row, strategy_row in rows:
+            company_layers = layers.setdefault(company_id, [company_row])
+            company_layers.append(strategy_row)
+
+        return {
+            company_id: self._merge_params(company_layers)
+            for company_id, company_layers in layers.items()
+        }
+
+    async def get_params_companies(
+        self,
+        company_id: Optional[int] = None,
+        strategy_id: Optional[int] = None,
+    ) -> dict[int, str]:
+        """Тикеры компаний, на которые действуют параметры компании или стратегии."""
+        query = select(CompanyModel.id, CompanyModel.tiker)
+        if company_id is not None:
+            query = query.where(CompanyModel.id == company_id)
+        else:
+            query = query.join(
+                CompanyStrategy,
+                CompanyStrategy.company_id == CompanyModel.id,
+            ).where(CompanyStrategy.strategy_id == strategy_id)
+        rows = await self.session.execute(query)
+        return dict(rows.all())
+
+    async def save_params(
+        self,
+        params: dict,
+        company_id: Optional[int] = None,
+        strategy_id: Optional[int] = None,
+    ) -> TAParamsModel:
+        """Создает или заменяет параметры компании или стратегии."""
+        if (company_id is None) == (strategy_id is None):
+            raise HTTPException(
+                status_code=400,
+                detail="Параметры задаются либо для компании, либо для стратегии",
+            )
+
+        values = self._get_values(params)
+        model = await self._get_model(company_id, strategy_id)
+        for name, value in values.items():
+            setattr(model, name, value)
+
+        self.session.add(model)
+        return model
+
+    async def _get_model(
+        self,
+        company_id: Optional[int],
+        strategy_id: Optional[int],
+    ) -> TAParamsModel:
+        raw_params = await self.session.execute(
+            select(TAParamsModel).where(
+                (
+                    TAParamsModel.company_id == company_id
+                    if company_id is not None
+                    else TAParamsModel.strategy_id == strategy_id
+                ),
+            ),
+        )
+        return raw_params.scalars().one_or_none() or TAParamsModel(
+            company_id=company_id,
+            strategy_id=strategy_id,
+        )
+
+    @staticmethod
+    def _get_values(params: dict) -> dict:
+        """Значения колонок: списки периодов и индикаторов - строки через запятую."""
+        values = {name: params.get(name) for name in PARAM_FIELDS}
+        if values["periods"] is not None:
+            values["periods"] = LIST_SEPARATOR.join(
+                PeriodEnum(period).value for period in values["periods"]
+            )
+        if values["indicators"] is not None:
+            try:
+                indicators = [get_indicator(name).name for name in values["indicators"]]
+            except ValueError as ex:
+                raise HTTPException(status_code=400, detail=str(ex))
+            values["indicators"] = LIST_SEPARATOR.join(indicators)
+        return values
+
+    @staticmethod
+    def _merge_params(layers: list[Optional[TAParamsModel]]) -> TAParamsDTO:
+        fields = {}
+        for name in PARAM_FIELDS:
+            value = next(
+                (
+                    getattr(layer, name)
+                    for layer in layers
+                    if layer is not None and getattr(layer, name) is not None
+                ),
+                None,
+            )
+            if value is not None:
+                fields[name] = value
+
+        if "periods" in fields:
+            fields["periods"] = [
+                PeriodEnum(period)
+                for period in fields["periods"].split(LIST_SEPARATOR)
+                if period
+            ]
+        if "indicators" in fields:
+            fields["indicators"] = [
+                name for name in fields["indicators"].split(LIST_SEPARATOR) if name
+            ]
+        return TAParamsDTO(**fields)
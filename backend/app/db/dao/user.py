@@ -19,6 +19,7 @@ class UserDAO:
         password: str,
         is_superuser: bool = False,
         is_active: bool = True,
+        telegram_chat_id: Optional[str] = None,
     ) -> UserModel:
         user = UserModel(
             name=name,
@@ -26,6 +27,7 @@ class UserDAO:
             hashed_password=get_password_hash(password),
             is_superuser=is_superuser,
             is_active=is_active,
+            telegram_chat_id=telegram_chat_id,
         )
 
         self.session.add(user)
@@ -38,6 +40,20 @@ class UserDAO:
 
         return list(raw_users.scalars().fetchall())
 
+    async def get_active_users(
+        self,
+        user_ids: Optional[List[int]] = None,
+    ) -> List[UserModel]:
+        query = (
+            select(UserModel)
+            .where(UserModel.is_active.is_(True))
+            .order_by(UserModel.id)
+        )
+        if user_ids:
+            query = query.where(UserModel.id.in_(user_ids))
+        rows = await self.session.execute(query)
+        return list(rows.scalars().fetchall())
+
     async def get_user(self, user_id: int) -> UserModel:
         return await self.session.get(UserModel, user_id)
 
@@ -0,0 +1,35 @@
+"""user telegram_chat_id
+
+Revision ID: 3e7c5a1f9b2d
+Revises: 9b1f6a2c7d3e
+Create Date: 2026-10-18 16:40:12.318274
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlmodel
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3e7c5a1f9b2d"
+down_revision: Union[str, None] = "9b1f6a2c7d3e"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "user",
+        sa.Column(
+            "telegram_chat_id",
+            sqlmodel.sql.sqltypes.AutoString(),
+            nullable=True,
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("user", "telegram_chat_id")
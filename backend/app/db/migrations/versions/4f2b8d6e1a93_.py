@@ -0,0 +1,56 @@
+"""ta_params
+
+Revision ID: 4f2b8d6e1a93
+Revises: 7a4d2e8c1f60
+Create Date: 2026-10-18 21:12:37.540118
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlmodel
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "4f2b8d6e1a93"
+down_revision: Union[str, None] = "7a4d2e8c1f60"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ta_params",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("company_id", sa.Integer(), nullable=True),
+        sa.Column("strategy_id", sa.Integer(), nullable=True),
+        sa.Column("bottom_border", sa.Float(), nullable=True),
+        sa.Column("top_border", sa.Float(), nullable=True),
+        sa.Column("buy_border", sa.Float(), nullable=True),
+        sa.Column("stoch_k", sa.Integer(), nullable=True),
+        sa.Column("stoch_d", sa.Integer(), nullable=True),
+        sa.Column("stoch_smooth_k", sa.Integer(), nullable=True),
+        sa.Column("adx_length", sa.Integer(), nullable=True),
+        sa.Column("periods", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.ForeignKeyConstraint(["company_id"], ["companies.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(
+            ["strategy_id"],
+            ["strategies.id"],
+            ondelete="CASCADE",
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("company_id"),
+        sa.UniqueConstraint("strategy_id"),
+    )
+
+    # Граница покупки 40 для LKOH была задана в коде
+    op.execute(
+        "INSERT INTO ta_params (company_id, bottom_border) "
+        "SELECT id, 40 FROM companies WHERE tiker = 'LKOH'",
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("ta_params")
@@ -0,0 +1,31 @@
+"""ta_params indicators
+
+Revision ID: 6d3c9e2b5f17
+Revises: 4f2b8d6e1a93
+Create Date: 2026-10-18 22:41:05.118204
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlmodel
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "6d3c9e2b5f17"
+down_revision: Union[str, None] = "4f2b8d6e1a93"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "ta_params",
+        sa.Column("indicators", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("ta_params", "indicators")
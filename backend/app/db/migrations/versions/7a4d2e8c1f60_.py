@@ -0,0 +1,63 @@
+"""stoch_decision_history
+
+Revision ID: 7a4d2e8c1f60
+Revises: 3e7c5a1f9b2d
+Create Date: 2026-10-18 18:05:44.907131
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlmodel
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "7a4d2e8c1f60"
+down_revision: Union[str, None] = "3e7c5a1f9b2d"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "stoch_decision_history",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("company_id", sa.Integer(), nullable=False),
+        sa.Column("period", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("date", sa.DateTime(), nullable=False),
+        sa.Column("decision", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("k", sa.Float(), nullable=True),
+        sa.Column("d", sa.Float(), nullable=True),
+        sa.Column("last_price", sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["company_id"],
+            ["companies.id"],
+            ondelete="CASCADE",
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_stoch_decision_history_company_id_period_date",
+        "stoch_decision_history",
+        ["company_id", "period", "date"],
+        postgresql_include=["decision", "last_price", "k", "d"],
+    )
+    op.create_index(
+        "ix_stoch_decision_history_date",
+        "stoch_decision_history",
+        ["date"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_stoch_decision_history_date",
+        table_name="stoch_decision_history",
+    )
+    op.drop_index(
+        "ix_stoch_decision_history_company_id_period_date",
+        table_name="stoch_decision_history",
+    )
+    op.drop_table("stoch_decision_history")
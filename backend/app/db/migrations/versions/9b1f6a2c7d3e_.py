@@ -0,0 +1,36 @@
+"""unique stoch_decisions (company_id, period)
+
+Revision ID: 9b1f6a2c7d3e
+Revises: 4548b2e865f0
+Create Date: 2026-10-18 10:12:31.482913
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9b1f6a2c7d3e"
+down_revision: Union[str, None] = "4548b2e865f0"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Оставляем только последнее решение для каждой пары (company_id, period)
+    op.execute(
+        "DELETE FROM stoch_decisions WHERE id NOT IN "
+        "(SELECT MAX(id) FROM stoch_decisions GROUP BY company_id, period)"
+    )
+    op.create_index(
+        "ix_stoch_decisions_company_id_period",
+        "stoch_decisions",
+        ["company_id", "period"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_stoch_decisions_company_id_period", table_name="stoch_decisions")
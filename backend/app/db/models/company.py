@@ -57,3 +57,40 @@ class StrategyModel(SQLModel, table=True):
 
     user_id: int | None = Field(foreign_key="user.id", index=True)
     user: UserModel | None = Relationship()
+
+
+class TAParamsModel(SQLModel, table=True):
+    """
+    Параметры TA компании или стратегии.
+
+    Пустое поле - значение по умолчанию (TAParamsDTO). Поля компании важнее
+    полей ее стратегий, стратегии учитываются по возрастанию id.
+    """
+
+    __tablename__ = "ta_params"
+
+    id: int = Field(primary_key=True, default=None)
+    company_id: int | None = Field(
+        default=None,
+        foreign_key="companies.id",
+        unique=True,
+        ondelete="CASCADE",
+    )
+    strategy_id: int | None = Field(
+        default=None,
+        foreign_key="strategies.id",
+        unique=True,
+        ondelete="CASCADE",
+    )
+
+    bottom_border: float | None = Field(default=None, nullable=True)
+    top_border: float | None = Field(default=None, nullable=True)
+    buy_border: float | None = Field(default=None, nullable=True)
+    stoch_k: int | None = Field(default=None, nullable=True)
+    stoch_d: int | None = Field(default=None, nullable=True)
+    stoch_smooth_k: int | None = Field(default=None, nullable=True)
+    adx_length: int | None = Field(default=None, nullable=True)
+    # Включенные таймфреймы через запятую, например "M,W,D"
+    periods: str | None = Field(default=None, nullable=True)
+    # Индикаторы снимков через запятую, например "adx,macd"
+    indicators: str | None = Field(default=None, nullable=True)
@@ -1,5 +1,6 @@
 from datetime import datetime
 
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field, Relationship
 
 from backend.app.db.models.company import CompanyModel
@@ -7,6 +8,14 @@ from backend.app.db.models.company import CompanyModel
 
 class TADecisionModel(SQLModel, table=True):
     __tablename__ = "stoch_decisions"
+    __table_args__ = (
+        Index(
+            "ix_stoch_decisions_company_id_period",
+            "company_id",
+            "period",
+            unique=True,
+        ),
+    )
 
     id: int = Field(primary_key=True, default=None)
     period: str = Field(nullable=False, index=True)
@@ -0,0 +1,46 @@
+from datetime import datetime
+
+from sqlalchemy import Index
+from sqlmodel import SQLModel, Field
+
+# Поля, которые отдает запрос последних решений без обращения к таблице
+HISTORY_INCLUDE = ["decision", "last_price", "k", "d"]
+
+
+class TADecisionHistoryModel(SQLModel, table=True):
+    """
+    История решений TA, строки только добавляются.
+
+    stoch_decisions хранит последнее решение и нужна расчетам и API, история
+    нужна для анализа сигналов за долгий период и не нагружает ее запросами.
+    Старые строки удаляются по settings.ta_decision_history_days.
+    """
+
+    __tablename__ = "stoch_decision_history"
+    __table_args__ = (
+        # Выборки по компании и периоду за диапазон дат и последнее решение;
+        # INCLUDE (Postgres) позволяет отвечать только по индексу
+        Index(
+            "ix_stoch_decision_history_company_id_period_date",
+            "company_id",
+            "period",
+            "date",
+            postgresql_include=HISTORY_INCLUDE,
+        ),
+        # Удаление старых строк
+        Index("ix_stoch_decision_history_date", "date"),
+    )
+
+    id: int = Field(primary_key=True, default=None)
+    # История удаленной компании не нужна и не должна мешать удалению
+    company_id: int = Field(
+        foreign_key="companies.id",
+        nullable=False,
+        ondelete="CASCADE",
+    )
+    period: str = Field(nullable=False)
+    date: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    decision: str = Field(nullable=False)
+    k: float = Field(nullable=True)  # noqa: WPS111
+    d: float = Field(nullable=True)  # noqa: WPS111
+    last_price: float = Field(nullable=True)
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from sqlmodel import SQLModel, Field
 
 
@@ -10,3 +12,5 @@ class UserModel(SQLModel, table=True):
     hashed_password: str = Field(nullable=False)
     is_active: bool = Field(default=True)
     is_superuser: bool = Field(default=False)
+    # Чат для сообщений TA пользователя, без него - общий settings.chat_id
+    telegram_chat_id: Optional[str] = Field(default=None)
@@ -1,16 +1,79 @@
-from pydantic import BaseModel
+from typing import Optional
+
+from pydantic import BaseModel, Field
 
 from backend.app.schemas.enums import PeriodEnum, CompanyTypeEnum
 
+ALL_PERIODS = [
+    PeriodEnum.MONTH,
+    PeriodEnum.WEEK,
+    PeriodEnum.DAY,
+    PeriodEnum.HOUR4,
+    PeriodEnum.HOUR,
+]
+# Индикаторы снимков помимо нужных правилам (имена из ta_registry)
+DEFAULT_INDICATORS = ["adx"]
+LENGTHS_KEY_FORMAT = "k{stoch_k}d{stoch_d}s{stoch_smooth_k}a{adx_length}"
+
 
 class CompanyStopDTO(BaseModel):
     period: PeriodEnum
     value: float
 
 
+class TAParamsDTO(BaseModel):
+    """Параметры TA компании, по умолчанию - как в расчете без настроек."""
+
+    bottom_border: float = 25
+    top_border: float = 80
+    # Граница покупки по свече периода в W/D/1h, None - 40 для W, 25 для D и 1h
+    buy_border: Optional[float] = None
+    stoch_k: int = 14
+    stoch_d: int = 3
+    stoch_smooth_k: int = 3
+    adx_length: int = 14
+    periods: list[PeriodEnum] = Field(default_factory=lambda: list(ALL_PERIODS))
+    indicators: list[str] = Field(default_factory=lambda: list(DEFAULT_INDICATORS))
+
+    @property
+    def indicator_lengths(self) -> dict[str, int]:
+        """Длины окон индикаторов, от которых зависят снимки."""
+        return {
+            "stoch_k": self.stoch_k,
+            "stoch_d": self.stoch_d,
+            "stoch_smooth_k": self.stoch_smooth_k,
+            "adx_length": self.adx_length,
+        }
+
+    @property
+    def lengths_key(self) -> str:
+        """Суффикс ключа состояний индикаторов, пустой для длин по умолчанию."""
+        if self.indicator_lengths == TAParamsDTO().indicator_lengths:
+            return ""
+        return LENGTHS_KEY_FORMAT.format(**self.indicator_lengths)
+
+    @property
+    def indicators_key(self) -> str:
+        """Суффикс ключа снимков, пустой для длин окон и индикаторов по умолчанию."""
+        if sorted(set(self.indicators)) == sorted(DEFAULT_INDICATORS):
+            return self.lengths_key
+        lengths_key = LENGTHS_KEY_FORMAT.format(**self.indicator_lengths)
+        return f"{lengths_key}_{'-'.join(sorted(set(self.indicators)))}"
+
+
 class CompanyDTO(BaseModel):
     name: str
     tiker: str
     type: str = CompanyTypeEnum.MOEX
     has_shares: bool = False
     stops: list[CompanyStopDTO] | None = None
+    ta_params: TAParamsDTO = Field(default_factory=TAParamsDTO)
+
+    @property
+    def snapshot_key(self) -> str:
+        """Ключ снимков индикаторов: тикер и длины окон, если они не по умолчанию."""
+        return get_snapshot_key(self.tiker, self.ta_params.indicators_key)
+
+
+def get_snapshot_key(tiker: str, indicators_key: str = "") -> str:
+    return f"{tiker}:{indicators_key}" if indicators_key else tiker
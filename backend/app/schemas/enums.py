@@ -12,9 +12,17 @@ class PeriodEnum(str, Enum):  # noqa: WPS600
     DAY = "D"
     WEEK = "W"
     MONTH = "M"
-    ALL = "All"
+    HOUR = "1h"
+    HOUR4 = "4h"
+    ALL = "All"  # M, W и D, без внутридневных таймфреймов
 
 
 class CompanyTypeEnum(str, Enum):  # noqa: WPS600
     MOEX = "MOEX"
     YAHOO = "YAHOO"
+
+
+class TAGenerateStageEnum(str, Enum):  # noqa: WPS600
+    INDICATORS = "INDICATORS"
+    DECISIONS = "DECISIONS"
+    DONE = "DONE"
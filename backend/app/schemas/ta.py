@@ -1,9 +1,10 @@
+import datetime
 from typing import Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
-from backend.app.schemas.company import CompanyDTO
-from backend.app.schemas.enums import PeriodEnum, DecisionEnum
+from backend.app.schemas.company import CompanyDTO, get_snapshot_key
+from backend.app.schemas.enums import PeriodEnum, DecisionEnum, TAGenerateStageEnum
 
 
 class DecisionDTO(BaseModel):
@@ -17,18 +18,84 @@ class DecisionDTO(BaseModel):
     # d_previous: Optional[float] = None
 
 
+class IndicatorSnapshot(BaseModel):
+    """Индикаторы компании на последней свече таймфрейма (без данных пользователя)."""
+
+    tiker: str
+    period: PeriodEnum
+    date: Optional[datetime.date] = None  # последняя дневная свеча, None - нет истории
+    last_price: Optional[float] = None
+    computed: bool = False  # индикаторы рассчитаны: свечей достаточно
+    k: Optional[float] = None  # noqa: WPS111
+    d: Optional[float] = None  # noqa: WPS111
+    adx: Optional[float] = None
+    dmp: Optional[float] = None
+    dmn: Optional[float] = None
+    # Колонки дополнительных индикаторов компании (macd, rsi, ...)
+    values: dict[str, Optional[float]] = Field(default_factory=dict)
+    indicators_key: str = ""  # длины окон и индикаторы, если они не по умолчанию
+
+    @property
+    def snapshot_key(self) -> str:
+        return get_snapshot_key(self.tiker, self.indicators_key)
+
+
 class TAStartGenerateMessage(BaseModel):
     user_id: int
     period: PeriodEnum
     update_db: bool = False
     send_message: bool = False
     send_test_message: bool = False
+    chat_id: Optional[str] = None  # чат пользователя для сообщений
     companies: list[CompanyDTO]
 
 
-class TAGenerateMessage(BaseModel):
+class TAStartUsersGenerateMessage(BaseModel):
+    """Расчет TA для нескольких пользователей одной задачей."""
+
     period: PeriodEnum
-    company: CompanyDTO
+    messages: list[TAStartGenerateMessage]
+
+
+class TAUsersChunkMessage(BaseModel):
+    """Пачка тикеров и компании пользователей из этой пачки."""
+
+    period: PeriodEnum
+    companies: list[CompanyDTO]  # уникальные тикеры без данных пользователей
+    users: list[TAStartGenerateMessage]
+
+
+class TAGenerateProgress(BaseModel):
+    stage: TAGenerateStageEnum
+    users: int
+    tikers: int
+    chunks: int = 0
+    processed_chunks: int = 0
+    processed_tikers: int = 0
+    failed_tikers: int = 0  # тикеры без индикаторов: нет истории или ошибка
+    processed_users: int = 0
+    failed_users: int = 0
+    decisions: int = 0
+    unchanged_decisions: int = 0  # совпали с сохраненными, не отправлены
+    started_at: Optional[datetime.datetime] = None
+    finished_at: Optional[datetime.datetime] = None
+    indicators_seconds: float = 0.0  # суммарное время задач первого этапа
+    decisions_seconds: float = 0.0
+
+
+class TARunStatus(BaseModel):
+    """Ход расчета и решения пользователей, готовые после offset запроса."""
+
+    id: str
+    cursor: Optional[str] = None  # id последнего события для следующего запроса
+    offset: int = 0  # число прочитанных записей решений для следующего запроса
+    progress: Optional[TAGenerateProgress] = None
+    decisions: dict[int, list[DecisionDTO]] = {}
+
+
+class TAGenerateChunkMessage(BaseModel):
+    period: PeriodEnum
+    companies: list[CompanyDTO]
 
 
 class TAFinalMessage(BaseModel):
@@ -36,6 +103,36 @@ class TAFinalMessage(BaseModel):
     send_message: bool
     update_db: bool
     send_test_message: bool
+    chat_id: Optional[str] = None
+
+
+class TADecisionHistoryDTO(BaseModel):
+    """Решение из истории stoch_decision_history."""
+
+    company_id: int
+    period: PeriodEnum
+    date: datetime.datetime
+    decision: DecisionEnum
+    k: Optional[float] = None  # noqa: WPS111
+    d: Optional[float] = None  # noqa: WPS111
+    last_price: Optional[float] = None
+
+
+class TADecisionChanges(BaseModel):
+    """Решения пользователя, изменившиеся с прошлого расчета."""
+
+    changed: list[DecisionDTO] = []
+    unchanged: int = 0
+    transitions: dict[str, int] = {}  # "RELAX->BUY": число решений
+
+
+class TADigest(BaseModel):
+    """Сообщения пользователя за расчет и отпечаток решений в них."""
+
+    user_id: int
+    chat_id: str
+    messages: list[str]
+    fingerprint: str = ""  # пустой - отправляется всегда (тестовая отправка)
 
 
 class TAMessageResponse(BaseModel):
@@ -47,3 +144,4 @@ class TAMessageStatus(TAMessageResponse):
     id: str
     status: str
     result: Optional[str] = None
+    progress: Optional[TAGenerateProgress] = None
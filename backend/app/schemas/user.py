@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import BaseModel, ConfigDict
 
 
@@ -13,6 +15,7 @@ class UserModelDTO(BaseModel):
     email: str
     is_superuser: bool
     is_active: bool
+    telegram_chat_id: Optional[str] = None
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -25,3 +28,4 @@ class UserModelInputDTO(BaseModel):
     is_superuser: bool
     is_active: bool
     password: str
+    telegram_chat_id: Optional[str] = None
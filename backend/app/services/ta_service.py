@@ -1,29 +1,54 @@
+import hashlib
 import logging
-from collections import defaultdict
-from typing import List
+from collections import Counter, defaultdict
+from typing import List, Optional
 
-from fastapi import Depends
+from fastapi import Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from backend.app.schemas.company import CompanyDTO, CompanyStopDTO
-from backend.app.schemas.ta import DecisionDTO, TAStartGenerateMessage
+from backend.app.schemas.company import CompanyDTO, CompanyStopDTO, TAParamsDTO
+from backend.app.schemas.ta import (
+    DecisionDTO,
+    IndicatorSnapshot,
+    TADecisionChanges,
+    TADigest,
+    TAFinalMessage,
+    TAStartGenerateMessage,
+    TAStartUsersGenerateMessage,
+)
+from backend.app.utils.ta.ta_cache import get_ta_cache
 from backend.app.utils.ta.ta_calculator import TACalculator
+from backend.app.utils.ta.ta_panel import REQUIRED_PERIODS
 from backend.app.schemas.enums import DecisionEnum, CompanyTypeEnum, PeriodEnum
-from backend.app.utils.telegram.telegramm_client import send_sync_tg_message
+from backend.app.settings import settings
+from backend.app.utils.telegram.telegramm_client import (
+    pack_messages,
+    send_sync_tg_message,
+)
 from backend.app.db.dao.companies import CompanyDAO
 from backend.app.db.db import get_session
 from backend.app.db.dao.briefcases import BriefcaseDAO
 from backend.app.db.dao.user import UserDAO
+from backend.app.db.dao.ta_decisions import TADecisionDAO
+from backend.app.db.dao.ta_params import TAParamsDAO
 
 logger = logging.getLogger(__name__)
 
-PERIOD_NAMES = {"M": "месяц", "D": "день", "W": "неделя"}
+PERIOD_NAMES = {
+    "M": "месяц",
+    "D": "день",
+    "W": "неделя",
+    "4h": "4 часа",
+    "1h": "час",
+}
 DECISION_NAMES = {
     "SELL": "продавать",
     "BUY": "покупать",
     "RELAX": "ничего не делать",
     "UNKNOWN": "неизвестный статус",
 }
+# Решения, о которых отправляются сообщения (кроме тестовой отправки)
+MESSAGE_DECISIONS = {DecisionEnum.BUY, DecisionEnum.SELL}
 
 
 class TAService:
@@ -52,6 +77,9 @@ class TAService:
         briefcase = await briefcase_dao.get_briefcase_model_by_user(user)
         shares = await briefcase_dao.get_all_briefcase_shares(briefcase.id)
         shared_dict = {sh.company_id: True for sh in shares}
+        ta_params = await TAParamsDAO(session=self.session).get_companies_params(
+            company.id for company in companies
+        )
 
         companies_dto = [
             CompanyDTO(
@@ -66,6 +94,7 @@ class TAService:
                     )
                     for stop in company.stops
                 ],
+                ta_params=ta_params.get(company.id, TAParamsDTO()),
             )
             for company in companies
         ]
@@ -77,18 +106,235 @@ class TAService:
             update_db=update_db,
             send_message=send_messages,
             send_test_message=send_test_message,
+            chat_id=user.telegram_chat_id,
         )
         logging.debug(f"********* TAStartGenerateMessage: {message}")
         return message
 
-    def generate_ta_decision(
+    async def fill_start_users_generate_message(
         self,
-        company: CompanyDTO,
+        user_ids: list[int] | None,
         period: str,
-    ) -> dict[str, DecisionDTO]:
-        ta_calculator = TACalculator()
-        decisions = ta_calculator.get_company_ta_decisions(company, period)
+        send_messages: bool,
+        update_db: bool,
+        send_test_message: bool,
+    ) -> TAStartUsersGenerateMessage:
+        """
+        Сообщение для расчета TA по всем активным пользователям (или по user_ids).
+
+        Пользователи без портфеля пропускаются.
+        """
+        users = await UserDAO(session=self.session).get_active_users(user_ids)
+
+        messages = []
+        for user in users:
+            try:
+                message = await self.fill_send_start_generate_message(
+                    user_id=user.id,
+                    period=period,
+                    send_messages=send_messages,
+                    update_db=update_db,
+                    send_test_message=send_test_message,
+                )
+            except HTTPException as exception:
+                logger.warning(
+                    f"Skip TA generation for user {user.id}: '{exception.detail}'",
+                )
+                continue
+            messages.append(message)
+
+        return TAStartUsersGenerateMessage(
+            period=PeriodEnum(period),
+            messages=messages,
+        )
+
+    async def save_ta_params(
+        self,
+        params: dict,
+        company_id: Optional[int] = None,
+        strategy_id: Optional[int] = None,
+    ) -> list[str]:
+        """
+        Сохраняет параметры TA компании или стратегии.
+
+        Возвращает тикеры компаний, у которых изменились длины окон
+        индикаторов: их состояния инкрементальных индикаторов устарели.
+        """
+        params_dao = TAParamsDAO(session=self.session)
+        tikers = await params_dao.get_params_companies(company_id, strategy_id)
+        previous = await params_dao.get_companies_params(tikers)
+        await params_dao.save_params(
+            params,
+            company_id=company_id,
+            strategy_id=strategy_id,
+        )
+        current = await params_dao.get_companies_params(tikers)
+        return sorted(
+            {
+                tiker
+                for tiker_id, tiker in tikers.items()
+                if previous[tiker_id].indicator_lengths
+                != current[tiker_id].indicator_lengths
+            },
+        )
+
+    async def save_ta_decisions(
+        self,
+        user_id: int,
+        decisions: list[DecisionDTO],
+    ) -> int:
+        decisions_dao = TADecisionDAO(session=self.session)
+        return await decisions_dao.bulk_upsert_ta_decisions(
+            user_id=user_id,
+            decisions=decisions,
+            history=settings.ta_decision_history,
+        )
+
+    async def get_decision_changes(
+        self,
+        users_decisions: dict[int, list[DecisionDTO]],
+    ) -> dict[int, TADecisionChanges]:
+        """Сравнение решений пользователей с сохраненными, одним запросом к БД."""
+        previous = await TADecisionDAO(session=self.session).get_users_decisions(
+            user_ids=users_decisions.keys(),
+            tikers={
+                dec.tiker for decisions in users_decisions.values() for dec in decisions
+            },
+        )
+        return {
+            user_id: self.diff_decisions(previous.get(user_id, []), decisions)
+            for user_id, decisions in users_decisions.items()
+        }
+
+    @staticmethod
+    def diff_decisions(
+        previous: list[DecisionDTO],
+        decisions: list[DecisionDTO],
+    ) -> TADecisionChanges:
+        """Изменившиеся решения: другое решение или первое по тикеру и периоду."""
+        saved = {(dec.tiker, dec.period): dec.decision for dec in previous}
+        changes = TADecisionChanges()
+        transitions = Counter()
+        for dec in decisions:
+            saved_decision = saved.get((dec.tiker, dec.period))
+            if saved_decision == dec.decision:
+                changes.unchanged += 1
+                continue
+            changes.changed.append(dec)
+            saved_name = saved_decision.value if saved_decision else "NONE"
+            transitions[f"{saved_name}->{dec.decision.value}"] += 1
+        changes.transitions = dict(transitions)
+        return changes
+
+    def get_indicator_snapshots(
+        self,
+        companies: list[CompanyDTO],
+        period: str,
+        ta_calculator: TACalculator | None = None,
+    ) -> dict[str, dict[str, IndicatorSnapshot]]:
+        """
+        Индикаторы компаний, общие для всех пользователей (первый этап расчета).
+
+        Ключ результата - CompanyDTO.snapshot_key, каждый ключ считается один
+        раз. Снимки MOEX-компаний берутся из общего кэша, по остальным
+        загружается история, рассчитанные снимки MOEX сохраняются в кэш для
+        других задач. Компании, историю которых загрузить не удалось,
+        в результат не попадают.
+        """
+        ta_calculator = ta_calculator or TACalculator()
+        periods = REQUIRED_PERIODS[period]
+        unique_companies = list(
+            {company.snapshot_key: company for company in companies}.values()
+        )
+        moex_keys = [
+            company.snapshot_key
+            for company in unique_companies
+            if company.type == CompanyTypeEnum.MOEX
+        ]
+        cache = get_ta_cache()
+        snapshots = cache.get_snapshots(moex_keys, periods) if cache else {}
 
+        missing = [
+            company
+            for company in unique_companies
+            if company.snapshot_key not in snapshots
+        ]
+        if not missing:
+            return snapshots
+
+        logger.debug(f"TA snapshots: {len(snapshots)} cached, {len(missing)} missing")
+        calculated = self._calculate_snapshots(missing, period, ta_calculator)
+        if cache:
+            cache.save_snapshots(
+                {key: calculated[key] for key in moex_keys if key in calculated},
+            )
+        snapshots.update(calculated)
+        return snapshots
+
+    def apply_user_decisions(
+        self,
+        companies: list[CompanyDTO],
+        period: str,
+        snapshots: dict[str, dict[str, IndicatorSnapshot]],
+        ta_calculator: TACalculator | None = None,
+    ) -> list[DecisionDTO]:
+        """
+        Решения пользователя по снимкам индикаторов (второй этап расчета).
+
+        Применяет стопы, границы и портфель пользователя, компании без снимка
+        получают UNKNOWN.
+        """
+        ta_calculator = ta_calculator or TACalculator()
+        decisions = ta_calculator.get_snapshot_ta_decisions(
+            companies,
+            period,
+            snapshots,
+        )
+
+        results = []
+        for company in companies:
+            company_decisions = self._filter_sell_decisions(
+                company,
+                decisions[company.tiker],
+            )
+            results.extend(company_decisions.values())
+        return results
+
+    def _calculate_snapshots(
+        self,
+        companies: list[CompanyDTO],
+        period: str,
+        ta_calculator: TACalculator,
+    ) -> dict[str, dict[str, IndicatorSnapshot]]:
+        """Снимки по загруженной истории: MOEX пачкой, остальные по одной."""
+        histories = ta_calculator.get_histories_data(
+            list({company.tiker: company for company in companies}.values()),
+            period=period,
+        )
+        for company in companies:
+            if company.type == CompanyTypeEnum.MOEX or company.tiker in histories:
+                continue
+            try:
+                histories[company.tiker] = ta_calculator.get_history_data(
+                    company,
+                    period=period,
+                )
+            except Exception as exception:
+                logger.error(
+                    f"Failed to load history for {company.tiker}: '{exception}'"
+                )
+
+        return ta_calculator.get_indicator_snapshots(
+            histories,
+            REQUIRED_PERIODS[period],
+            companies,
+        )
+
+    def _filter_sell_decisions(
+        self,
+        company: CompanyDTO,
+        decisions: dict[str, DecisionDTO],
+    ) -> dict[str, DecisionDTO]:
         for key in decisions:
             if not company.has_shares and decisions[key].decision == DecisionEnum.SELL:
                 logger.debug(
@@ -114,10 +360,7 @@ class TAService:
         messages = []
         group_decisions = self._group_decisions_by_decision_and_period(ta_decisions)
         for decision_name, periods in group_decisions.items():
-            if not send_test_message and decision_name not in {  # noqa: WPS337
-                DecisionEnum.BUY,
-                DecisionEnum.SELL,
-            }:
+            if not send_test_message and decision_name not in MESSAGE_DECISIONS:
                 continue
 
             for period_name, decisions in periods.items():
@@ -139,6 +382,61 @@ class TAService:
 
         return messages
 
+    def get_message_decisions(
+        self,
+        ta_decisions: list[DecisionDTO],
+        send_test_message: bool = False,
+    ) -> list[DecisionDTO]:
+        """Решения, которые попадут в сообщения generate_bulk_tg_messages."""
+        if send_test_message:
+            return ta_decisions
+        return [dec for dec in ta_decisions if dec.decision in MESSAGE_DECISIONS]
+
+    def build_digest(
+        self,
+        ta_decisions: list[DecisionDTO],
+        params: TAFinalMessage,
+    ) -> Optional[TADigest]:
+        """
+        Группы BUY/SELL пользователя за все периоды в минимуме сообщений.
+
+        Отпечаток строится по тикерам, решениям и периодам без цен: те же
+        сигналы с новыми ценами не считаются изменением. None - нет чата
+        или нечего отправлять и запоминать.
+        """
+        chat_id = params.chat_id or settings.chat_id
+        if not chat_id:
+            return None
+
+        messages = self.generate_bulk_tg_messages(
+            ta_decisions,
+            params.send_test_message,
+        )
+        if not messages and params.send_test_message:
+            return None
+
+        fingerprint = ""
+        if not params.send_test_message:
+            fingerprint = self.get_digest_fingerprint(
+                self.get_message_decisions(ta_decisions),
+            )
+        return TADigest(
+            user_id=params.user_id,
+            chat_id=chat_id,
+            messages=pack_messages(messages),
+            fingerprint=fingerprint,
+        )
+
+    @staticmethod
+    def get_digest_fingerprint(ta_decisions: list[DecisionDTO]) -> str:
+        items = sorted(
+            {
+                f"{dec.decision.value}:{dec.period.value}:{dec.tiker}"
+                for dec in ta_decisions
+            },
+        )
+        return hashlib.sha256("\n".join(items).encode()).hexdigest()
+
     def _group_decisions_by_decision_and_period(
         self,
         ta_decisions: List[DecisionDTO],
@@ -39,9 +39,70 @@ class Settings(BaseSettings):
     celery_broker_url: str = "redis://localhost:6379/0"
     celery_backend_url: str = "redis://localhost:6379/1"
 
+    # MOEX ISS
+    moex_iss_url: str = "https://iss.moex.com/iss"
+    moex_max_connections: int = 10
+    moex_retries: int = 3
+    moex_retry_backoff: float = 0.5
+    moex_timeout: float = 30
+
+    # MOEX: локальное хранилище истории свечей
+    moex_history_cache: bool = True
+    moex_history_dir: Path = project_root / "moex_history"
+    # Сколько дней 10-минутных свечей хранится и используется для 1h/4h
+    moex_intraday_days: int = 14
+
+    # TA: сколько компаний обрабатывает одна задача (1 - по задаче на компанию)
+    ta_chunk_size: int = 20
+    # Инкрементальный расчет индикаторов с сохранением состояния в moex_history_dir
+    ta_incremental_indicators: bool = False
+    # Как сохранять решения: "db" - напрямую из воркера, "http" - через internal API
+    ta_update_db_mode: str = "db"
+    # Расчет ADX/Stoch: "numpy" - ta_indicators, "pandas_ta" - аксессоры df.ta
+    ta_indicator_engine: str = "numpy"
+    # Решения по пачке компаний считаются одной панелью (компании x свечи)
+    ta_panel_decisions: bool = True
+    # Общий кэш индикаторов компаний в Redis (пустая строка - без кэша)
+    ta_cache_url: str = "redis://localhost:6379/2"
+    # Время жизни записи кэша во время торгов, секунды
+    ta_cache_session_ttl: int = 600
+    # Ход расчетов TA в Redis для статуса задачи (пустая строка - без отслеживания)
+    ta_run_url: str = "redis://localhost:6379/3"
+    # Сколько хранится информация о расчете, секунды
+    ta_run_ttl: int = 24 * 60 * 60
+    # Решения собираются по мере готовности пачек (через ta_run_url), без chord
+    ta_stream_decisions: bool = True
+    # Через сколько секунд сторож завершает расчет с незакончившимися пачками
+    ta_stream_timeout: int = 60 * 60
+    # В сообщения попадают только решения, изменившиеся с прошлого расчета
+    ta_changes_only: bool = True
+    # Решения добавляются в историю stoch_decision_history
+    ta_decision_history: bool = True
+    # Сколько дней хранится история решений (0 - без удаления)
+    ta_decision_history_days: int = 2 * 365
+    # Час (UTC) ежедневной очистки истории решений через celery beat
+    ta_history_cleanup_hour: int = 3
+    # Формат сообщений задач TA: "json" или "msgpack" (компактнее, bytes)
+    ta_message_format: str = "json"
+
     # Telegram
     chat_id: str = ""
     bot_token: str = ""
+    # Адрес Bot API (в тестах - локальная заглушка)
+    telegram_api_url: str = "https://api.telegram.org"
+    # Таймаут запроса к Bot API, секунды
+    telegram_timeout: float = 30
+    # Лимиты отправки на процесс воркера: сообщений в секунду всего и в один чат
+    telegram_global_rate: float = 30
+    telegram_chat_rate: float = 1
+    # Сколько раз повторять сообщение после ответа 429
+    telegram_retries: int = 3
+    # Сколько чатов обслуживается параллельно
+    telegram_max_workers: int = 4
+    # Отпечатки отправленных дайджестов в Redis (пустая строка - без проверки)
+    telegram_digest_url: str = "redis://localhost:6379/4"
+    # Сколько хранится отпечаток дайджеста, секунды
+    telegram_digest_ttl: int = 30 * 24 * 60 * 60
 
     # internal
     internal_api_url: str = "http://localhost:8000/api/internal/"
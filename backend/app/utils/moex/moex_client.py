@@ -0,0 +1,220 @@
+import asyncio
+import logging
+import os
+import threading
+from typing import Any, Coroutine, Optional, Tuple, TypeVar
+
+import httpx
+
+from backend.app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+_R = TypeVar("_R")
+
+BOARD = "TQBR"
+CANDLES_PAGE_SIZE = 500
+RETRY_STATUS_CODES = frozenset((429, 500, 502, 503, 504))
+
+
+class MoexISSClient:
+    """
+    Асинхронный клиент MOEX ISS.
+
+    Все запросы идут через один keep-alive httpx.AsyncClient с пулом соединений,
+    число одновременных запросов к ISS ограничено, неудачные запросы
+    повторяются с экспоненциальной задержкой.
+    """
+
+    def __init__(  # noqa: WPS211
+        self,
+        base_url: str = settings.moex_iss_url,
+        max_connections: int = settings.moex_max_connections,
+        retries: int = settings.moex_retries,
+        retry_backoff: float = settings.moex_retry_backoff,
+        timeout: float = settings.moex_timeout,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.base_url = base_url
+        self.max_connections = max_connections
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.timeout = timeout
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def get_board_history(
+        self,
+        tiker: str,
+        start: str,
+        columns: Optional[Tuple[str, ...]] = None,
+        board: str = BOARD,
+    ) -> list[dict]:
+        """Дневная история торгов. Страницы после первой загружаются параллельно."""
+        path = (
+            f"/history/engines/stock/markets/shares/boards/{board}"
+            f"/securities/{tiker}.json"
+        )
+        params = {
+            "from": start,
+            "iss.meta": "off",
+            "iss.only": "history,history.cursor",
+        }
+        if columns:
+            params["history.columns"] = ",".join(columns)
+
+        first_page = await self._get_json(path, params)
+        rows = self._parse_table(first_page, "history")
+        cursor = self._parse_table(first_page, "history.cursor")
+        if not cursor:
+            return rows
+
+        index, total, page_size = (
+            cursor[0]["INDEX"],
+            cursor[0]["TOTAL"],
+            cursor[0]["PAGESIZE"],
+        )
+        pages = await asyncio.gather(
+            *(
+                self._get_json(path, {**params, "start": offset})
+                for offset in range(index + page_size, total, page_size)
+            ),
+        )
+        for page in pages:
+            rows.extend(self._parse_table(page, "history"))
+        return rows
+
+    async def get_board_candles(
+        self,
+        tiker: str,
+        start: str,
+        interval: int = 10,
+        board: str = BOARD,
+    ) -> list[dict]:
+        path = (
+            f"/engines/stock/markets/shares/boards/{board}"
+            f"/securities/{tiker}/candles.json"
+        )
+        params = {
+            "from": start,
+            "interval": interval,
+            "iss.meta": "off",
+            "iss.only": "candles",
+        }
+
+        rows: list[dict] = []
+        while True:  # noqa: WPS457
+            page = self._parse_table(
+                await self._get_json(path, {**params, "start": len(rows)}),
+                "candles",
+            )
+            rows.extend(page)
+            if len(page) < CANDLES_PAGE_SIZE:
+                return rows
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _get_json(self, path: str, params: dict) -> dict:
+        client = self._get_client()
+        attempt = 0
+        while True:  # noqa: WPS457
+            try:
+                async with self._get_semaphore():
+                    response = await client.get(path, params=params)
+                if response.status_code not in RETRY_STATUS_CODES:
+                    response.raise_for_status()
+                    return response.json()
+                error: Exception = httpx.HTTPStatusError(
+                    f"ISS response {response.status_code}",
+                    request=response.request,
+                    response=response,
+                )
+                delay = self._get_retry_delay(attempt, response)
+            except httpx.TransportError as ex:
+                error = ex
+                delay = self._get_retry_delay(attempt)
+
+            if attempt >= self.retries:
+                raise error
+
+            logger.warning(f"ISS request {path} failed: '{error}', retry in {delay}s")
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def _get_retry_delay(
+        self,
+        attempt: int,
+        response: Optional[httpx.Response] = None,
+    ) -> float:
+        retry_after = response.headers.get("Retry-After") if response else None
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+        return self.retry_backoff * 2**attempt
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                transport=self.transport,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+        return self._client
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_connections)
+        return self._semaphore
+
+    @staticmethod
+    def _parse_table(payload: dict, name: str) -> list[dict]:
+        table = payload.get(name)
+        if not table:
+            return []
+        columns = table["columns"]
+        return [dict(zip(columns, row)) for row in table["data"]]
+
+
+class MoexSyncClient:
+    """
+    Синхронный фасад над MoexISSClient.
+
+    Корутины выполняются в отдельном потоке с собственным event loop, поэтому
+    пул соединений переживает вызовы из синхронного кода (Celery, TACalculator).
+    """
+
+    def __init__(self, client: Optional[MoexISSClient] = None):
+        self.client = client or MoexISSClient()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever,
+            name="moex-iss-client",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def run(self, coroutine: Coroutine[Any, Any, _R]) -> _R:
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+
+_sync_client: Optional[MoexSyncClient] = None
+_sync_client_pid: Optional[int] = None
+_sync_client_lock = threading.Lock()
+
+
+def get_moex_client() -> MoexSyncClient:
+    """Общий на процесс клиент ISS (пересоздается после fork воркера)."""
+    global _sync_client, _sync_client_pid  # noqa: WPS420
+
+    with _sync_client_lock:
+        if _sync_client is None or _sync_client_pid != os.getpid():
+            _sync_client = MoexSyncClient()  # noqa: WPS442
+            _sync_client_pid = os.getpid()  # noqa: WPS442
+        return _sync_client
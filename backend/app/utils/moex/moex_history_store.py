@@ -0,0 +1,133 @@
+import datetime
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+from typing import Optional
+
+HISTORY_COLUMNS = ("OPEN", "HIGH", "LOW", "CLOSE", "VOLUME", "VALUE")
+
+CREATE_SCRIPT = """
+CREATE TABLE IF NOT EXISTS candles (
+    board TEXT NOT NULL,
+    tiker TEXT NOT NULL,
+    tradedate TEXT NOT NULL,
+    open REAL,
+    high REAL,
+    low REAL,
+    close REAL,
+    volume REAL,
+    value REAL,
+    PRIMARY KEY (board, tiker, tradedate)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS coverage (
+    board TEXT NOT NULL,
+    tiker TEXT NOT NULL,
+    start TEXT NOT NULL,
+    PRIMARY KEY (board, tiker)
+) WITHOUT ROWID;
+"""
+
+
+class MoexHistoryStore:
+    """
+    Локальное хранилище дневных свечей MOEX.
+
+    Свечи хранятся в SQLite с ключом (board, tiker, date). Для каждого тикера
+    запоминается дата, начиная с которой история загружена полностью, чтобы
+    с ISS запрашивать только недостающий хвост.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.path = self.directory / "history.sqlite3"
+        self._initialized = False
+
+    def get_fetch_start(
+        self,
+        board: str,
+        tiker: str,
+        start: datetime.date,
+    ) -> datetime.date:
+        """Дата, с которой нужно догрузить историю, чтобы покрыть период от start."""
+        with closing(self._connect()) as connection:
+            covered = connection.execute(
+                "SELECT start FROM coverage WHERE board = ? AND tiker = ?",
+                (board, tiker),
+            ).fetchone()
+            last_date = connection.execute(
+                "SELECT MAX(tradedate) FROM candles WHERE board = ? AND tiker = ?",
+                (board, tiker),
+            ).fetchone()[0]
+
+        if not covered or not last_date or str(start) < covered[0]:
+            return start
+
+        # Последний сохраненный день перезапрашиваем: он мог быть неполным
+        return datetime.date.fromisoformat(last_date)
+
+    def save_history(
+        self,
+        board: str,
+        tiker: str,
+        rows: list[dict],
+        covered_from: datetime.date,
+    ) -> None:
+        values = [
+            (
+                board,
+                tiker,
+                row["TRADEDATE"],
+                *(row.get(column) for column in HISTORY_COLUMNS),
+            )
+            for row in rows
+        ]
+        with closing(self._connect()) as connection:
+            with connection:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO candles VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    values,
+                )
+                connection.execute(
+                    "INSERT INTO coverage VALUES (?, ?, ?) "
+                    "ON CONFLICT (board, tiker) "
+                    "DO UPDATE SET start = MIN(start, excluded.start)",
+                    (board, tiker, str(covered_from)),
+                )
+
+    def get_history(
+        self,
+        board: str,
+        tiker: str,
+        start: datetime.date,
+        end: Optional[datetime.date] = None,
+    ) -> list[dict]:
+        query = (
+            "SELECT tradedate, open, high, low, close, volume, value FROM candles "
+            "WHERE board = ? AND tiker = ? AND tradedate >= ?"
+        )
+        params = [board, tiker, str(start)]
+        if end:
+            query = f"{query} AND tradedate <= ?"
+            params.append(str(end))
+
+        with closing(self._connect()) as connection:
+            rows = connection.execute(f"{query} ORDER BY tradedate", params)
+            return [
+                {
+                    "TRADEDATE": tradedate,
+                    **dict(zip(HISTORY_COLUMNS, values)),
+                }
+                for tradedate, *values in rows.fetchall()
+            ]
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+        connection = sqlite3.connect(self.path, timeout=30)
+        if not self._initialized:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(CREATE_SCRIPT)
+            self._initialized = True
+        return connection
@@ -0,0 +1,151 @@
+import datetime
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+from typing import Optional
+
+from backend.app.utils.moex.moex_history_store import HISTORY_COLUMNS
+
+CREATE_SCRIPT = """
+CREATE TABLE IF NOT EXISTS intraday_candles (
+    board TEXT NOT NULL,
+    tiker TEXT NOT NULL,
+    begin TEXT NOT NULL,
+    open REAL,
+    high REAL,
+    low REAL,
+    close REAL,
+    volume REAL,
+    value REAL,
+    PRIMARY KEY (board, tiker, begin)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS intraday_coverage (
+    board TEXT NOT NULL,
+    tiker TEXT NOT NULL,
+    start TEXT NOT NULL,
+    PRIMARY KEY (board, tiker)
+) WITHOUT ROWID;
+"""
+
+
+class MoexIntradayStore:
+    """
+    Локальное хранилище 10-минутных свечей MOEX.
+
+    Как MoexHistoryStore, но ключ свечи - время ее начала (BEGIN в формате ISS
+    "YYYY-MM-DD HH:MM:SS", по Москве). С ISS запрашивается только хвост от
+    последней сохраненной свечи, свечи старше окна хранения удаляются.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.path = self.directory / "intraday.sqlite3"
+        self._initialized = False
+
+    def get_fetch_start(
+        self,
+        board: str,
+        tiker: str,
+        start: datetime.datetime,
+    ) -> datetime.datetime:
+        """Время, с которого нужно догрузить свечи, чтобы покрыть период от start."""
+        with closing(self._connect()) as connection:
+            covered = connection.execute(
+                "SELECT start FROM intraday_coverage WHERE board = ? AND tiker = ?",
+                (board, tiker),
+            ).fetchone()
+            last_begin = connection.execute(
+                "SELECT MAX(begin) FROM intraday_candles WHERE board = ? AND tiker = ?",
+                (board, tiker),
+            ).fetchone()[0]
+
+        if not covered or not last_begin or _format(start) < covered[0]:
+            return start
+
+        # Последнюю сохраненную свечу перезапрашиваем: она могла быть неполной
+        return datetime.datetime.fromisoformat(last_begin)
+
+    def save_candles(
+        self,
+        board: str,
+        tiker: str,
+        rows: list[dict],
+        covered_from: datetime.datetime,
+    ) -> None:
+        values = [
+            (
+                board,
+                tiker,
+                row["BEGIN"],
+                *(row.get(column) for column in HISTORY_COLUMNS),
+            )
+            for row in rows
+        ]
+        with closing(self._connect()) as connection:
+            with connection:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO intraday_candles "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    values,
+                )
+                connection.execute(
+                    "INSERT INTO intraday_coverage VALUES (?, ?, ?) "
+                    "ON CONFLICT (board, tiker) "
+                    "DO UPDATE SET start = MIN(start, excluded.start)",
+                    (board, tiker, _format(covered_from)),
+                )
+
+    def get_candles(
+        self,
+        board: str,
+        tiker: str,
+        start: datetime.datetime,
+    ) -> list[dict]:
+        with closing(self._connect()) as connection:
+            rows = connection.execute(
+                "SELECT begin, open, high, low, close, volume, value "
+                "FROM intraday_candles "
+                "WHERE board = ? AND tiker = ? AND begin >= ? ORDER BY begin",
+                (board, tiker, _format(start)),
+            )
+            return [
+                {"BEGIN": begin, **dict(zip(HISTORY_COLUMNS, values))}
+                for begin, *values in rows.fetchall()
+            ]
+
+    def delete_before(
+        self,
+        before: datetime.datetime,
+        board: Optional[str] = None,
+    ) -> int:
+        """Удаляет свечи старше before, покрытие сдвигается к before."""
+        board_filter = " AND board = ?" if board else ""
+        params = [_format(before), *([board] if board else [])]
+        with closing(self._connect()) as connection:
+            with connection:
+                deleted = connection.execute(
+                    f"DELETE FROM intraday_candles WHERE begin < ?{board_filter}",
+                    params,
+                ).rowcount
+                connection.execute(
+                    f"UPDATE intraday_coverage SET start = ? "
+                    f"WHERE start < ?{board_filter}",
+                    [_format(before), *params],
+                )
+        return deleted
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+        connection = sqlite3.connect(self.path, timeout=30)
+        if not self._initialized:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(CREATE_SCRIPT)
+            self._initialized = True
+        return connection
+
+
+def _format(moment: datetime.datetime) -> str:
+    return moment.strftime("%Y-%m-%d %H:%M:%S")
@@ -1,77 +1,292 @@
+import asyncio
 import datetime
+import logging
+from functools import lru_cache
 from typing import Optional, Tuple
 
-import apimoex
 import pandas as pd
-import requests
 from pandas import DataFrame
 
+from backend.app.settings import settings
+from backend.app.utils.moex.moex_client import BOARD, MoexISSClient, get_moex_client
+from backend.app.utils.moex.moex_history_store import MoexHistoryStore
+from backend.app.utils.moex.moex_intraday_store import MoexIntradayStore
+
+logger = logging.getLogger(__name__)
+
+BOARD_HISTORY_COLUMNS = ("OPEN", "HIGH", "LOW", "TRADEDATE", "CLOSE", "VOLUME", "VALUE")
+
+
+@lru_cache
+def get_history_store() -> Optional[MoexHistoryStore]:
+    if not settings.moex_history_cache:
+        return None
+    return MoexHistoryStore(settings.moex_history_dir)
+
+
+@lru_cache
+def get_intraday_store() -> Optional[MoexIntradayStore]:
+    if not settings.moex_history_cache:
+        return None
+    return MoexIntradayStore(settings.moex_history_dir)
+
+
+def history_to_frame(data: list[dict]) -> DataFrame:
+    """Строки истории ISS (или MoexHistoryStore) в DataFrame с индексом по дате."""
+    df = DataFrame(data)
+    if df.size > 0:
+        df["TRADEDATE"] = pd.to_datetime(df["TRADEDATE"])
+        df.set_index("TRADEDATE", inplace=True)
+    return df
+
+
+def intraday_to_frame(data: list[dict]) -> DataFrame:
+    """10-минутные свечи (MoexIntradayStore) в DataFrame с индексом по началу свечи."""
+    df = DataFrame(data)
+    if df.size > 0:
+        df["BEGIN"] = pd.to_datetime(df["BEGIN"])
+        df.set_index("BEGIN", inplace=True)
+    return df
+
 
 class MoexReader:
-    def get_company_history(  # noqa: WPS210
+    def __init__(
+        self,
+        history_store: Optional[MoexHistoryStore] = None,
+        client: Optional[MoexISSClient] = None,
+        intraday_store: Optional[MoexIntradayStore] = None,
+    ):
+        self.history_store = history_store or get_history_store()
+        self.intraday_store = intraday_store or get_intraday_store()
+        self._client = client
+
+    @property
+    def client(self) -> MoexISSClient:
+        return self._client or get_moex_client().client
+
+    def get_company_history(
         self,
         start: datetime,
         tiker: str,
         add_current: bool = True,
     ) -> DataFrame:
+        return get_moex_client().run(
+            self.get_company_history_async(start, tiker, add_current),
+        )
+
+    def get_companies_history(
+        self,
+        start: datetime,
+        tikers: list[str],
+        add_current: bool = True,
+    ) -> dict[str, DataFrame]:
+        """
+        История нескольких компаний, запросы к ISS выполняются параллельно.
+
+        Тикеры, историю которых загрузить не удалось, в результат не попадают.
+        """
+        return get_moex_client().run(
+            self.get_companies_history_async(start, tikers, add_current),
+        )
+
+    async def get_companies_history_async(
+        self,
+        start: datetime,
+        tikers: list[str],
+        add_current: bool = True,
+    ) -> dict[str, DataFrame]:
+        histories = await asyncio.gather(
+            *(
+                self.get_company_history_async(start, tiker, add_current)
+                for tiker in tikers
+            ),
+            return_exceptions=True,
+        )
+
+        results = {}
+        for tiker, history in zip(tikers, histories):
+            if isinstance(history, Exception):
+                logger.error(f"Failed to load history for {tiker}: '{history}'")
+                continue
+            results[tiker] = history
+        return results
 
-        columns = ("OPEN", "HIGH", "LOW", "TRADEDATE", "CLOSE", "VOLUME", "VALUE")
+    async def get_company_history_async(  # noqa: WPS210
+        self,
+        start: datetime,
+        tiker: str,
+        add_current: bool = True,
+    ) -> DataFrame:
         candle_start = datetime.datetime.today().strftime("%Y-%m-%d")
 
-        with requests.Session() as session:
-            data = self._fetch_board_history(session, tiker, start, columns)
-            if add_current:
-                candles = self._fetch_board_candles(session, tiker, candle_start)
-
-            if add_current and data and candles:
-                last_candle = candles[-1]
-                last_data = {
-                    "OPEN": last_candle.get("open"),
-                    "CLOSE": last_candle.get("close"),
-                    "LOW": last_candle.get("low"),
-                    "HIGH": last_candle.get("high"),
-                    "VALUE": last_candle.get("value"),
-                    "VOLUME": last_candle.get("volume"),
-                    "TRADEDATE": candle_start,
-                }
-
-                if candle_start == data[-1]["TRADEDATE"]:
-                    data[-1] = last_data
-                else:
-                    data.append(last_data)
-
-            df = DataFrame(data)
-            if df.size > 0:
-                df["TRADEDATE"] = pd.to_datetime(df["TRADEDATE"])
-                df.set_index("TRADEDATE", inplace=True)
-            return df
-
-    def _fetch_board_history(
+        if add_current:
+            data, candles = await asyncio.gather(
+                self._get_board_history(tiker, start, BOARD_HISTORY_COLUMNS),
+                self._fetch_board_candles(tiker, candle_start),
+            )
+        else:
+            data = await self._get_board_history(tiker, start, BOARD_HISTORY_COLUMNS)
+            candles = []
+
+        if add_current and data and candles:
+            last_candle = candles[-1]
+            last_data = {
+                "OPEN": last_candle.get("open"),
+                "CLOSE": last_candle.get("close"),
+                "LOW": last_candle.get("low"),
+                "HIGH": last_candle.get("high"),
+                "VALUE": last_candle.get("value"),
+                "VOLUME": last_candle.get("volume"),
+                "TRADEDATE": candle_start,
+            }
+
+            if candle_start == data[-1]["TRADEDATE"]:
+                data[-1] = last_data
+            else:
+                data.append(last_data)
+
+        return history_to_frame(data)
+
+    def get_companies_intraday(
+        self,
+        start: datetime.datetime,
+        tikers: list[str],
+    ) -> dict[str, DataFrame]:
+        """
+        10-минутные свечи нескольких компаний начиная с start.
+
+        С ISS запрашиваются только свечи после последней сохраненной, свечи
+        старше start удаляются из хранилища. Тикеры, свечи которых загрузить
+        не удалось, в результат не попадают.
+        """
+        return get_moex_client().run(
+            self.get_companies_intraday_async(start, tikers),
+        )
+
+    async def get_companies_intraday_async(
+        self,
+        start: datetime.datetime,
+        tikers: list[str],
+    ) -> dict[str, DataFrame]:
+        candles = await asyncio.gather(
+            *(self.get_company_intraday_async(start, tiker) for tiker in tikers),
+            return_exceptions=True,
+        )
+        if self.intraday_store:
+            await asyncio.to_thread(self.intraday_store.delete_before, start, BOARD)
+
+        results = {}
+        for tiker, tiker_candles in zip(tikers, candles):
+            if isinstance(tiker_candles, Exception):
+                logger.error(f"Failed to load candles for {tiker}: '{tiker_candles}'")
+                continue
+            results[tiker] = tiker_candles
+        return results
+
+    async def get_company_intraday_async(
+        self,
+        start: datetime.datetime,
+        tiker: str,
+    ) -> DataFrame:
+        if not self.intraday_store:
+            candles = await self._fetch_board_candles(tiker, start)
+            return intraday_to_frame([_candle_to_row(candle) for candle in candles])
+
+        # Хранилище читается и пишется в потоках, как и дневная история
+        fetch_start = await asyncio.to_thread(
+            self.intraday_store.get_fetch_start,
+            BOARD,
+            tiker,
+            start,
+        )
+        candles = await self._fetch_board_candles(tiker, fetch_start)
+        rows = await asyncio.to_thread(
+            self._save_candles,
+            tiker,
+            start,
+            [_candle_to_row(candle) for candle in candles],
+            fetch_start,
+        )
+        return intraday_to_frame(rows)
+
+    def _save_candles(
+        self,
+        tiker: str,
+        start: datetime.datetime,
+        rows: list[dict],
+        fetch_start: datetime.datetime,
+    ) -> list[dict]:
+        self.intraday_store.save_candles(BOARD, tiker, rows, covered_from=fetch_start)
+        return self.intraday_store.get_candles(BOARD, tiker, start)
+
+    async def _get_board_history(
         self,
-        session: requests.Session(),
         tiker: str,
         start: datetime,
         columns: Optional[Tuple[str, ...]],
-    ) -> dict:
+    ) -> list:
+        if not self.history_store:
+            return await self._fetch_board_history(tiker, start, columns)
+
+        # Из ISS запрашиваем только то, чего нет в локальном хранилище.
+        # SQLite блокирует, поэтому хранилище читается и пишется в потоках,
+        # чтобы не останавливать цикл событий с запросами остальных тикеров
+        fetch_start = await asyncio.to_thread(
+            self.history_store.get_fetch_start,
+            BOARD,
+            tiker,
+            start,
+        )
+        data = await self._fetch_board_history(tiker, fetch_start, columns)
+        return await asyncio.to_thread(
+            self._save_history,
+            tiker,
+            start,
+            data,
+            fetch_start,
+        )
+
+    def _save_history(
+        self,
+        tiker: str,
+        start: datetime,
+        data: list,
+        fetch_start: datetime,
+    ) -> list:
+        self.history_store.save_history(BOARD, tiker, data, covered_from=fetch_start)
+        return self.history_store.get_history(BOARD, tiker, start)
 
-        return apimoex.get_board_history(
-            session,
-            security=tiker,
+    async def _fetch_board_history(
+        self,
+        tiker: str,
+        start: datetime,
+        columns: Optional[Tuple[str, ...]],
+    ) -> list:
+        return await self.client.get_board_history(
+            tiker=tiker,
             start=str(start),
             columns=columns,
         )
 
-    def _fetch_board_candles(
+    async def _fetch_board_candles(
         self,
-        session: requests.Session(),
         tiker: str,
         start: datetime,
     ) -> list:
-
-        return apimoex.get_board_candles(
-            session,
-            security=tiker,
+        return await self.client.get_board_candles(
+            tiker=tiker,
             interval=10,
             start=str(start),
-            columns=None,
         )
+
+
+def _candle_to_row(candle: dict) -> dict:
+    return {
+        "BEGIN": candle.get("begin"),
+        "OPEN": candle.get("open"),
+        "CLOSE": candle.get("close"),
+        "LOW": candle.get("low"),
+        "HIGH": candle.get("high"),
+        "VALUE": candle.get("value"),
+        "VOLUME": candle.get("volume"),
+    }
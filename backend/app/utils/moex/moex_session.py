@@ -0,0 +1,59 @@
+import datetime
+from typing import Optional
+
+# На Мосбирже нет перехода на летнее время
+MSK = datetime.timezone(datetime.timedelta(hours=3), "MSK")
+
+# Фондовый рынок: аукцион открытия основной сессии - окончание вечерней сессии
+SESSION_OPEN = datetime.time(9, 50)
+SESSION_CLOSE = datetime.time(23, 50)
+
+
+def now_msk() -> datetime.datetime:
+    return datetime.datetime.now(MSK)
+
+
+def get_trading_date(now: Optional[datetime.datetime] = None) -> datetime.date:
+    """Торговая дата по московскому времени."""
+    return (now or now_msk()).astimezone(MSK).date()
+
+
+def is_session_open(now: Optional[datetime.datetime] = None) -> bool:
+    now = (now or now_msk()).astimezone(MSK)
+    return now.weekday() < 5 and SESSION_OPEN <= now.time() < SESSION_CLOSE
+
+
+def get_next_session_open(
+    now: Optional[datetime.datetime] = None,
+) -> datetime.datetime:
+    now = (now or now_msk()).astimezone(MSK)
+    session_open = datetime.datetime.combine(now.date(), SESSION_OPEN, tzinfo=MSK)
+    if now >= session_open:
+        session_open += datetime.timedelta(days=1)
+    while session_open.weekday() >= 5:
+        session_open += datetime.timedelta(days=1)
+    return session_open
+
+
+def get_session_ttl(
+    session_ttl: int,
+    now: Optional[datetime.datetime] = None,
+) -> int:
+    """
+    Время жизни рыночных данных в секундах.
+
+    Во время торгов текущая свеча меняется, поэтому данные живут не дольше
+    session_ttl и не дольше окончания сессии. Вне торгов данные не меняются
+    до открытия следующей сессии.
+    """
+    now = (now or now_msk()).astimezone(MSK)
+    if is_session_open(now):
+        session_close = datetime.datetime.combine(
+            now.date(),
+            SESSION_CLOSE,
+            tzinfo=MSK,
+        )
+        ttl = min(session_ttl, (session_close - now).total_seconds())
+    else:
+        ttl = (get_next_session_open(now) - now).total_seconds()
+    return max(1, int(ttl))
@@ -0,0 +1,151 @@
+import logging
+from functools import lru_cache
+from typing import Iterator, Optional
+
+import redis
+
+from backend.app.schemas.ta import DecisionDTO, TAFinalMessage
+from backend.app.settings import settings
+from backend.app.utils.ta.ta_run import REDIS_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "ta:aggregate"
+
+
+@lru_cache
+def get_ta_aggregator() -> Optional["TADecisionAggregator"]:
+    if not settings.ta_stream_decisions or not settings.ta_run_url:
+        return None
+    client = redis.Redis.from_url(
+        settings.ta_run_url,
+        socket_connect_timeout=REDIS_TIMEOUT,
+        socket_timeout=REDIS_TIMEOUT,
+        decode_responses=True,
+    )
+    return TADecisionAggregator(client)
+
+
+class TADecisionAggregator:
+    """
+    Сбор решений расчета TA в Redis вместо результата chord.
+
+    Задачи пачек сами сохраняют решения в БД и складывают в Redis только
+    решения для сообщений в Telegram, сгруппированные по пользователям.
+    Счетчик оставшихся пачек уменьшается атомарно: задача последней пачки
+    забирает решения и отправляет сообщения. Если пачка так и не завершилась,
+    это делает сторож по таймауту. Ни одна задача не держит в памяти решения
+    всего расчета, результаты пачек в result backend не хранятся.
+    """
+
+    def __init__(self, client: redis.Redis, ttl: int = settings.ta_run_ttl):
+        self.client = client
+        self.ttl = ttl
+
+    @staticmethod
+    def get_key(run_id: str, suffix: str) -> str:
+        return f"{KEY_PREFIX}:{run_id}:{suffix}"
+
+    def start(
+        self,
+        run_id: str,
+        users: list[TAFinalMessage],
+        chunks: int,
+    ) -> bool:
+        """Параметры отправки пользователей и число пачек; False - Redis недоступен."""
+        try:
+            pipeline = self.client.pipeline(transaction=False)
+            pipeline.set(self.get_key(run_id, "chunks"), chunks, ex=self.ttl)
+            if users:
+                pipeline.hset(
+                    self.get_key(run_id, "users"),
+                    mapping={user.user_id: user.model_dump_json() for user in users},
+                )
+                pipeline.expire(self.get_key(run_id, "users"), self.ttl)
+            pipeline.execute()
+        except redis.RedisError as ex:
+            logger.warning(f"TA aggregator is unavailable: '{ex}'")
+            return False
+        return True
+
+    def add_decisions(
+        self,
+        run_id: str,
+        user_id: int,
+        decisions: list[DecisionDTO],
+    ) -> None:
+        if not decisions:
+            return
+
+        key = self.get_key(run_id, f"decisions:{user_id}")
+        try:
+            pipeline = self.client.pipeline(transaction=False)
+            pipeline.rpush(key, *[dec.model_dump_json() for dec in decisions])
+            pipeline.expire(key, self.ttl)
+            pipeline.execute()
+        except redis.RedisError as ex:
+            logger.warning(f"Failed to save TA decisions for user {user_id}: '{ex}'")
+
+    def finish_chunk(self, run_id: str) -> bool:
+        """Отмечает обработанную пачку, True - это была последняя пачка."""
+        try:
+            return self.client.decr(self.get_key(run_id, "chunks")) == 0
+        except redis.RedisError as ex:
+            # Расчет завершит ta_stream_watchdog_task
+            logger.error(f"Failed to finish TA chunk of run {run_id}: '{ex}'")
+            return False
+
+    def claim_finish(self, run_id: str) -> bool:
+        """
+        Право завершить расчет, True получает только первый вызов.
+
+        Завершить расчет могут последняя пачка и сторож просроченных расчетов,
+        сообщения отправляет только один из них.
+        """
+        try:
+            return bool(
+                self.client.set(
+                    self.get_key(run_id, "finished"),
+                    1,
+                    nx=True,
+                    ex=self.ttl,
+                ),
+            )
+        except redis.RedisError as ex:
+            logger.error(f"Failed to finish TA run {run_id}: '{ex}'")
+            return False
+
+    def get_pending_chunks(self, run_id: str) -> Optional[int]:
+        """Сколько пачек еще не обработано, None - неизвестно."""
+        try:
+            chunks = self.client.get(self.get_key(run_id, "chunks"))
+        except redis.RedisError as ex:
+            logger.warning(f"TA aggregator is unavailable: '{ex}'")
+            return None
+        return int(chunks) if chunks is not None else None
+
+    def pop_decisions(
+        self,
+        run_id: str,
+    ) -> Iterator[tuple[TAFinalMessage, list[DecisionDTO]]]:
+        """
+        Решения каждого пользователя; прочитанные данные удаляются.
+
+        Счетчик пачек остается до истечения TTL: запоздавшая пачка должна
+        дойти до claim_finish и получить отказ там.
+        """
+        try:
+            users = self.client.hgetall(self.get_key(run_id, "users"))
+            for user_json in users.values():
+                user = TAFinalMessage.model_validate_json(user_json)
+                key = self.get_key(run_id, f"decisions:{user.user_id}")
+                decisions = [
+                    DecisionDTO.model_validate_json(dec)
+                    for dec in self.client.lrange(key, 0, -1)
+                ]
+                self.client.delete(key)
+                yield user, decisions
+
+            self.client.delete(self.get_key(run_id, "users"))
+        except redis.RedisError as ex:
+            logger.error(f"Failed to read TA decisions of run {run_id}: '{ex}'")
@@ -0,0 +1,450 @@
+"""
+Бэктест правил TACalculator на всей истории.
+
+Решение, которое расчет принял бы в каждый торговый день, считается для всех
+компаний и дней сразу. Индикаторы W/M на день t строятся так же, как в живом
+расчете по истории до t: по закрытым периодам и незакрытому текущему
+(неделя или месяц до t включительно), поэтому будущие свечи периода в решение
+не попадают. Сделки открываются по цене открытия следующего дня после BUY и
+закрываются по открытию дня после SELL или по стопу.
+"""
+
+import datetime
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from backend.app.schemas.company import TAParamsDTO
+from backend.app.utils.moex.moex_client import BOARD
+from backend.app.utils.moex.moex_history_store import MoexHistoryStore
+from backend.app.utils.moex.moex_reader import get_history_store, history_to_frame
+from backend.app.utils.ta import ta_indicators
+from backend.app.utils.ta.ta_panel import (
+    BUY,
+    MIN_PERIOD_ROWS,
+    RULE_INDICATORS,
+    SELL,
+    calculate_decisions,
+)
+from backend.app.utils.ta.ta_registry import get_columns
+from backend.app.utils.ta.ta_resampler import (
+    OHLC_AGGREGATION,
+    OHLC_COLUMNS,
+    period_start_keys,
+)
+
+# Длины окон stoch по умолчанию - как у компании без настроек TA
+_DEFAULT_LENGTHS = TAParamsDTO().indicator_lengths
+STOCH_LENGTHS = {
+    "k": _DEFAULT_LENGTHS["stoch_k"],
+    "d": _DEFAULT_LENGTHS["stoch_d"],
+    "smooth_k": _DEFAULT_LENGTHS["stoch_smooth_k"],
+}
+
+# Причины закрытия сделки
+EXIT_SIGNAL, EXIT_STOP, EXIT_END = "SELL", "STOP", "END"
+
+SUMMARY_COLUMNS = (
+    "tiker",
+    "period",
+    "trades",
+    "hit_rate",
+    "mean_return",
+    "total_return",
+    "max_drawdown",
+    "exposure",
+)
+
+
+@dataclass
+class BacktestFrame:
+    """Индикаторы одного таймфрейма на каждой дневной свече всех компаний."""
+
+    valid: np.ndarray
+    indicators: dict[str, np.ndarray]
+
+    def last(self, name: str) -> np.ndarray:
+        # Интерфейс IndicatorPanel: "последняя свеча" здесь - каждый день
+        return self.indicators[name]
+
+
+@dataclass
+class Trade:
+    tiker: str
+    entry_date: datetime.date
+    entry_price: float
+    exit_date: datetime.date
+    exit_price: float
+    reason: str
+
+    @property
+    def profit(self) -> float:
+        return self.exit_price / self.entry_price - 1
+
+
+class BacktestPanels:
+    """
+    Дневные свечи всех компаний в длинном формате (компания, дата).
+
+    Индикаторы каждого таймфрейма считаются один раз при первом обращении
+    и переиспользуются при переборе границ и стопов. stoch_lengths - длины
+    окон stoch (k, d, smooth_k), по умолчанию как в живом расчете.
+    """
+
+    def __init__(
+        self,
+        histories: dict[str, DataFrame],
+        stoch_lengths: Optional[dict[str, int]] = None,
+    ):
+        self.stoch_lengths = STOCH_LENGTHS | (stoch_lengths or {})
+        self.histories = {tiker: df for tiker, df in histories.items() if not df.empty}
+        self.companies = list(self.histories)
+        counts = np.array(
+            [len(df.index) for df in self.histories.values()],
+            dtype=np.int64,
+        )
+        self.codes = np.repeat(np.arange(len(self.companies)), counts)
+        self.starts = np.cumsum(counts) - counts
+        self.ends = self.starts + counts
+        self.positions = np.arange(len(self.codes)) - self.starts[self.codes]
+
+        if self.companies:
+            rows = pd.concat(self.histories.values())[OHLC_COLUMNS]
+        else:
+            rows = DataFrame(columns=OHLC_COLUMNS, index=pd.DatetimeIndex([]))
+        self.rows = rows.astype(np.float64)
+        self.dates = pd.DatetimeIndex(self.rows.index)
+        self._frames: dict[str, BacktestFrame] = {}
+
+    @property
+    def tikers(self) -> np.ndarray:
+        """Тикер каждой строки: строки здесь играют роль компаний панели."""
+        return np.array(self.companies, dtype=object)[self.codes]
+
+    def __getitem__(self, period: str) -> BacktestFrame:
+        if period not in self._frames:
+            if period == "D":
+                self._frames[period] = self._daily_frame()
+            else:
+                self._frames[period] = self._period_frame(period)
+        return self._frames[period]
+
+    def _daily_frame(self) -> BacktestFrame:
+        # Индикаторы причинны: значение на день t зависит только от свечей до t
+        high, low, close = (
+            self._to_panel(self.codes, self.positions, self.rows[column])
+            for column in ("HIGH", "LOW", "CLOSE")
+        )
+        stoch_k, stoch_d = ta_indicators.stoch(high, low, close, **self.stoch_lengths)
+        return self._make_frame(
+            self.positions + 1 > MIN_PERIOD_ROWS,
+            {
+                "k": stoch_k[self.codes, self.positions],
+                "d": stoch_d[self.codes, self.positions],
+            },
+        )
+
+    def _period_frame(self, period: str) -> BacktestFrame:  # noqa: WPS210
+        keys = period_start_keys(self.dates, period).to_numpy()
+        new_bar = np.ones(len(self.codes), dtype=bool)
+        new_bar[1:] = (self.codes[1:] != self.codes[:-1]) | (keys[1:] != keys[:-1])
+        bar_ids = np.cumsum(new_bar) - 1
+
+        # Закрытые периоды: свечи W/M, как в resample_ohlc
+        bars = self.rows.groupby(bar_ids).agg(OHLC_AGGREGATION)
+        bar_codes = self.codes[new_bar]
+        bar_starts = np.searchsorted(bar_codes, np.arange(len(self.companies)))
+        bar_positions = np.arange(len(bar_codes)) - bar_starts[bar_codes]
+        high, low, close = (
+            self._to_panel(bar_codes, bar_positions, bars[column])
+            for column in ("HIGH", "LOW", "CLOSE")
+        )
+        length, smooth_k, length_d = (
+            self.stoch_lengths[name] for name in ("k", "smooth_k", "d")
+        )
+        lowest_low = ta_indicators.rolling_min(low, length - 1)
+        highest_high = ta_indicators.rolling_max(high, length - 1)
+        stoch_raw = ta_indicators.stoch_raw(
+            close,
+            ta_indicators.rolling_min(low, length),
+            ta_indicators.rolling_max(high, length),
+        )
+        stoch_k = ta_indicators.rolling_mean(stoch_raw, smooth_k)
+
+        # Незакрытый период на день t: свеча из дней периода до t включительно
+        grouped = self.rows.groupby(bar_ids)
+        current_high = grouped["HIGH"].cummax().groupby(bar_ids).ffill().to_numpy()
+        current_low = grouped["LOW"].cummin().groupby(bar_ids).ffill().to_numpy()
+        current_close = grouped["CLOSE"].ffill().to_numpy()
+
+        codes, positions = self.codes, bar_positions[bar_ids]
+
+        def previous(values: np.ndarray, lag: int) -> np.ndarray:
+            return _take_lagged(values, codes, positions, lag)
+
+        def mean_with_current(values: np.ndarray, current: np.ndarray, window: int):
+            # Скользящее среднее по window - 1 закрытым значениям и текущему
+            windows = np.stack(
+                [*(previous(values, lag) for lag in range(window - 1, 0, -1)), current],
+                axis=-1,
+            )
+            return ta_indicators.rolling_mean(windows, window)[:, -1]
+
+        with np.errstate(invalid="ignore"):
+            current_raw = ta_indicators.stoch_raw(
+                current_close,
+                np.minimum(previous(lowest_low, 1), current_low),
+                np.maximum(previous(highest_high, 1), current_high),
+            )
+        current_k = mean_with_current(stoch_raw, current_raw, smooth_k)
+        current_d = mean_with_current(stoch_k, current_k, length_d)
+
+        return self._make_frame(
+            positions + 1 > MIN_PERIOD_ROWS,
+            {"k": current_k, "d": current_d},
+        )
+
+    def _to_panel(
+        self,
+        codes: np.ndarray,
+        positions: np.ndarray,
+        values: pd.Series,
+    ) -> np.ndarray:
+        # Ряды прижаты к левому краю, справа дополнены NaN
+        width = int(positions.max()) + 1 if len(positions) else 0
+        panel = np.full((len(self.companies), width), np.nan)
+        panel[codes, positions] = values.to_numpy(dtype=np.float64)
+        return panel
+
+    @staticmethod
+    def _make_frame(valid: np.ndarray, values: dict[str, np.ndarray]) -> BacktestFrame:
+        # Считаются только колонки индикаторов, нужных правилам (RULE_INDICATORS)
+        return BacktestFrame(
+            valid=valid,
+            indicators={name: values[name] for name in get_columns(RULE_INDICATORS)},
+        )
+
+
+class Backtest:
+    """
+    Бэктест решений TACalculator по дневной истории компаний.
+
+    bottom_border по умолчанию как в живом расчете с параметрами по умолчанию
+    (25, для покупки в W/D - 40 и 25 по недельной и дневной свече), заданная
+    граница действует во всех этих правилах. stop_loss - доля падения
+    от цены входа, None - без стопа.
+    """
+
+    def __init__(
+        self,
+        histories: dict[str, DataFrame],
+        stoch_lengths: Optional[dict[str, int]] = None,
+    ):
+        self.panels = BacktestPanels(histories, stoch_lengths)
+        self._prices: Optional[dict[str, np.ndarray]] = None
+
+    def get_decisions(
+        self,
+        period: str,
+        bottom_border: Optional[float] = None,
+        top_border: float = 80,
+    ) -> pd.Series:
+        """Решение на каждый день, индекс - (тикер, дата)."""
+        decisions = self._calculate_decisions(period, bottom_border, top_border)
+        return pd.Series(
+            decisions,
+            index=pd.MultiIndex.from_arrays(
+                [self.panels.tikers, self.panels.dates],
+                names=["tiker", "date"],
+            ),
+            name=period,
+        )
+
+    def get_trades(
+        self,
+        period: str,
+        bottom_border: Optional[float] = None,
+        top_border: float = 80,
+        stop_loss: Optional[float] = 0.1,
+    ) -> list[Trade]:
+        decisions = self._calculate_decisions(period, bottom_border, top_border)
+        trades = []
+        for code in range(len(self.panels.companies)):
+            trades.extend(
+                trade for trade, _ in self._simulate(code, decisions, stop_loss)
+            )
+        return trades
+
+    def run(
+        self,
+        period: str,
+        bottom_border: Optional[float] = None,
+        top_border: float = 80,
+        stop_loss: Optional[float] = 0.1,
+    ) -> DataFrame:
+        """Итоги по каждой компании: доля прибыльных сделок, доходность, просадка."""
+        decisions = self._calculate_decisions(period, bottom_border, top_border)
+        prices = self._get_prices()
+        summary = []
+
+        for code, tiker in enumerate(self.panels.companies):
+            trades = list(self._simulate(code, decisions, stop_loss))
+            start, end = self.panels.starts[code], self.panels.ends[code]
+            equity = _get_equity(prices["CLOSE"][start:end], trades)
+            profits = np.array([trade.profit for trade, _ in trades])
+            summary.append(
+                {
+                    "tiker": tiker,
+                    "period": period,
+                    "trades": len(trades),
+                    "hit_rate": (profits > 0).mean() if trades else np.nan,
+                    "mean_return": profits.mean() if trades else np.nan,
+                    "total_return": equity[-1] - 1,
+                    "max_drawdown": _get_max_drawdown(equity),
+                    "exposure": sum(
+                        exit_row - entry + 1 for _, (entry, exit_row) in trades
+                    )
+                    / (end - start),
+                },
+            )
+        return DataFrame(summary, columns=SUMMARY_COLUMNS)
+
+    def _calculate_decisions(
+        self,
+        period: str,
+        bottom_border: Optional[float],
+        top_border: float,
+    ) -> np.ndarray:
+        if bottom_border is None:
+            return calculate_decisions(self.panels, period, top_border=top_border)
+        return calculate_decisions(
+            self.panels,
+            period,
+            bottom_border=bottom_border,
+            top_border=top_border,
+            buy_border=bottom_border,
+        )
+
+    def _get_prices(self) -> dict[str, np.ndarray]:
+        if self._prices is None:
+            rows = self.panels.rows
+            close = rows["CLOSE"].groupby(self.panels.codes).ffill()
+            open_ = rows["OPEN"].fillna(close)
+            low = rows["LOW"].fillna(np.minimum(open_, close))
+            self._prices = {
+                "OPEN": open_.to_numpy(),
+                "CLOSE": close.to_numpy(),
+                "LOW": low.to_numpy(),
+            }
+        return self._prices
+
+    def _simulate(  # noqa: WPS210, WPS231
+        self,
+        code: int,
+        decisions: np.ndarray,
+        stop_loss: Optional[float],
+    ) -> Iterable[tuple[Trade, tuple[int, int]]]:
+        """
+        Сделки одной компании с днями входа и выхода (номера строк компании).
+
+        Сигналы ищутся на массивах целиком, цикл идет только по сделкам.
+        """
+        start, end = self.panels.starts[code], self.panels.ends[code]
+        prices = {
+            name: values[start:end] for name, values in self._get_prices().items()
+        }
+        dates = self.panels.dates[start:end]
+        tiker = self.panels.companies[code]
+        rows = end - start
+
+        buy = decisions[start:end] == BUY
+        # Вход только по новому сигналу BUY, а не по продолжающемуся
+        onsets = np.flatnonzero(buy & ~np.concatenate(([False], buy[:-1])))
+        sells = np.flatnonzero(decisions[start:end] == SELL)
+        free = 0
+
+        for signal in onsets:
+            entry = signal + 1
+            if signal < free or entry >= rows or np.isnan(prices["OPEN"][entry]):
+                continue
+            entry_price = prices["OPEN"][entry]
+
+            sell = np.searchsorted(sells, entry)
+            if sell < len(sells) and sells[sell] + 1 < rows:
+                exit_row, reason = sells[sell] + 1, EXIT_SIGNAL
+                exit_price = prices["OPEN"][exit_row]
+                stop_rows = slice(entry, exit_row)
+            else:
+                exit_row, reason = rows - 1, EXIT_END
+                exit_price = prices["CLOSE"][exit_row]
+                stop_rows = slice(entry, rows)
+
+            if stop_loss is not None:
+                stop_price = entry_price * (1 - stop_loss)
+                hits = np.flatnonzero(prices["LOW"][stop_rows] <= stop_price)
+                if hits.size:
+                    exit_row, reason = entry + hits[0], EXIT_STOP
+                    # При гэпе вниз стоп исполняется по цене открытия
+                    exit_price = min(prices["OPEN"][exit_row], stop_price)
+
+            free = exit_row
+            yield Trade(
+                tiker=tiker,
+                entry_date=dates[entry].date(),
+                entry_price=float(entry_price),
+                exit_date=dates[exit_row].date(),
+                exit_price=float(exit_price),
+                reason=reason,
+            ), (entry, exit_row)
+
+
+def load_histories(
+    tikers: Iterable[str],
+    start: datetime.date,
+    end: Optional[datetime.date] = None,
+    store: Optional[MoexHistoryStore] = None,
+) -> dict[str, DataFrame]:
+    """История компаний из локального хранилища свечей, без запросов к ISS."""
+    store = store or get_history_store()
+    if store is None:
+        raise ValueError("MOEX history cache is disabled")
+
+    histories = {
+        tiker: history_to_frame(store.get_history(BOARD, tiker, start, end))
+        for tiker in tikers
+    }
+    return {tiker: df for tiker, df in histories.items() if not df.empty}
+
+
+def _take_lagged(
+    panel: np.ndarray,
+    codes: np.ndarray,
+    positions: np.ndarray,
+    lag: int,
+) -> np.ndarray:
+    """Значение панели lag свечей назад для каждой строки, NaN до начала ряда."""
+    columns = positions - lag
+    return np.where(columns >= 0, panel[codes, np.maximum(columns, 0)], np.nan)
+
+
+def _get_equity(
+    close: np.ndarray,
+    trades: list[tuple[Trade, tuple[int, int]]],
+) -> np.ndarray:
+    """Кривая капитала компании по закрытиям дней, 1 - начальный капитал."""
+    growth = np.ones(len(close))
+    for trade, (entry, exit_row) in trades:
+        prices = np.concatenate(
+            ([trade.entry_price], close[entry:exit_row], [trade.exit_price]),
+        )
+        growth[entry : exit_row + 1] = prices[1:] / prices[:-1]
+    return np.cumprod(growth)
+
+
+def _get_max_drawdown(equity: np.ndarray) -> float:
+    if not equity.size:
+        return 0.0
+    return float(np.max(1 - equity / np.maximum.accumulate(equity)))
@@ -0,0 +1,113 @@
+import datetime
+import logging
+from functools import lru_cache
+from typing import Optional
+
+import redis
+
+from backend.app.schemas.ta import IndicatorSnapshot
+from backend.app.settings import settings
+from backend.app.utils.moex.moex_client import BOARD
+from backend.app.utils.moex.moex_session import get_session_ttl, get_trading_date
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "ta:snapshot"
+REDIS_TIMEOUT = 1
+
+
+@lru_cache
+def get_ta_cache() -> Optional["TASnapshotCache"]:
+    if not settings.ta_cache_url:
+        return None
+    client = redis.Redis.from_url(
+        settings.ta_cache_url,
+        socket_connect_timeout=REDIS_TIMEOUT,
+        socket_timeout=REDIS_TIMEOUT,
+    )
+    return TASnapshotCache(client)
+
+
+class TASnapshotCache:
+    """
+    Общий для всех воркеров кэш индикаторов компаний в Redis.
+
+    Ключ - (board, tiker, timeframe, торговая дата), значение - IndicatorSnapshot.
+    Пока идут торги, запись живет ta_cache_session_ttl секунд, после закрытия -
+    до открытия следующей сессии. Недоступный Redis не мешает расчету: все
+    компании считаются промахом.
+    """
+
+    def __init__(
+        self,
+        client: redis.Redis,
+        session_ttl: int = settings.ta_cache_session_ttl,
+    ):
+        self.client = client
+        self.session_ttl = session_ttl
+
+    @staticmethod
+    def get_key(
+        board: str,
+        tiker: str,
+        period: str,
+        trading_date: datetime.date,
+    ) -> str:
+        return f"{KEY_PREFIX}:{board}:{tiker}:{period}:{trading_date}"
+
+    def get_snapshots(
+        self,
+        tikers: list[str],
+        periods: tuple[str, ...],
+        board: str = BOARD,
+        trading_date: Optional[datetime.date] = None,
+    ) -> dict[str, dict[str, IndicatorSnapshot]]:
+        """Снимки компаний, для которых в кэше есть все нужные таймфреймы."""
+        if not tikers:
+            return {}
+
+        trading_date = trading_date or get_trading_date()
+        keys = [
+            self.get_key(board, tiker, period, trading_date)
+            for tiker in tikers
+            for period in periods
+        ]
+        try:
+            values = self.client.mget(keys)
+        except redis.RedisError as ex:
+            logger.warning(f"TA cache is unavailable: '{ex}'")
+            return {}
+
+        snapshots = {}
+        for index, tiker in enumerate(tikers):
+            tiker_values = values[index * len(periods) : (index + 1) * len(periods)]
+            if all(value is not None for value in tiker_values):
+                snapshots[tiker] = {
+                    period: IndicatorSnapshot.model_validate_json(value)
+                    for period, value in zip(periods, tiker_values)
+                }
+        return snapshots
+
+    def save_snapshots(
+        self,
+        snapshots: dict[str, dict[str, IndicatorSnapshot]],
+        board: str = BOARD,
+        trading_date: Optional[datetime.date] = None,
+    ) -> None:
+        if not snapshots:
+            return
+
+        trading_date = trading_date or get_trading_date()
+        ttl = get_session_ttl(self.session_ttl)
+        try:
+            pipeline = self.client.pipeline(transaction=False)
+            for tiker, periods in snapshots.items():
+                for period, snapshot in periods.items():
+                    pipeline.set(
+                        self.get_key(board, tiker, period, trading_date),
+                        snapshot.model_dump_json(),
+                        ex=ttl,
+                    )
+            pipeline.execute()
+        except redis.RedisError as ex:
+            logger.warning(f"Failed to save TA cache: '{ex}'")
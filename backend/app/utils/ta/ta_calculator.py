@@ -2,6 +2,7 @@ import datetime
 import logging
 import math
 from dataclasses import dataclass
+from functools import lru_cache
 
 import pandas as pd
 import numpy as np
@@ -9,10 +10,37 @@ import pandas_ta as ta  # noqa: F401
 
 from pandas import DataFrame
 
-from backend.app.schemas.company import CompanyDTO
+from backend.app.settings import settings
+from backend.app.schemas.company import CompanyDTO, TAParamsDTO, get_snapshot_key
 from backend.app.schemas.enums import DecisionEnum, CompanyTypeEnum
-from backend.app.schemas.ta import DecisionDTO
+from backend.app.schemas.ta import DecisionDTO, IndicatorSnapshot
 from backend.app.utils.moex.moex_reader import MoexReader
+from backend.app.utils.ta.ta_incremental import (
+    IncrementalIndicators,
+    IndicatorState,
+    IndicatorStateStore,
+)
+from backend.app.utils.ta.ta_panel import (
+    BUY_BORDERS,
+    CONFIRM_PERIODS,
+    DECISION_PERIODS,
+    FIELD_INDICATORS,
+    INDICATOR_NAMES,
+    RULE_INDICATORS,
+    IndicatorPanels,
+    SnapshotPanels,
+    calculate_decisions,
+)
+from backend.app.utils.ta.ta_registry import (
+    compute_indicators,
+    get_columns,
+    get_indicator,
+)
+from backend.app.utils.ta.ta_resampler import (
+    RESAMPLE_PERIODS,
+    is_intraday,
+    resample_ohlc,
+)
 from backend.app.utils.yahoo.yahoo_reader import YahooReader
 
 pd.options.mode.chained_assignment = None
@@ -20,42 +48,127 @@ pd.options.mode.chained_assignment = None
 logger = logging.getLogger(__name__)
 
 
+@lru_cache
+def get_indicator_state_store() -> IndicatorStateStore:
+    return IndicatorStateStore(settings.moex_history_dir)
+
+
 @dataclass
 class Decision:
     decision: DecisionEnum
     df: DataFrame
 
 
-class TACalculator:
-    def generate_ta_indicators(self, df: DataFrame, period: str = "D"):
-        if period == "W":
-            # Функция для определения начала недели с понедельника
-            def week_start(date):  # noqa: WPS430
-                return date - pd.DateOffset(days=date.weekday())
-
-            # Группируем данные по неделям, начиная с понедельника, и вычисляем
-            # необходимые агрегированные значения
-            df = df.groupby(week_start)[["OPEN", "CLOSE", "HIGH", "LOW"]].agg(
-                {"OPEN": "first", "CLOSE": "last", "HIGH": "max", "LOW": "min"},
-            )
-
-            # Удаляем последнюю строку, если она не является полной неделей
-            # if df.index[-1] + pd.DateOffset(weeks=1) > last_row.name:
-            #     df = df.iloc[:-1]
+class IndicatorContext:
+    """
+    Индикаторы одной компании.
 
-        elif period == "M":
+    Каждый индикатор считается один раз на таймфрейм и только когда он
+    нужен, результат переиспользуется всеми правилами принятия решений.
+    """
 
-            def month_start(date):  # noqa: WPS430
-                return date.replace(day=1)
+    def __init__(
+        self,
+        calculator: "TACalculator",
+        df: DataFrame,
+        tiker: str | None = None,
+        params: TAParamsDTO | None = None,
+    ):
+        self.calculator = calculator
+        self.df = df
+        self.tiker = tiker
+        self.params = params or TAParamsDTO()
+        self._indicators: dict[str, dict[str, DataFrame]] = {}
+        self._frames: dict[tuple, DataFrame] = {}
+
+    @property
+    def empty(self) -> bool:
+        return self.df.empty
+
+    @property
+    def snapshot_indicators(self) -> tuple[str, ...]:
+        """Индикаторы снимка: нужные правилам и дополнительные компании."""
+        return tuple(dict.fromkeys((*RULE_INDICATORS, *self.params.indicators)))
+
+    def indicators(
+        self,
+        period: str,
+        indicators: tuple[str, ...] = RULE_INDICATORS,
+    ) -> DataFrame:
+        key = (period, indicators)
+        if key not in self._frames:
+            computed = self._indicators.setdefault(period, {})
+            missing = tuple(name for name in indicators if name not in computed)
+            if missing:
+                computed.update(self._compute(period, missing))
+
+            frames = [computed[name] for name in indicators]
+            self._frames[key] = (
+                DataFrame()
+                if any(frame.empty for frame in frames)
+                else pd.concat(frames, axis=1)
+            )
+        return self._frames[key]
 
-            # Группируем данные по месяцам и вычисляем необходимые агрегированные
-            # значения
-            df = df.groupby(month_start)[["OPEN", "CLOSE", "HIGH", "LOW"]].agg(
-                {"OPEN": "first", "CLOSE": "last", "HIGH": "max", "LOW": "min"},
+    def _compute(
+        self,
+        period: str,
+        indicators: tuple[str, ...],
+    ) -> dict[str, DataFrame]:
+        computed = {}
+        # Инкрементальное состояние ведется только для ADX и Stoch по дневным
+        # свечам и их агрегатам: состояние помнит дату, а не время свечи
+        if (
+            self.tiker
+            and settings.ta_incremental_indicators
+            and not is_intraday(period)
+        ):
+            incremental = tuple(name for name in indicators if name in FIELD_INDICATORS)
+            if incremental:
+                frame = self.calculator.generate_incremental_indicators(
+                    self.tiker,
+                    self.df,
+                    period,
+                    self.params,
+                )
+                computed |= self._split(frame, incremental)
+            indicators = tuple(name for name in indicators if name not in computed)
+
+        if indicators:
+            frame = self.calculator.generate_ta_indicators(
+                self.df,
+                period,
+                self.params.indicator_lengths,
+                indicators,
             )
+            computed |= self._split(frame, indicators)
+        return computed
+
+    @staticmethod
+    def _split(frame: DataFrame, indicators: tuple[str, ...]) -> dict[str, DataFrame]:
+        return {
+            name: (
+                frame[list(get_indicator(name).columns)] if not frame.empty else frame
+            )
+            for name in indicators
+        }
+
+
+class TACalculator:
+    def generate_ta_indicators(
+        self,
+        df: DataFrame,
+        period: str = "D",
+        lengths: dict[str, int] | None = None,
+        indicators: tuple[str, ...] = FIELD_INDICATORS,
+    ):
+        if period in RESAMPLE_PERIODS:
+            # Группируем данные по неделям (начиная с понедельника), по месяцам
+            # или по часовым интервалам и вычисляем агрегированные значения
+            df = resample_ohlc(df, period)
 
-            # Удаляем последнюю строку, если она не является полным месяцем
-            # if df.index[-1] == last_row.name.replace(day=1):
+            # Удаляем последнюю строку, если она не является полным периодом
+            # if df.index[-1] + pd.DateOffset(weeks=1) > last_row.name:
             #     df = df.iloc[:-1]
 
         # print(df)
@@ -63,16 +176,80 @@ class TACalculator:
             return DataFrame()
 
         # return df
-        return self._generate_ta_df(df)
+        return self._generate_ta_df(df, lengths, indicators)
+
+    def generate_incremental_indicators(
+        self,
+        tiker: str,
+        df: DataFrame,
+        period: str = "D",
+        params: TAParamsDTO | None = None,
+    ) -> DataFrame:
+        """
+        Индикаторы на последней свече по сохраненному состоянию.
+
+        Состояние продвигается только новыми свечами, если история не совпадает
+        с состоянием (нет даты последней закрытой свечи) или длинами окон,
+        оно строится заново. Состояния разных длин окон хранятся отдельно.
+        """
+        params = params or TAParamsDTO()
+        if period in RESAMPLE_PERIODS:
+            df = resample_ohlc(df, period)
+
+        if len(df.index) <= 15:
+            return DataFrame()
+
+        store = get_indicator_state_store()
+        key = get_snapshot_key(tiker, params.lengths_key)
+        state = store.load(key, period)
+        lengths = params.indicator_lengths
+        if state is None or any(
+            getattr(state, name) != value for name, value in lengths.items()
+        ):
+            state = IndicatorState(**lengths)
+        engine = IncrementalIndicators(state)
+        last_date = engine.state.last_date
+        if last_date is None or pd.Timestamp(last_date) not in df.index:
+            indicators = engine.rebuild(df)
+        else:
+            indicators = engine.update(df)
+        store.save(key, period, engine.state)
+
+        return indicators
+
+    def rebuild_incremental_indicators(self, tiker: str) -> None:
+        """Сбрасывает состояния тикера, при следующем расчете они построятся с нуля."""
+        get_indicator_state_store().delete_tiker(tiker)
+
+    def get_history_start(self, days_diff_month: int = 30 * 31) -> datetime.date:
+        return (datetime.datetime.now() - datetime.timedelta(days_diff_month)).date()
+
+    def get_intraday_start(self) -> datetime.datetime:
+        now = datetime.datetime.now().replace(second=0, microsecond=0)
+        return now - datetime.timedelta(days=settings.moex_intraday_days)
 
     def get_history_data(
         self,
         company: CompanyDTO,
         days_diff_month: int = 30 * 31,
         add_current: bool = True,
+        period: str = "D",
     ):
-        start = (datetime.datetime.now() - datetime.timedelta(days_diff_month)).date()
+        """
+        История компании: дневные свечи или, для 1h/4h, 10-минутные.
+
+        Внутридневные свечи есть только у компаний MOEX.
+        """
         mreader = MoexReader()
+        if is_intraday(period):
+            if company.type != CompanyTypeEnum.MOEX:
+                return DataFrame()
+            return mreader.get_companies_intraday(
+                start=self.get_intraday_start(),
+                tikers=[company.tiker],
+            ).get(company.tiker, DataFrame())
+
+        start = self.get_history_start(days_diff_month)
         return (
             mreader.get_company_history(
                 start=start,
@@ -83,77 +260,364 @@ class TACalculator:
             else YahooReader.get_company_history(self, start=start, tiker=company.tiker)
         )
 
+    def get_histories_data(
+        self,
+        companies: list[CompanyDTO],
+        days_diff_month: int = 30 * 31,
+        add_current: bool = True,
+        period: str = "D",
+    ) -> dict[str, DataFrame]:
+        """История MOEX-компаний, загруженная параллельно одним пакетом."""
+        tikers = [
+            company.tiker
+            for company in companies
+            if company.type == CompanyTypeEnum.MOEX
+        ]
+        if not tikers:
+            return {}
+
+        if is_intraday(period):
+            return MoexReader().get_companies_intraday(
+                start=self.get_intraday_start(),
+                tikers=tikers,
+            )
+
+        return MoexReader().get_companies_history(
+            start=self.get_history_start(days_diff_month),
+            tikers=tikers,
+            add_current=add_current,
+        )
+
     def get_company_ta_decisions(
         self,
         company: CompanyDTO,
         period: str,
+        history: DataFrame | None = None,
     ) -> dict[str, DecisionDTO]:
-        df = self.get_history_data(company)
+        df = (
+            history
+            if history is not None
+            else self.get_history_data(company, period=period)
+        )
         df = df.fillna(value=np.nan)
+        context = IndicatorContext(
+            self,
+            df,
+            tiker=company.tiker,
+            params=company.ta_params,
+        )
         results = {}
 
-        for cur_period in ("M", "W", "D"):
-            if period in {cur_period, "All"}:
-                logger.debug(
-                    f"Start getting period decisions for {company.name}, {cur_period}",
-                )
-                results[cur_period] = self._process_period(df, cur_period, company)
-                decision_name = results[cur_period].decision.name
-                logger.debug(
-                    f"Got period decisions for {cur_period}, {decision_name}",
-                )
+        for cur_period in self._get_decision_periods(company, period):
+            logger.debug(
+                f"Start getting period decisions for {company.name}, {cur_period}",
+            )
+            results[cur_period] = self._process_period(
+                context,
+                cur_period,
+                company,
+            )
+            decision_name = results[cur_period].decision.name
+            logger.debug(
+                f"Got period decisions for {cur_period}, {decision_name}",
+            )
         results_count = len(results)
         logger.debug(f"Return company_ta_decisions results count {results_count}")
         return results
 
-    # Вынесено в отдельный метод для тестирования
-    def _generate_ta_df(self, df: DataFrame):
-        try:
-            df.ta.adx(append=True)
-            df.ta.stoch(append=True)
-            # df.fillna(0, inplace=True)
-            # df.ta.macd(append=True)
+    def get_indicator_snapshots(
+        self,
+        histories: dict[str, DataFrame],
+        periods: tuple[str, ...],
+        companies: list[CompanyDTO] | None = None,
+    ) -> dict[str, dict[str, IndicatorSnapshot]]:
+        """
+        Индикаторы компаний на последней свече, не зависящие от пользователя.
+
+        Ключ результата - CompanyDTO.snapshot_key: компании с другими длинами
+        окон или набором индикаторов получают отдельные снимки. Без companies
+        считаются все тикеры истории с параметрами по умолчанию.
+        Считаются панелью по группам параметров, а при инкрементальных
+        индикаторах или выключенной панели - по каждой компании отдельно.
+        """
+        groups = self._group_by_indicators(histories, companies)
+        use_panel = (
+            settings.ta_panel_decisions and not settings.ta_incremental_indicators
+        )
 
-            return df[
+        snapshots = {}
+        for params, tikers in groups:
+            if use_panel:
+                snapshots |= self._get_panel_snapshots(
+                    {tiker: histories[tiker] for tiker in tikers},
+                    periods,
+                    params,
+                )
+                continue
+
+            for tiker in tikers:
+                df = histories[tiker]
+                context = IndicatorContext(
+                    self,
+                    df.fillna(value=np.nan),
+                    tiker=tiker,
+                    params=params,
+                )
+                key = get_snapshot_key(tiker, params.indicators_key)
+                columns = get_columns(context.snapshot_indicators)
+                snapshots[key] = {}
+                for period in periods:
+                    indicators = context.indicators(
+                        period,
+                        context.snapshot_indicators,
+                    )
+                    last_row = (
+                        indicators.iloc[-1]
+                        if not indicators.empty
+                        else dict.fromkeys(columns, np.nan)
+                    )
+                    snapshots[key][period] = self._make_snapshot(
+                        tiker,
+                        period,
+                        df,
+                        computed=not indicators.empty,
+                        values={name: last_row[name] for name in columns},
+                        indicators_key=params.indicators_key,
+                    )
+        return snapshots
+
+    def get_snapshot_ta_decisions(
+        self,
+        companies: list[CompanyDTO],
+        period: str,
+        snapshots: dict[str, dict[str, IndicatorSnapshot]],
+    ) -> dict[str, dict[str, DecisionDTO]]:
+        """
+        Решения пользователя по готовым индикаторам компаний.
+
+        От компании зависят стопы, границы и периоды из ta_params, снимки
+        ищутся по CompanyDTO.snapshot_key.
+        Компании без снимков получают UNKNOWN, как при пустой истории.
+        """
+        company_snapshots = {
+            company.tiker: snapshots.get(company.snapshot_key, {})
+            for company in companies
+        }
+        panels = SnapshotPanels(company_snapshots)
+        rows = {tiker: row for row, tiker in enumerate(panels.tikers)}
+        params = [company.ta_params for company in companies]
+        bottom_border = np.array([param.bottom_border for param in params])
+        top_border = np.array([param.top_border for param in params])
+        results = {company.tiker: {} for company in companies}
+
+        for cur_period in DECISION_PERIODS[period]:
+            buy_border = np.array(
                 [
-                    "STOCHk_14_3_3",
-                    "STOCHd_14_3_3",
-                    "ADX_14",
-                    "DMP_14",
-                    "DMN_14",
-                    # "MACD_12_26_9",
-                    # "MACDh_12_26_9",
-                    # "MACDs_12_26_9",
-                ]
-            ].rename(
-                columns={
-                    "STOCHk_14_3_3": "k",
-                    "STOCHd_14_3_3": "d",
-                    "ADX_14": "adx",
-                    "DMP_14": "dmp",
-                    "DMN_14": "dmn",
-                    # "MACD_12_26_9": "macd",
-                    # "MACDh_12_26_9": "macd_h",
-                    # "MACDs_12_26_9": "macd_s",
-                },
+                    (
+                        BUY_BORDERS.get(cur_period, np.nan)
+                        if param.buy_border is None
+                        else param.buy_border
+                    )
+                    for param in params
+                ],
+            )
+            decisions = calculate_decisions(
+                panels,
+                cur_period,
+                bottom_border,
+                top_border,
+                buy_border,
             )
+            for company in companies:
+                if cur_period not in company.ta_params.periods:
+                    continue
+                snapshot = company_snapshots[company.tiker].get(
+                    cur_period,
+                ) or IndicatorSnapshot(tiker=company.tiker, period=cur_period)
+                results[company.tiker][cur_period] = self._process_snapshot_period(
+                    company,
+                    snapshot,
+                    DecisionEnum(decisions[rows[company.tiker]]),
+                )
+        return results
+
+    def _get_panel_snapshots(
+        self,
+        histories: dict[str, DataFrame],
+        periods: tuple[str, ...],
+        params: TAParamsDTO | None = None,
+    ) -> dict[str, dict[str, IndicatorSnapshot]]:
+        params = params or TAParamsDTO()
+        panels = IndicatorPanels(histories, params.indicator_lengths)
+        keys = [
+            get_snapshot_key(tiker, params.indicators_key) for tiker in panels.tikers
+        ]
+        columns = get_columns(dict.fromkeys((*RULE_INDICATORS, *params.indicators)))
+        snapshots = {key: {} for key in keys}
+
+        for period in periods:
+            panel = panels[period]
+            # Как в расчете по компании: без нужного числа свечей индикаторов нет,
+            # даже если короткие окна успели дать значения
+            values = {
+                name: np.where(panel.valid, panel.last(name), np.nan)
+                for name in columns
+            }
+            for row, tiker in enumerate(panel.tikers):
+                snapshots[keys[row]][period] = self._make_snapshot(
+                    tiker,
+                    period,
+                    histories[tiker],
+                    computed=bool(panel.valid[row]),
+                    values={name: value[row] for name, value in values.items()},
+                    indicators_key=params.indicators_key,
+                )
+        return snapshots
+
+    @staticmethod
+    def _group_by_indicators(
+        histories: dict[str, DataFrame],
+        companies: list[CompanyDTO] | None,
+    ) -> list[tuple[TAParamsDTO, list[str]]]:
+        """Тикеры истории, сгруппированные по длинам окон и набору индикаторов."""
+        if companies is None:
+            return [(TAParamsDTO(), list(histories))]
+
+        groups: dict[str, tuple[TAParamsDTO, list[str]]] = {}
+        for company in companies:
+            if company.tiker not in histories:
+                continue
+            params, tikers = groups.setdefault(
+                company.ta_params.indicators_key,
+                (company.ta_params, []),
+            )
+            if company.tiker not in tikers:
+                tikers.append(company.tiker)
+        return list(groups.values())
+
+    @staticmethod
+    def _get_decision_periods(company: CompanyDTO, period: str) -> list[str]:
+        return [
+            cur_period
+            for cur_period in DECISION_PERIODS[period]
+            if cur_period in company.ta_params.periods
+        ]
+
+    def _make_snapshot(  # noqa: WPS211
+        self,
+        tiker: str,
+        period: str,
+        df: DataFrame,
+        computed: bool,
+        values: dict[str, float],
+        indicators_key: str = "",
+    ) -> IndicatorSnapshot:
+        has_data = df.size != 0
+        values = {
+            name: None if math.isnan(value) else float(value)
+            for name, value in values.items()
+        }
+        return IndicatorSnapshot(
+            tiker=tiker,
+            period=period,
+            date=df.index[-1].date() if has_data else None,
+            last_price=self._get_last_price(df) if has_data else None,
+            computed=computed,
+            indicators_key=indicators_key,
+            values={
+                name: value
+                for name, value in values.items()
+                if name not in INDICATOR_NAMES
+            },
+            **{name: values.get(name) for name in INDICATOR_NAMES},
+        )
+
+    # Вынесено в отдельный метод для тестирования
+    def _generate_ta_df(
+        self,
+        df: DataFrame,
+        lengths: dict[str, int] | None = None,
+        indicators: tuple[str, ...] = FIELD_INDICATORS,
+    ):
+        try:
+            if settings.ta_indicator_engine == "pandas_ta":
+                return self._generate_pandas_ta_df(df, lengths, indicators)
+            return self._generate_numpy_ta_df(df, lengths, indicators)
         except Exception as ex:
             logger.error(ex)
             return DataFrame()
 
-    def _get_period_decision(  # noqa: WPS211
+    def _generate_numpy_ta_df(
+        self,
+        df: DataFrame,
+        lengths: dict[str, int] | None = None,
+        indicators: tuple[str, ...] = FIELD_INDICATORS,
+    ) -> DataFrame:
+        high, low, close = (
+            df[column].to_numpy(dtype=np.float64) for column in ("HIGH", "LOW", "CLOSE")
+        )
+        return DataFrame(
+            compute_indicators(
+                indicators,
+                high,
+                low,
+                close,
+                lengths or TAParamsDTO().indicator_lengths,
+            ),
+            index=df.index,
+        )
+
+    def _generate_pandas_ta_df(
         self,
         df: DataFrame,
+        lengths: dict[str, int] | None = None,
+        indicators: tuple[str, ...] = FIELD_INDICATORS,
+    ) -> DataFrame:
+        # pandas_ta считает только ADX и Stoch, остальные индикаторы реестра -
+        # функциями на массивах
+        lengths = lengths or TAParamsDTO().indicator_lengths
+        stoch = "{stoch_k}_{stoch_d}_{stoch_smooth_k}".format(**lengths)
+        adx = lengths["adx_length"]
+        columns = {}
+        if "stoch" in indicators:
+            df.ta.stoch(
+                k=lengths["stoch_k"],
+                d=lengths["stoch_d"],
+                smooth_k=lengths["stoch_smooth_k"],
+                append=True,
+            )
+            columns |= {f"STOCHk_{stoch}": "k", f"STOCHd_{stoch}": "d"}
+        if "adx" in indicators:
+            df.ta.adx(length=adx, append=True)
+            columns |= {f"ADX_{adx}": "adx", f"DMP_{adx}": "dmp", f"DMN_{adx}": "dmn"}
+
+        result = df[list(columns)].rename(columns=columns)
+        others = tuple(name for name in indicators if name not in FIELD_INDICATORS)
+        if others:
+            result = pd.concat(
+                [result, self._generate_numpy_ta_df(df, lengths, others)],
+                axis=1,
+            )
+        return result[list(get_columns(indicators))]
+
+    def _get_context(self, df: DataFrame | IndicatorContext) -> IndicatorContext:
+        if isinstance(df, IndicatorContext):
+            return df
+        return IndicatorContext(self, df)
+
+    def _get_period_decision(  # noqa: WPS211
+        self,
+        df: DataFrame | IndicatorContext,
         period: str,
         skip_check_borders: bool = False,
         bottom_border: float = 25,
         top_border: float = 80,
     ) -> Decision:
-
-        if df.empty:
+        context = self._get_context(df)
+        if context.empty:
             return Decision(decision=DecisionEnum.UNKNOWN, df=None)
 
-        stoch_df = self.generate_ta_indicators(df, period)
+        stoch_df = context.indicators(period)
         if stoch_df.empty:
             return Decision(decision=DecisionEnum.UNKNOWN, df=None)
 
@@ -178,17 +642,18 @@ class TACalculator:
         self,
         company: CompanyDTO,
         period: str,
-        df: DataFrame,
+        df: DataFrame | IndicatorContext,
         last_price: float | None,
     ):
-        # Determine bottom_border based on company.tiker
-        bottom_border = 40 if company.tiker == "LKOH" else 25
+        context = self._get_context(df)
+        params = company.ta_params
 
         # Calculate decision for the given period
         per_decision = self._get_period_decision(
-            df,
+            context,
             period,
-            bottom_border=bottom_border,
+            bottom_border=params.bottom_border,
+            top_border=params.top_border,
         )
 
         # Handle UNKNOWN decision
@@ -200,8 +665,8 @@ class TACalculator:
             )
 
         # Calculate decision for buying
-        if period != "M" and per_decision.decision != DecisionEnum.SELL:
-            need_buy = self._check_buy_decision(df, period)
+        if period in CONFIRM_PERIODS and per_decision.decision != DecisionEnum.SELL:
+            need_buy = self._check_buy_decision(context, period, params.buy_border)
             per_decision.decision = DecisionEnum.BUY if need_buy else DecisionEnum.RELAX
 
         # Prepare TADecisionDTO
@@ -215,31 +680,43 @@ class TACalculator:
             last_price=last_price,
         )
 
-    def _check_buy_decision(self, df: DataFrame, period: str) -> bool:
-        if period == "W":
-            decision_month = self._get_period_decision(df, "M", skip_check_borders=True)
-            decision_week = self._get_period_decision(df, "W", bottom_border=40)
-            return decision_month.decision == decision_week.decision == DecisionEnum.BUY
-
-        elif period == "D":
-            decision_day = self._get_period_decision(df, "D")
-            decision_week = self._get_period_decision(df, "W", skip_check_borders=True)
-            decision_month = self._get_period_decision(df, "M", skip_check_borders=True)
-            return (
-                decision_day.decision
-                == decision_week.decision
-                == decision_month.decision
-                == DecisionEnum.BUY
-            )
+    def _check_buy_decision(
+        self,
+        df: DataFrame | IndicatorContext,
+        period: str,
+        buy_border: float | None = None,
+    ) -> bool:
+        context = self._get_context(df)
+        if buy_border is None:
+            buy_border = BUY_BORDERS.get(period)
+
+        if period not in CONFIRM_PERIODS:
+            return False
 
-        return False
+        decision = self._get_period_decision(
+            context,
+            period,
+            bottom_border=buy_border,
+        )
+        if decision.decision != DecisionEnum.BUY:
+            return False
+        return all(
+            self._get_period_decision(
+                context,
+                confirm_period,
+                skip_check_borders=True,
+            ).decision
+            == DecisionEnum.BUY
+            for confirm_period in CONFIRM_PERIODS[period]
+        )
 
     def _process_period(
         self,
-        df: DataFrame,
+        context: IndicatorContext,
         cur_period: str,
         company: CompanyDTO,
     ) -> DecisionDTO:
+        df = context.df
         if df.size == 0:
             return DecisionDTO(
                 decision=DecisionEnum.UNKNOWN,
@@ -247,21 +724,71 @@ class TACalculator:
                 tiker=company.tiker,
             )
 
-        last_price_value = df.iloc[-1]["CLOSE"]
-        last_price = None if math.isnan(last_price_value) else last_price_value
+        last_price = self._get_last_price(df)
+        stop_decision = self._check_stop_decision(company, cur_period, last_price)
+        if stop_decision:
+            return stop_decision
+        return self._calculate_decision(company, cur_period, context, last_price)
 
-        if last_price:
-            stops_or_none = company.stops or []
-            stop = next(
-                (stop.value for stop in stops_or_none if stop.period == cur_period),
-                None,
-            )
+    def _process_snapshot_period(
+        self,
+        company: CompanyDTO,
+        snapshot: IndicatorSnapshot,
+        decision: DecisionEnum,
+    ) -> DecisionDTO:
+        """То же, что _process_period, для решения по IndicatorSnapshot."""
+        unknown = DecisionDTO(
+            decision=DecisionEnum.UNKNOWN,
+            period=snapshot.period,
+            tiker=company.tiker,
+        )
+        if snapshot.date is None:
+            return unknown
 
-            if stop is not None and last_price <= stop:
-                return DecisionDTO(
-                    tiker=company.tiker,
-                    period=cur_period,
-                    decision=DecisionEnum.SELL,
-                    last_price=last_price,
-                )
-        return self._calculate_decision(company, cur_period, df, last_price)
+        stop_decision = self._check_stop_decision(
+            company,
+            snapshot.period,
+            snapshot.last_price,
+        )
+        if stop_decision:
+            return stop_decision
+
+        if decision == DecisionEnum.UNKNOWN:
+            return unknown
+        return DecisionDTO(
+            tiker=company.tiker,
+            decision=decision,
+            period=snapshot.period,
+            k=snapshot.k,
+            d=snapshot.d,
+            last_price=snapshot.last_price,
+        )
+
+    @staticmethod
+    def _get_last_price(df: DataFrame) -> float | None:
+        last_price = df.iloc[-1]["CLOSE"]
+        return None if last_price is None or math.isnan(last_price) else last_price
+
+    @staticmethod
+    def _check_stop_decision(
+        company: CompanyDTO,
+        cur_period: str,
+        last_price: float | None,
+    ) -> DecisionDTO | None:
+        if not last_price:
+            return None
+
+        stops_or_none = company.stops or []
+        stop = next(
+            (stop.value for stop in stops_or_none if stop.period == cur_period),
+            None,
+        )
+
+        if stop is not None and last_price <= stop:
+            return DecisionDTO(
+                tiker=company.tiker,
+                period=cur_period,
+                decision=DecisionEnum.SELL,
+                last_price=last_price,
+            )
+        return None
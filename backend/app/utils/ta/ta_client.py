@@ -10,3 +10,11 @@ def send_update_db_request(decisions_json: json, user_id: int):
         with httpx.Client(timeout=180) as client:
             response = client.post(api_url, json=decisions_json)
             response.raise_for_status()
+
+
+def send_decision_changes_request(users_decisions_json: json) -> json:
+    api_url = f"{settings.internal_api_url}ta/changes"
+    with httpx.Client(timeout=180) as client:
+        response = client.post(api_url, json=users_decisions_json)
+        response.raise_for_status()
+        return response.json()
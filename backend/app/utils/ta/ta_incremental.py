@@ -0,0 +1,303 @@
+import json
+import math
+import sqlite3
+from contextlib import closing
+from dataclasses import asdict, dataclass, field, replace
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+NAN = float("nan")
+INDICATOR_COLUMNS = ("k", "d", "adx", "dmp", "dmn")
+
+CREATE_SCRIPT = """
+CREATE TABLE IF NOT EXISTS indicator_state (
+    tiker TEXT NOT NULL,
+    period TEXT NOT NULL,
+    state TEXT NOT NULL,
+    PRIMARY KEY (tiker, period)
+) WITHOUT ROWID;
+"""
+
+
+@dataclass(frozen=True)
+class EwmState:
+    """
+    Состояние сглаживания Уайлдера.
+
+    Повторяет pandas ``ewm(alpha=1/length, min_periods=length).mean()``
+    (adjust=True), которым пользуется pandas_ta: взвешенная сумма значений
+    и сумма весов, пропуски только уменьшают веса.
+    """
+
+    num: float = 0.0
+    den: float = 0.0
+    nobs: int = 0
+
+    def update(self, value: float, alpha: float) -> "EwmState":
+        decay = 1 - alpha
+        if math.isnan(value):
+            return EwmState(self.num * decay, self.den * decay, self.nobs)
+        return EwmState(self.num * decay + value, self.den * decay + 1, self.nobs + 1)
+
+    def value(self, min_periods: int) -> float:
+        if self.nobs < min_periods:
+            return NAN
+        return self.num / self.den
+
+
+@dataclass(frozen=True)
+class IndicatorState:
+    """Накопленное состояние ADX и Stoch по закрытым свечам одного таймфрейма."""
+
+    adx_length: int = 14
+    stoch_k: int = 14
+    stoch_d: int = 3
+    stoch_smooth_k: int = 3
+
+    last_date: Optional[str] = None
+    count: int = 0
+    prev_high: float = NAN
+    prev_low: float = NAN
+    prev_close: float = NAN
+
+    highs: tuple = ()
+    lows: tuple = ()
+    stoch_raw: tuple = ()
+    stoch_k_values: tuple = ()
+
+    tr: EwmState = field(default_factory=EwmState)
+    dm_pos: EwmState = field(default_factory=EwmState)
+    dm_neg: EwmState = field(default_factory=EwmState)
+    dx: EwmState = field(default_factory=EwmState)
+
+    values: tuple = (NAN, NAN, NAN, NAN, NAN)
+
+    def push(self, date: str, high: float, low: float, close: float):
+        """Новое состояние с учетом свечи и значения индикаторов на ней."""
+        with np.errstate(all="ignore"):
+            return self._push(date, high, low, close)
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self))
+
+    @classmethod
+    def from_json(cls, state_json: str) -> "IndicatorState":
+        raw = json.loads(state_json)
+        for name in ("tr", "dm_pos", "dm_neg", "dx"):
+            raw[name] = EwmState(**raw[name])
+        for name in ("highs", "lows", "stoch_raw", "stoch_k_values", "values"):
+            raw[name] = tuple(raw[name])
+        return cls(**raw)
+
+    def _push(self, date: str, high: float, low: float, close: float):  # noqa: WPS210
+        high, low, close = np.float64(high), np.float64(low), np.float64(close)
+        alpha = 1 / self.adx_length
+
+        # Stoch
+        highs = (*self.highs, high)[-self.stoch_k :]
+        lows = (*self.lows, low)[-self.stoch_k :]
+        stoch_raw = (*self.stoch_raw, self._get_stoch_raw(highs, lows, close))
+        stoch_raw = stoch_raw[-self.stoch_smooth_k :]
+        stoch_k = _window_mean(stoch_raw, self.stoch_smooth_k)
+        stoch_k_values = (*self.stoch_k_values, stoch_k)[-self.stoch_d :]
+        stoch_d = _window_mean(stoch_k_values, self.stoch_d)
+
+        # ADX
+        if self.count == 0:
+            tr = up = down = NAN
+        else:
+            ranges = [
+                abs(price_range)
+                for price_range in (
+                    high - low,
+                    high - self.prev_close,
+                    self.prev_close - low,
+                )
+                if not np.isnan(price_range)
+            ]
+            tr = max(ranges) if ranges else NAN
+            up = high - self.prev_high
+            down = self.prev_low - low
+
+        tr_state = self.tr.update(float(tr), alpha)
+        dm_pos = self.dm_pos.update(_directional_move(up, down), alpha)
+        dm_neg = self.dm_neg.update(_directional_move(down, up), alpha)
+
+        scale = 100 / np.float64(tr_state.value(self.adx_length))
+        dmp = scale * dm_pos.value(self.adx_length)
+        dmn = scale * dm_neg.value(self.adx_length)
+        dx_state = self.dx.update(float(100 * abs(dmp - dmn) / (dmp + dmn)), alpha)
+        adx = dx_state.value(self.adx_length)
+
+        return replace(
+            self,
+            last_date=date,
+            count=self.count + 1,
+            prev_high=float(high),
+            prev_low=float(low),
+            prev_close=float(close),
+            highs=tuple(map(float, highs)),
+            lows=tuple(map(float, lows)),
+            stoch_raw=tuple(map(float, stoch_raw)),
+            stoch_k_values=tuple(map(float, stoch_k_values)),
+            tr=tr_state,
+            dm_pos=dm_pos,
+            dm_neg=dm_neg,
+            dx=dx_state,
+            values=tuple(float(value) for value in (stoch_k, stoch_d, adx, dmp, dmn)),
+        )
+
+    def _get_stoch_raw(self, highs: tuple, lows: tuple, close: float) -> float:
+        if len(highs) < self.stoch_k or np.isnan(highs).any() or np.isnan(lows).any():
+            return NAN
+        lowest_low = min(lows)
+        highest_high = max(highs)
+        price_range = highest_high - lowest_low
+        if price_range == 0:
+            price_range = np.finfo(float).eps
+        return 100 * (close - lowest_low) / price_range
+
+
+def _window_mean(window: tuple, length: int) -> float:
+    if len(window) < length or np.isnan(window).any():
+        return NAN
+    return sum(window) / length
+
+
+def _directional_move(move: float, opposite: float) -> float:
+    if np.isnan(move):
+        return NAN
+    if move > opposite and move > 0:
+        return float(move)
+    return 0.0
+
+
+class IncrementalIndicators:
+    """
+    Инкрементальный расчет ADX(14) и Stoch(14, 3, 3).
+
+    В состоянии фиксируются только закрытые свечи, последняя свеча (текущий
+    день, неделя или месяц) считается поверх состояния и не сохраняется,
+    поэтому при следующем запуске ее можно пересчитать, если она изменилась.
+    """
+
+    def __init__(self, state: Optional[IndicatorState] = None):
+        self.state = state or IndicatorState()
+
+    def rebuild(self, df: DataFrame) -> DataFrame:
+        """Пересчитывает состояние с нуля по всей истории."""
+        self.state = replace(IndicatorState(), **self._get_params())
+        return self.update(df)
+
+    def update(self, df: DataFrame) -> DataFrame:
+        """
+        Продвигает состояние свечами, которых в нем еще нет.
+
+        Возвращает значения индикаторов на последней свече в формате
+        TACalculator.generate_ta_indicators (одна строка).
+        """
+        new_rows = df
+        if self.state.last_date is not None:
+            new_rows = df[df.index > pd.Timestamp(self.state.last_date)]
+
+        if new_rows.empty:
+            return self._to_frame(self.state, self.state.last_date)
+
+        for date, row in new_rows.iloc[:-1].iterrows():
+            self.state = self.state.push(
+                str(date.date()),
+                row["HIGH"],
+                row["LOW"],
+                row["CLOSE"],
+            )
+
+        last_date = new_rows.index[-1]
+        last_row = new_rows.iloc[-1]
+        current = self.state.push(
+            str(last_date.date()),
+            last_row["HIGH"],
+            last_row["LOW"],
+            last_row["CLOSE"],
+        )
+        return self._to_frame(current, last_date)
+
+    def _get_params(self) -> dict:
+        return {
+            "adx_length": self.state.adx_length,
+            "stoch_k": self.state.stoch_k,
+            "stoch_d": self.state.stoch_d,
+            "stoch_smooth_k": self.state.stoch_smooth_k,
+        }
+
+    @staticmethod
+    def _to_frame(state: IndicatorState, date) -> DataFrame:
+        if date is None:
+            return DataFrame()
+        return DataFrame(
+            [state.values],
+            columns=list(INDICATOR_COLUMNS),
+            index=pd.DatetimeIndex([pd.Timestamp(date)]),
+        )
+
+
+class IndicatorStateStore:
+    """Состояния инкрементальных индикаторов по (tiker, timeframe) в SQLite."""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.path = self.directory / "indicators.sqlite3"
+        self._initialized = False
+
+    def load(self, tiker: str, period: str) -> Optional[IndicatorState]:
+        with closing(self._connect()) as connection:
+            row = connection.execute(
+                "SELECT state FROM indicator_state WHERE tiker = ? AND period = ?",
+                (tiker, period),
+            ).fetchone()
+        return IndicatorState.from_json(row[0]) if row else None
+
+    def save(self, tiker: str, period: str, state: IndicatorState) -> None:
+        with closing(self._connect()) as connection:
+            with connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO indicator_state VALUES (?, ?, ?)",
+                    (tiker, period, state.to_json()),
+                )
+
+    def delete(self, tiker: str, period: Optional[str] = None) -> None:
+        query = "DELETE FROM indicator_state WHERE tiker = ?"
+        params = [tiker]
+        if period:
+            query = f"{query} AND period = ?"
+            params.append(period)
+
+        with closing(self._connect()) as connection:
+            with connection:
+                connection.execute(query, params)
+
+    def delete_tiker(self, tiker: str) -> None:
+        """Все состояния тикера: с длинами по умолчанию и с длинами компаний."""
+        # Ключи с длинами компаний - get_snapshot_key: "{tiker}:{lengths_key}"
+        prefix = f"{tiker}:"
+        with closing(self._connect()) as connection:
+            with connection:
+                connection.execute(
+                    "DELETE FROM indicator_state "
+                    "WHERE tiker = ? OR substr(tiker, 1, ?) = ?",
+                    (tiker, len(prefix), prefix),
+                )
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+        connection = sqlite3.connect(self.path, timeout=30)
+        if not self._initialized:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(CREATE_SCRIPT)
+            self._initialized = True
+        return connection
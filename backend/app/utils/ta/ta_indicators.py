@@ -0,0 +1,339 @@
+"""
+Индикаторы на массивах float64.
+
+Функции принимают массивы формы (..., T): время - последняя ось, по остальным
+осям могут лежать разные компании. Результаты stoch и adx совпадают с pandas_ta
+(df.ta.stoch / df.ta.adx) бит в бит: скользящее среднее и сглаживание
+Уайлдера повторяют рекуррентные формулы pandas rolling().mean() и
+ewm(adjust=True).mean().
+"""
+
+import sys
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+EPSILON = sys.float_info.epsilon
+
+
+def rolling_min(values: np.ndarray, length: int) -> np.ndarray:
+    """Минимум за length значений, NaN пока окно не заполнено или в нем пропуск."""
+    return _rolling(values, length, np.min)
+
+
+def rolling_max(values: np.ndarray, length: int) -> np.ndarray:
+    """Максимум за length значений, NaN пока окно не заполнено или в нем пропуск."""
+    return _rolling(values, length, np.max)
+
+
+def rolling_mean(values: np.ndarray, length: int) -> np.ndarray:
+    """Скользящее среднее, как pandas rolling(length).mean()."""
+    values = _as_array(values)
+    result = np.full(values.shape, np.nan)
+    if values.shape[-1] < length:
+        return result
+
+    totals = _apply_series(values, _running_sum, length)[..., length - 1 :]
+    windows = sliding_window_view(values, length, axis=-1)
+    negative = np.signbit(windows)
+
+    # Поправки pandas: знак среднего не может противоречить знакам значений,
+    # среднее одинаковых значений равно самому значению
+    means = totals / length
+    means = np.where(~negative.any(axis=-1) & (means < 0), 0.0, means)
+    means = np.where(negative.all(axis=-1) & (means > 0), 0.0, means)
+    means = np.where(
+        (windows == windows[..., -1:]).all(axis=-1), values[..., length - 1 :], means
+    )
+
+    result[..., length - 1 :] = np.where(np.isnan(windows).any(axis=-1), np.nan, means)
+    return result
+
+
+def wilder_mean(values: np.ndarray, length: int) -> np.ndarray:
+    """Сглаживание Уайлдера, как pandas ewm(alpha=1/length, min_periods=length)."""
+    values = _as_array(values)
+    # pandas пересчитывает alpha через center of mass
+    decay = 1 - 1 / (1 + (length - 1))
+    weighted = _apply_series(values, _ewm_mean, decay)
+    nobs = np.cumsum(~np.isnan(values), axis=-1)
+    return np.where(nobs >= length, weighted, np.nan)
+
+
+def non_zero_range(high: np.ndarray, low: np.ndarray) -> np.ndarray:
+    """Разность high - low, ряд с нулевым диапазоном сдвигается на EPSILON."""
+    diff = high - low
+    return np.where((diff == 0).any(axis=-1, keepdims=True), diff + EPSILON, diff)
+
+
+def stoch(
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    k: int = 14,
+    d: int = 3,
+    smooth_k: int = 3,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Stochastic Oscillator: линии %K и %D."""
+    high, low, close = (_as_array(values) for values in (high, low, close))
+    raw = stoch_raw(close, rolling_min(low, k), rolling_max(high, k))
+    stoch_k = rolling_mean(raw, smooth_k)
+    stoch_d = rolling_mean(stoch_k, d)
+    return stoch_k, stoch_d
+
+
+def stoch_raw(
+    close: np.ndarray,
+    lowest_low: np.ndarray,
+    highest_high: np.ndarray,
+) -> np.ndarray:
+    """Несглаженный %K по минимуму и максимуму окна."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        raw = 100 * (close - lowest_low)
+        raw /= non_zero_range(highest_high, lowest_low)
+    return raw
+
+
+def adx(
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    length: int = 14,
+    first: np.ndarray | None = None,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Average Directional Index: линии ADX, DMP (+DI) и DMN (-DI).
+
+    first - индекс первой свечи каждого ряда, если ряды дополнены слева NaN.
+    """
+    high, low, close = (_as_array(values) for values in (high, low, close))
+    prev_high, prev_low, prev_close = (_shift(values) for values in (high, low, close))
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        true_range = np.fmax(
+            np.abs(non_zero_range(high, low)),
+            np.fmax(np.abs(high - prev_close), np.abs(prev_close - low)),
+        )
+        if first is None:
+            true_range[..., :1] = np.nan
+        elif true_range.shape[-1]:
+            first = np.minimum(first, true_range.shape[-1] - 1)
+            np.put_along_axis(true_range, first[..., None], np.nan, axis=-1)
+
+        up = high - prev_high
+        down = prev_low - low
+        pos = _zero(((up > down) & (up > 0)) * up)
+        neg = _zero(((down > up) & (down > 0)) * down)
+
+        scale = 100 / wilder_mean(true_range, length)
+        dmp = scale * wilder_mean(pos, length)
+        dmn = scale * wilder_mean(neg, length)
+        dx = 100 * np.abs(dmp - dmn) / (dmp + dmn)
+
+    return wilder_mean(dx, length), dmp, dmn
+
+
+def ema(values: np.ndarray, length: int) -> np.ndarray:
+    """
+    Экспоненциальное среднее, как pandas_ta ema (sma=True).
+
+    Первое значение - простое среднее первых length значений ряда, далее
+    ewm(span=length, adjust=False). NaN слева пропускаются, NaN внутри ряда
+    дают NaN и не меняют среднее.
+    """
+    return _apply_series(_as_array(values), _ema, length)
+
+
+def macd(
+    close: np.ndarray,
+    fast: int = 12,
+    slow: int = 26,
+    signal: int = 9,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """MACD: линия, гистограмма и сигнальная линия."""
+    close = _as_array(close)
+    line = ema(close, fast) - ema(close, slow)
+    signal_line = ema(line, signal)
+    return line, line - signal_line, signal_line
+
+
+def rsi(close: np.ndarray, length: int = 14) -> np.ndarray:
+    """Relative Strength Index со сглаживанием Уайлдера."""
+    change = np.diff(_as_array(close), axis=-1, prepend=np.nan)
+    gain = wilder_mean(np.maximum(change, 0), length)
+    loss = wilder_mean(np.maximum(-change, 0), length)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return 100 * gain / (gain + loss)
+
+
+def bbands(
+    close: np.ndarray,
+    length: int = 20,
+    std: float = 2.0,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Полосы Боллинджера: нижняя, средняя и верхняя (стандартное отклонение с ddof=0)."""
+    close = _as_array(close)
+    mid = rolling_mean(close, length)
+    deviation = _rolling(close, length, np.std)
+    return mid - std * deviation, mid, mid + std * deviation
+
+
+def _as_array(values) -> np.ndarray:
+    return np.ascontiguousarray(values, dtype=np.float64)
+
+
+def _shift(values: np.ndarray) -> np.ndarray:
+    shifted = np.empty_like(values)
+    shifted[..., :1] = np.nan
+    shifted[..., 1:] = values[..., :-1]
+    return shifted
+
+
+def _zero(values: np.ndarray) -> np.ndarray:
+    return np.where(np.abs(values) < EPSILON, 0.0, values)
+
+
+def _rolling(values, length: int, reducer) -> np.ndarray:
+    values = _as_array(values)
+    result = np.full(values.shape, np.nan)
+    if values.shape[-1] >= length:
+        windows = sliding_window_view(values, length, axis=-1)
+        result[..., length - 1 :] = reducer(windows, axis=-1)
+    return result
+
+
+def _apply_series(values: np.ndarray, kernel, param) -> np.ndarray:
+    # Рекуррентные формулы идут по оси времени один раз для всех рядов сразу:
+    # массив (..., T) переставляется в непрерывный (T, N), на каждом шаге
+    # пересчитывается строка значений всех N рядов
+    if not values.size:
+        return np.full(values.shape, np.nan)
+    series = np.ascontiguousarray(values.reshape(-1, values.shape[-1]).T)
+    with np.errstate(invalid="ignore"):
+        result = kernel(series, param)
+    return np.ascontiguousarray(result.T).reshape(values.shape)
+
+
+def _running_sum(values: np.ndarray, length: int) -> np.ndarray:
+    # Сумма окна ведется с компенсацией Кэхэна отдельно для добавляемых
+    # и удаляемых значений - так же, как в pandas
+    present = values == values
+    complete = present.all(axis=1).tolist()
+    totals = np.empty_like(values)
+    total = np.zeros(values.shape[1])
+    add_error = np.zeros_like(total)
+    remove_error = np.zeros_like(total)
+    correction = np.empty_like(total)
+    new_total = np.empty_like(total)
+
+    for index in range(len(values)):
+        if index >= length:
+            removed = index - length
+            np.negative(values[removed], out=correction)
+            correction -= remove_error
+            _compensated_add(
+                total,
+                remove_error,
+                correction,
+                new_total,
+                None if complete[removed] else present[removed],
+            )
+
+        np.subtract(values[index], add_error, out=correction)
+        _compensated_add(
+            total,
+            add_error,
+            correction,
+            new_total,
+            None if complete[index] else present[index],
+        )
+        totals[index] = total
+    return totals
+
+
+def _compensated_add(total, error, correction, new_total, present) -> None:
+    # Шаг суммы Кэхэна на месте; present - маска рядов, где значение есть
+    # (None - значения есть во всех рядах)
+    np.add(total, correction, out=new_total)
+    if present is None:
+        np.subtract(new_total, total, out=error)
+        error -= correction
+        np.copyto(total, new_total)
+        return
+    np.copyto(error, new_total - total - correction, where=present)
+    np.copyto(total, new_total, where=present)
+
+
+def _ewm_mean(values: np.ndarray, decay: float) -> np.ndarray:
+    present = values == values
+    # На шагах, где у всех рядов есть и значение, и среднее, маски не нужны
+    started = np.logical_or.accumulate(present, axis=0).all(axis=1)
+    complete = (present.all(axis=1)[1:] & started[:-1]).tolist()
+    means = np.empty_like(values)
+    weighted = values[0].copy()
+    old_weight = np.ones_like(weighted)
+    mean = np.empty_like(weighted)
+    means[0] = weighted
+
+    for index in range(1, len(values)):
+        value = values[index]
+        if complete[index - 1]:
+            old_weight *= decay
+            np.multiply(old_weight, weighted, out=mean)
+            mean += value
+            mean /= old_weight + 1
+            np.copyto(weighted, mean, where=weighted != value)
+            old_weight += 1
+            means[index] = weighted
+            continue
+
+        has_mean = weighted == weighted
+        has_value = present[index]
+        np.multiply(old_weight, decay, out=old_weight, where=has_mean)
+
+        update = has_mean & has_value
+        mean = (old_weight * weighted + value) / (old_weight + 1)
+        np.copyto(weighted, mean, where=update & (weighted != value))
+        np.add(old_weight, 1, out=old_weight, where=update)
+        # Первое значение после пропусков в начале ряда
+        np.copyto(weighted, value, where=~has_mean & has_value)
+        means[index] = weighted
+    return means
+
+
+def _ema(values: np.ndarray, length: int) -> np.ndarray:
+    size, count = values.shape
+    means = np.full(values.shape, np.nan)
+    alpha = 2 / (length + 1)
+    present = values == values
+    start = present.argmax(axis=0)
+    ready = present.any(axis=0) & (size - start >= length)
+
+    # Затравка - простое среднее первых length значений ряда после NaN слева
+    offsets = np.minimum(start + np.arange(length)[:, None], size - 1)
+    seed = np.take_along_axis(values, offsets, axis=0)
+    ready &= (seed == seed).all(axis=0)
+    if not ready.any():
+        return means
+
+    mean = np.zeros(count)
+    for seed_value in seed:
+        mean += seed_value
+    mean /= length
+
+    seeded = start + length - 1
+    columns = np.flatnonzero(ready)
+    means[seeded[columns], columns] = mean[columns]
+    # После затравки всех рядов без пропусков маски не нужны
+    all_seeded = seeded.max() if ready.all() else size
+    complete = present.all(axis=1).tolist()
+    for index in range(seeded[columns].min() + 1, size):
+        value = values[index]
+        if index > all_seeded and complete[index]:
+            mean = alpha * value + (1 - alpha) * mean
+            means[index] = mean
+            continue
+        update = ready & (index > seeded) & present[index]
+        np.copyto(mean, alpha * value + (1 - alpha) * mean, where=update)
+        np.copyto(means[index], mean, where=update)
+    return means
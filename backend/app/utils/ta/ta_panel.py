@@ -0,0 +1,341 @@
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from backend.app.schemas.company import TAParamsDTO
+from backend.app.schemas.enums import DecisionEnum
+from backend.app.schemas.ta import IndicatorSnapshot
+from backend.app.utils.ta.ta_registry import (
+    compute_indicators,
+    get_column_indicator,
+    get_columns,
+)
+from backend.app.utils.ta.ta_resampler import (
+    OHLC_AGGREGATION,
+    OHLC_COLUMNS,
+    RESAMPLE_PERIODS,
+    period_start_keys,
+)
+
+# Как в TACalculator.generate_ta_indicators: на коротком ряду индикаторов нет
+MIN_PERIOD_ROWS = 15
+
+# Индикаторы, которые нужны правилам принятия решений (имена из ta_registry)
+RULE_INDICATORS = ("stoch",)
+
+# Индикаторы с полями в IndicatorSnapshot, их колонки по умолчанию
+# возвращают TACalculator.generate_ta_indicators и IndicatorPanel.to_frame
+FIELD_INDICATORS = ("stoch", "adx")
+INDICATOR_NAMES = get_columns(FIELD_INDICATORS)
+
+# Таймфреймы, индикаторы которых нужны правилам для решения по периоду
+REQUIRED_PERIODS = {
+    "M": ("M",),
+    "W": ("M", "W"),
+    "D": ("M", "W", "D"),
+    "All": ("M", "W", "D"),
+    "4h": ("4h",),
+    "1h": ("4h", "1h"),
+}
+
+# Таймфреймы, по которым принимаются решения периода
+DECISION_PERIODS = {
+    "M": ("M",),
+    "W": ("W",),
+    "D": ("D",),
+    "All": ("M", "W", "D"),
+    "4h": ("4h",),
+    "1h": ("1h",),
+}
+
+# Старшие таймфреймы, которые подтверждают покупку по таймфрейму периода.
+# Таймфреймы без подтверждения (M, 4h) решают только по своей свече.
+CONFIRM_PERIODS = {
+    "W": ("M",),
+    "D": ("W", "M"),
+    "1h": ("4h",),
+}
+
+BUY, SELL, RELAX, UNKNOWN = (
+    DecisionEnum.BUY.value,
+    DecisionEnum.SELL.value,
+    DecisionEnum.RELAX.value,
+    DecisionEnum.UNKNOWN.value,
+)
+
+
+@dataclass
+class IndicatorPanel:
+    """
+    Индикаторы нескольких компаний одного таймфрейма в массивах (компании, свечи).
+
+    Свечи каждой компании прижаты к правому краю: последний столбец - последняя
+    свеча каждой компании, слева ряды короче дополнены NaN. Пропуски торгов
+    не превращаются в NaN внутри ряда, поэтому значения совпадают с расчетом
+    по одной компании. Индикатор считается для всей панели при первом
+    обращении к любой из его колонок.
+    """
+
+    tikers: list[str]
+    dates: np.ndarray
+    counts: np.ndarray
+    prices: dict[str, np.ndarray]
+    lengths: dict[str, int]
+    indicators: dict[str, np.ndarray] = field(default_factory=dict)
+
+    @classmethod
+    def from_histories(
+        cls,
+        histories: dict[str, DataFrame],
+        period: str = "D",
+        lengths: dict[str, int] | None = None,
+    ) -> "IndicatorPanel":
+        """lengths - длины окон, как TAParamsDTO.indicator_lengths."""
+        lengths = lengths or TAParamsDTO().indicator_lengths
+        tikers = list(histories)
+        frames = [histories[tiker] for tiker in tikers]
+        codes = np.repeat(np.arange(len(tikers)), [len(df.index) for df in frames])
+        frames = [df for df in frames if not df.empty]
+        if not frames:
+            return cls._from_rows(
+                tikers,
+                codes,
+                DataFrame(columns=OHLC_COLUMNS),
+                lengths,
+            )
+
+        rows = pd.concat(frames)[OHLC_COLUMNS]
+        if period in RESAMPLE_PERIODS:
+            keys = period_start_keys(pd.DatetimeIndex(rows.index), period)
+            rows = rows.groupby([codes, keys]).agg(OHLC_AGGREGATION)
+            codes = rows.index.get_level_values(0).to_numpy()
+            rows.index = rows.index.get_level_values(1)
+
+        return cls._from_rows(tikers, codes, rows, lengths)
+
+    @property
+    def valid(self) -> np.ndarray:
+        """Компании, для которых рассчитаны индикаторы."""
+        return self.counts > MIN_PERIOD_ROWS
+
+    def values(self, name: str) -> np.ndarray:
+        """Колонка индикатора по всем свечам, считается при первом обращении."""
+        if name not in self.indicators:
+            spec = get_column_indicator(name)
+            self.indicators.update(
+                compute_indicators(
+                    (spec.name,),
+                    self.prices["HIGH"],
+                    self.prices["LOW"],
+                    self.prices["CLOSE"],
+                    self.lengths,
+                    first=self.dates.shape[-1] - self.counts,
+                ),
+            )
+        return self.indicators[name]
+
+    def last(self, name: str) -> np.ndarray:
+        """Значение индикатора на последней свече каждой компании."""
+        values = self.values(name)
+        if values.shape[-1] == 0:
+            return np.full(len(self.tikers), np.nan)
+        return values[:, -1]
+
+    def to_frame(
+        self,
+        tiker: str,
+        indicators: tuple[str, ...] = FIELD_INDICATORS,
+    ) -> DataFrame:
+        """Индикаторы одной компании в формате TACalculator.generate_ta_indicators."""
+        row = self.tikers.index(tiker)
+        if not self.valid[row]:
+            return DataFrame()
+
+        start = self.dates.shape[-1] - self.counts[row]
+        return DataFrame(
+            {name: self.values(name)[row, start:] for name in get_columns(indicators)},
+            index=pd.DatetimeIndex(self.dates[row, start:]),
+        )
+
+    @classmethod
+    def _from_rows(
+        cls,
+        tikers: list[str],
+        codes: np.ndarray,
+        rows: DataFrame,
+        lengths: dict[str, int],
+    ) -> "IndicatorPanel":
+        # rows отсортированы по компании, внутри компании - по дате
+        counts = np.bincount(codes, minlength=len(tikers))
+        width = int(counts.max()) if len(tikers) else 0
+        starts = np.cumsum(counts) - counts
+        columns = width - counts[codes] + np.arange(len(codes)) - starts[codes]
+
+        def to_panel(values: np.ndarray, fill) -> np.ndarray:
+            panel = np.full((len(tikers), width), fill, dtype=values.dtype)
+            panel[codes, columns] = values
+            return panel
+
+        return cls(
+            tikers=tikers,
+            dates=to_panel(rows.index.to_numpy(dtype="datetime64[ns]"), "NaT"),
+            counts=counts,
+            prices={
+                column: to_panel(rows[column].to_numpy(dtype=np.float64), np.nan)
+                for column in ("HIGH", "LOW", "CLOSE")
+            },
+            lengths=lengths,
+        )
+
+
+class IndicatorPanels:
+    """Панели по таймфреймам, каждая строится при первом обращении."""
+
+    def __init__(
+        self,
+        histories: dict[str, DataFrame],
+        lengths: dict[str, int] | None = None,
+    ):
+        self.histories = histories
+        self.lengths = lengths
+        self._panels: dict[str, IndicatorPanel] = {}
+
+    @property
+    def tikers(self) -> list[str]:
+        return list(self.histories)
+
+    def __getitem__(self, period: str) -> IndicatorPanel:
+        if period not in self._panels:
+            self._panels[period] = IndicatorPanel.from_histories(
+                self.histories,
+                period,
+                self.lengths,
+            )
+        return self._panels[period]
+
+
+class SnapshotPanel:
+    """Последние свечи компаний одного таймфрейма из IndicatorSnapshot."""
+
+    def __init__(self, tikers: list[str], snapshots: list[IndicatorSnapshot | None]):
+        self.tikers = tikers
+        self.snapshots = snapshots
+        self.valid = np.array(
+            [snapshot is not None and snapshot.computed for snapshot in snapshots],
+            dtype=bool,
+        )
+        self._values: dict[str, np.ndarray] = {}
+
+    def last(self, name: str) -> np.ndarray:
+        if name not in self._values:
+            self._values[name] = np.array(
+                [_get_snapshot_value(snapshot, name) for snapshot in self.snapshots],
+                dtype=np.float64,
+            )
+        return self._values[name]
+
+
+class SnapshotPanels:
+    """
+    Панели последних свечей по таймфреймам.
+
+    Правила принятия решений смотрят только на последнюю свечу, поэтому
+    их можно применить к сохраненным IndicatorSnapshot без истории.
+    """
+
+    def __init__(self, snapshots: dict[str, dict[str, IndicatorSnapshot]]):
+        self.snapshots = snapshots
+        self._panels: dict[str, SnapshotPanel] = {}
+
+    @property
+    def tikers(self) -> list[str]:
+        return list(self.snapshots)
+
+    def __getitem__(self, period: str) -> SnapshotPanel:
+        if period not in self._panels:
+            self._panels[period] = SnapshotPanel(
+                self.tikers,
+                [self.snapshots[tiker].get(period) for tiker in self.tikers],
+            )
+        return self._panels[period]
+
+
+def _get_snapshot_value(snapshot: IndicatorSnapshot | None, name: str) -> float:
+    if snapshot is None:
+        value = None
+    elif name in INDICATOR_NAMES:
+        value = getattr(snapshot, name)
+    else:
+        value = snapshot.values.get(name)
+    return np.nan if value is None else value
+
+
+def get_period_decisions(
+    panel: IndicatorPanel | SnapshotPanel,
+    skip_check_borders: bool = False,
+    bottom_border: float | np.ndarray = 25,
+    top_border: float | np.ndarray = 80,
+) -> np.ndarray:
+    """Правило TACalculator._get_period_decision для всех компаний панели."""
+    stoch_k, stoch_d = panel.last("k"), panel.last("d")
+    with np.errstate(invalid="ignore"):
+        need_buy = (stoch_d < stoch_k) & (
+            skip_check_borders | (stoch_k < bottom_border)
+        )
+        need_sell = (stoch_d > stoch_k) & (skip_check_borders | (stoch_k > top_border))
+
+    return np.select(
+        [~panel.valid, need_buy, need_sell],
+        [UNKNOWN, BUY, SELL],
+        default=RELAX,
+    )
+
+
+# Граница покупки таймфрейма периода в TACalculator._check_buy_decision
+BUY_BORDERS = {"W": 40, "D": 25, "1h": 25}
+
+
+def check_buy_decisions(
+    panels: IndicatorPanels | SnapshotPanels,
+    period: str,
+    buy_border: float | np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    Правило TACalculator._check_buy_decision для всех компаний панели.
+
+    buy_border заменяет границу покупки таймфрейма периода (для бэктеста).
+    """
+    if buy_border is None:
+        buy_border = BUY_BORDERS.get(period)
+
+    if period not in CONFIRM_PERIODS:
+        return np.zeros(len(panels.tikers), dtype=bool)
+
+    need_buy = get_period_decisions(panels[period], bottom_border=buy_border) == BUY
+    for confirm_period in CONFIRM_PERIODS[period]:
+        decision = get_period_decisions(panels[confirm_period], skip_check_borders=True)
+        need_buy &= decision == BUY
+    return need_buy
+
+
+def calculate_decisions(
+    panels: IndicatorPanels | SnapshotPanels,
+    period: str,
+    bottom_border: float | np.ndarray = 25,
+    top_border: float | np.ndarray = 80,
+    buy_border: float | np.ndarray | None = None,
+) -> np.ndarray:
+    """Решения TACalculator._calculate_decision (без стопов) для всех компаний."""
+    decisions = get_period_decisions(
+        panels[period],
+        bottom_border=bottom_border,
+        top_border=top_border,
+    )
+    if period not in CONFIRM_PERIODS:
+        return decisions
+
+    need_buy = check_buy_decisions(panels, period, buy_border)
+    rewrite = (decisions != UNKNOWN) & (decisions != SELL)
+    return np.where(rewrite, np.where(need_buy, BUY, RELAX), decisions)
@@ -0,0 +1,150 @@
+"""
+Реестр индикаторов.
+
+Индикатор регистрируется под именем вместе с колонками результата и функцией
+расчета на массивах (..., T), как в ta_indicators. Правила принятия решений
+объявляют имена нужных им индикаторов, TACalculator и IndicatorPanel считают
+только их и только при первом обращении: индикатор, добавленный для одной
+стратегии, не считается для остальных компаний.
+"""
+
+from dataclasses import dataclass
+from typing import Callable, Iterable
+
+import numpy as np
+
+from backend.app.utils.ta import ta_indicators
+
+# Длины окон индикаторов, которых нет в TAParamsDTO.indicator_lengths
+DEFAULT_LENGTHS = {
+    "macd_fast": 12,
+    "macd_slow": 26,
+    "macd_signal": 9,
+    "rsi_length": 14,
+    "bbands_length": 20,
+    "bbands_std": 2,
+}
+
+
+@dataclass(frozen=True)
+class IndicatorSpec:
+    """
+    Индикатор реестра.
+
+    compute(high, low, close, lengths, first) возвращает массивы в порядке
+    columns. first - индекс первой свечи каждого ряда, если ряды дополнены
+    слева NaN (панель), иначе None.
+    """
+
+    name: str
+    columns: tuple[str, ...]
+    compute: Callable[..., tuple[np.ndarray, ...]]
+
+
+INDICATORS: dict[str, IndicatorSpec] = {}
+COLUMN_INDICATORS: dict[str, str] = {}
+
+
+def register_indicator(name: str, columns: tuple[str, ...]):
+    """Декоратор: регистрирует функцию расчета индикатора."""
+
+    def decorator(compute):
+        for column in columns:
+            owner = COLUMN_INDICATORS.get(column)
+            if owner is not None and owner != name:
+                raise ValueError(f"Колонка {column} уже есть у индикатора {owner}")
+
+        INDICATORS[name] = IndicatorSpec(name=name, columns=columns, compute=compute)
+        COLUMN_INDICATORS.update(dict.fromkeys(columns, name))
+        return compute
+
+    return decorator
+
+
+def get_indicator(name: str) -> IndicatorSpec:
+    try:
+        return INDICATORS[name]
+    except KeyError:
+        raise ValueError(f"Неизвестный индикатор: {name}") from None
+
+
+def get_column_indicator(column: str) -> IndicatorSpec:
+    """Индикатор, который считает колонку."""
+    try:
+        return INDICATORS[COLUMN_INDICATORS[column]]
+    except KeyError:
+        raise ValueError(f"Неизвестная колонка индикатора: {column}") from None
+
+
+def get_columns(names: Iterable[str]) -> tuple[str, ...]:
+    """Колонки индикаторов в порядке имен."""
+    return tuple(column for name in names for column in get_indicator(name).columns)
+
+
+def compute_indicators(  # noqa: WPS211
+    names: Iterable[str],
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    lengths: dict[str, int],
+    first: np.ndarray | None = None,
+) -> dict[str, np.ndarray]:
+    """Колонки перечисленных индикаторов."""
+    values = {}
+    for name in dict.fromkeys(names):
+        spec = get_indicator(name)
+        values.update(
+            zip(spec.columns, spec.compute(high, low, close, lengths, first)),
+        )
+    return values
+
+
+def _get_length(lengths: dict[str, int], name: str) -> int:
+    return lengths.get(name, DEFAULT_LENGTHS.get(name))
+
+
+@register_indicator("stoch", ("k", "d"))
+def _stoch(high, low, close, lengths, first=None):
+    return ta_indicators.stoch(
+        high,
+        low,
+        close,
+        k=lengths["stoch_k"],
+        d=lengths["stoch_d"],
+        smooth_k=lengths["stoch_smooth_k"],
+    )
+
+
+@register_indicator("adx", ("adx", "dmp", "dmn"))
+def _adx(high, low, close, lengths, first=None):
+    return ta_indicators.adx(
+        high,
+        low,
+        close,
+        length=lengths["adx_length"],
+        first=first,
+    )
+
+
+@register_indicator("macd", ("macd", "macd_h", "macd_s"))
+def _macd(high, low, close, lengths, first=None):
+    return ta_indicators.macd(
+        close,
+        fast=_get_length(lengths, "macd_fast"),
+        slow=_get_length(lengths, "macd_slow"),
+        signal=_get_length(lengths, "macd_signal"),
+    )
+
+
+@register_indicator("rsi", ("rsi",))
+def _rsi(high, low, close, lengths, first=None):
+    return (ta_indicators.rsi(close, length=_get_length(lengths, "rsi_length")),)
+
+
+@register_indicator("bbands", ("bb_lower", "bb_mid", "bb_upper"))
+def _bbands(high, low, close, lengths, first=None):
+    return ta_indicators.bbands(
+        close,
+        length=_get_length(lengths, "bbands_length"),
+        std=_get_length(lengths, "bbands_std"),
+    )
@@ -0,0 +1,40 @@
+import pandas as pd
+from pandas import DataFrame
+
+OHLC_COLUMNS = ["OPEN", "CLOSE", "HIGH", "LOW"]
+OHLC_AGGREGATION = {"OPEN": "first", "CLOSE": "last", "HIGH": "max", "LOW": "min"}
+
+# Сдвиг от даты до начала периода в днях
+PERIOD_START_OFFSETS = {
+    "W": lambda index: index.weekday,  # неделя начинается с понедельника
+    "M": lambda index: index.day - 1,
+}
+
+# Внутридневные таймфреймы из 10-минутных свечей, интервалы считаются от полуночи
+INTRADAY_FREQUENCIES = {"1h": "1h", "4h": "4h"}
+
+# Таймфреймы, которые строятся агрегированием свечей истории
+RESAMPLE_PERIODS = frozenset((*PERIOD_START_OFFSETS, *INTRADAY_FREQUENCIES))
+
+
+def is_intraday(period: str) -> bool:
+    return period in INTRADAY_FREQUENCIES
+
+
+def period_start_keys(index: pd.DatetimeIndex, period: str) -> pd.DatetimeIndex:
+    """
+    Начало периода (недели, месяца или часового интервала) для каждой даты индекса.
+
+    Считается целиком на массиве дат, без вызова python-функции на каждую строку.
+    """
+    if is_intraday(period):
+        return index.floor(INTRADAY_FREQUENCIES[period])
+
+    offset = PERIOD_START_OFFSETS[period](index)
+    return (index - pd.to_timedelta(offset, unit="D")).rename(index.name)
+
+
+def resample_ohlc(df: DataFrame, period: str) -> DataFrame:
+    """Агрегирует дневные свечи в недельные или месячные, 10-минутные - в 1h/4h."""
+    keys = period_start_keys(df.index, period)
+    return df.groupby(keys)[OHLC_COLUMNS].agg(OHLC_AGGREGATION)
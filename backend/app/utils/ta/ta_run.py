@@ -0,0 +1,264 @@
+import datetime
+import json
+import logging
+from functools import lru_cache
+from typing import Callable, Optional
+
+import redis
+from redis import asyncio as redis_asyncio
+
+from backend.app.schemas.enums import TAGenerateStageEnum
+from backend.app.schemas.ta import DecisionDTO, TAGenerateProgress, TARunStatus
+from backend.app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "ta:run"
+REDIS_TIMEOUT = 1
+# Дольше ожидание события не длится, поэтому и таймаут сокета больше
+MAX_WAIT_SECONDS = 60
+MAX_EVENTS = 1000
+
+
+@lru_cache
+def get_ta_run_tracker() -> Optional["TARunTracker"]:
+    if not settings.ta_run_url:
+        return None
+    client = redis.Redis.from_url(
+        settings.ta_run_url,
+        socket_connect_timeout=REDIS_TIMEOUT,
+        socket_timeout=MAX_WAIT_SECONDS + REDIS_TIMEOUT,
+        decode_responses=True,
+    )
+    return TARunTracker(client)
+
+
+@lru_cache
+def get_ta_run_reader() -> Optional["TARunReader"]:
+    if not settings.ta_run_url:
+        return None
+    client = redis_asyncio.Redis.from_url(
+        settings.ta_run_url,
+        socket_connect_timeout=REDIS_TIMEOUT,
+        socket_timeout=MAX_WAIT_SECONDS + REDIS_TIMEOUT,
+        decode_responses=True,
+    )
+    return TARunReader(client)
+
+
+class TARunTracker:
+    """
+    Ход расчета TA в Redis: счетчики, время этапов и готовые решения.
+
+    Идентификатор расчета - id задачи запуска. Счетчики хранятся в hash и
+    увеличиваются атомарно из параллельных задач, решения пользователей
+    добавляются в список по мере готовности. Каждое изменение пишет событие в
+    stream, на котором ждет long-poll запрос статуса (TARunReader). Недоступный Redis не
+    мешает расчету: ход расчета просто не сохраняется.
+    """
+
+    def __init__(self, client: redis.Redis, ttl: int = settings.ta_run_ttl):
+        self.client = client
+        self.ttl = ttl
+
+    @staticmethod
+    def get_key(run_id: str, suffix: str = "") -> str:
+        key = f"{KEY_PREFIX}:{run_id}"
+        return f"{key}:{suffix}" if suffix else key
+
+    def start_run(self, run_id: str, progress: TAGenerateProgress) -> None:
+        progress = progress.model_copy(update={"started_at": _now()})
+        fields = progress.model_dump(mode="json", exclude_none=True)
+        self._update(
+            run_id,
+            lambda pipeline: pipeline.hset(self.get_key(run_id), mapping=fields),
+        )
+
+    def add_chunk(
+        self,
+        run_id: str,
+        tikers: int,
+        computed: int,
+        seconds: float,
+    ) -> None:
+        def commands(pipeline):
+            key = self.get_key(run_id)
+            pipeline.hincrby(key, "processed_chunks", 1)
+            pipeline.hincrby(key, "processed_tikers", tikers)
+            pipeline.hincrby(key, "failed_tikers", tikers - computed)
+            pipeline.hincrbyfloat(key, "indicators_seconds", seconds)
+
+        self._update(run_id, commands)
+
+    def start_decisions(self, run_id: str) -> None:
+        self._update(
+            run_id,
+            lambda pipeline: pipeline.hset(
+                self.get_key(run_id),
+                "stage",
+                TAGenerateStageEnum.DECISIONS.value,
+            ),
+        )
+
+    def add_user_decisions(
+        self,
+        run_id: str,
+        user_id: int,
+        decisions: Optional[list[DecisionDTO]],
+        seconds: float,
+        processed: bool = True,
+        unchanged: int = 0,
+    ) -> None:
+        """
+        Решения пользователя, None - расчет для пользователя не удался.
+
+        processed=False - часть решений пользователя (по одной пачке тикеров),
+        обработанные пользователи отмечаются при завершении расчета.
+        unchanged - сколько решений совпало с сохраненными.
+        """
+
+        def commands(pipeline):
+            key = self.get_key(run_id)
+            if processed:
+                pipeline.hincrby(key, "processed_users", 1)
+            pipeline.hincrbyfloat(key, "decisions_seconds", seconds)
+            if decisions is None:
+                pipeline.hincrby(key, "failed_users", 1)
+                return
+            pipeline.hincrby(key, "decisions", len(decisions))
+            if unchanged:
+                pipeline.hincrby(key, "unchanged_decisions", unchanged)
+            pipeline.rpush(
+                self.get_key(run_id, "decisions"),
+                json.dumps(
+                    {
+                        "user_id": user_id,
+                        "decisions": [dec.model_dump(mode="json") for dec in decisions],
+                    },
+                ),
+            )
+
+        self._update(run_id, commands)
+
+    def finish_run(self, run_id: str, processed_users: Optional[int] = None) -> None:
+        fields = {
+            "stage": TAGenerateStageEnum.DONE.value,
+            "finished_at": _now().isoformat(),
+        }
+        if processed_users is not None:
+            fields["processed_users"] = processed_users
+        self._update(
+            run_id,
+            lambda pipeline: pipeline.hset(self.get_key(run_id), mapping=fields),
+        )
+
+    def get_run(self, run_id: str, offset: int = 0) -> Optional[TARunStatus]:
+        try:
+            pipeline = self.client.pipeline(transaction=False)
+            _read_run(pipeline, run_id, offset)
+            fields, decisions, events = pipeline.execute()
+        except redis.RedisError as ex:
+            logger.warning(f"TA run tracker is unavailable: '{ex}'")
+            return None
+        return _parse_run(run_id, offset, fields, decisions, events)
+
+    def _update(self, run_id: str, commands: Callable) -> None:
+        keys = [self.get_key(run_id, suffix) for suffix in ("", "decisions", "events")]
+        try:
+            pipeline = self.client.pipeline(transaction=False)
+            commands(pipeline)
+            pipeline.xadd(keys[2], {"run_id": run_id}, maxlen=MAX_EVENTS)
+            for key in keys:
+                pipeline.expire(key, self.ttl)
+            pipeline.execute()
+        except redis.RedisError as ex:
+            logger.warning(f"Failed to save TA run progress: '{ex}'")
+
+
+class TARunReader:
+    """
+    Чтение хода расчета для API через redis.asyncio.
+
+    Long-poll ожидание не занимает поток сервера. Решения читаются с offset
+    из предыдущего ответа, поэтому каждый ответ содержит только новые.
+    """
+
+    def __init__(self, client: redis_asyncio.Redis):
+        self.client = client
+
+    async def get_run(self, run_id: str, offset: int = 0) -> Optional[TARunStatus]:
+        try:
+            pipeline = self.client.pipeline(transaction=False)
+            _read_run(pipeline, run_id, offset)
+            fields, decisions, events = await pipeline.execute()
+        except redis.RedisError as ex:
+            logger.warning(f"TA run tracker is unavailable: '{ex}'")
+            return None
+        return _parse_run(run_id, offset, fields, decisions, events)
+
+    async def wait_run(
+        self,
+        run_id: str,
+        cursor: Optional[str] = None,
+        timeout: float = MAX_WAIT_SECONDS,
+        offset: int = 0,
+    ) -> Optional[TARunStatus]:
+        """
+        Статус расчета после события новее cursor (long-poll).
+
+        Без cursor статус возвращается сразу. Если новых событий нет и расчет
+        не завершен, ожидание длится не дольше timeout секунд.
+        """
+        status = await self.get_run(run_id, offset)
+        if status is not None and (
+            cursor is None
+            or status.cursor != cursor
+            or status.progress.stage == TAGenerateStageEnum.DONE
+        ):
+            return status
+
+        try:
+            await self.client.xread(
+                {TARunTracker.get_key(run_id, "events"): cursor or "0-0"},
+                count=1,
+                block=int(min(timeout, MAX_WAIT_SECONDS) * 1000) or 1,
+            )
+        except redis.RedisError as ex:
+            logger.warning(f"TA run tracker is unavailable: '{ex}'")
+            return status
+
+        return await self.get_run(run_id, offset)
+
+
+def _read_run(pipeline, run_id: str, offset: int) -> None:
+    # Счетчики, решения после offset и последнее событие
+    pipeline.hgetall(TARunTracker.get_key(run_id))
+    pipeline.lrange(TARunTracker.get_key(run_id, "decisions"), offset, -1)
+    pipeline.xrevrange(TARunTracker.get_key(run_id, "events"), count=1)
+
+
+def _parse_run(
+    run_id: str,
+    offset: int,
+    fields: dict,
+    decisions: list[str],
+    events: list,
+) -> Optional[TARunStatus]:
+    if not fields:
+        return None
+
+    status = TARunStatus(
+        id=run_id,
+        cursor=events[0][0] if events else None,
+        offset=offset + len(decisions),
+        progress=TAGenerateProgress.model_validate(fields),
+    )
+    for item in map(json.loads, decisions):
+        status.decisions.setdefault(item["user_id"], []).extend(
+            DecisionDTO.model_validate(dec) for dec in item["decisions"]
+        )
+    return status
+
+
+def _now() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
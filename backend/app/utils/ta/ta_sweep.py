@@ -0,0 +1,170 @@
+"""
+Перебор параметров правил принятия решений на истории.
+
+Сетка делится на группы с одинаковыми длинами окон stoch: индикаторы группы
+считаются один раз (BacktestPanels), для каждой комбинации периода, границ
+и стопа заново применяются только правила. Части сетки выполняются в пуле
+процессов; история передается в процесс один раз при его запуске, индикаторы
+кешируются в процессе по длинам окон.
+"""
+
+import itertools
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from backend.app.utils.ta.ta_backtest import STOCH_LENGTHS, Backtest
+
+STOCH_PARAMS = tuple(STOCH_LENGTHS)
+RULE_PARAMS = ("period", "bottom_border", "top_border", "stop_loss")
+SWEEP_PARAMS = (*STOCH_PARAMS, *RULE_PARAMS)
+
+# Метрики, для которых меньшее значение лучше
+LOWER_IS_BETTER = frozenset(("max_drawdown",))
+
+_histories: dict[str, DataFrame] = {}
+
+
+@dataclass
+class SweepGrid:
+    """
+    Значения параметров для перебора, проверяются все сочетания.
+
+    bottom_border None - границы живого расчета с параметрами по умолчанию,
+    stop_loss None - без стопа. В таблице результатов None становится NaN.
+    """
+
+    periods: Sequence[str] = ("D",)
+    bottom_border: Sequence[Optional[float]] = (None,)
+    top_border: Sequence[float] = (80,)
+    stop_loss: Sequence[Optional[float]] = (0.1,)
+    k: Sequence[int] = (STOCH_LENGTHS["k"],)
+    d: Sequence[int] = (STOCH_LENGTHS["d"],)
+    smooth_k: Sequence[int] = (STOCH_LENGTHS["smooth_k"],)
+
+    def get_stoch_lengths(self) -> list[tuple[int, ...]]:
+        return list(itertools.product(self.k, self.d, self.smooth_k))
+
+    def get_rule_params(self) -> list[dict]:
+        return [
+            dict(zip(RULE_PARAMS, values))
+            for values in itertools.product(
+                self.periods,
+                self.bottom_border,
+                self.top_border,
+                self.stop_loss,
+            )
+        ]
+
+    @property
+    def size(self) -> int:
+        return len(self.get_stoch_lengths()) * len(self.get_rule_params())
+
+
+def run_sweep(
+    histories: dict[str, DataFrame],
+    grid: SweepGrid,
+    max_workers: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+) -> DataFrame:
+    """
+    Итоги бэктеста каждой компании для каждого набора параметров сетки.
+
+    По умолчанию сетка делится поровну между процессами, чтобы индикаторы
+    каждой группы считались в как можно меньшем числе процессов.
+    max_workers=1 - без пула, в текущем процессе.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    rule_params = grid.get_rule_params()
+    chunk_size = chunk_size or math.ceil(grid.size / max_workers)
+    tasks = [
+        (lengths, rule_params[start : start + chunk_size])
+        for lengths in grid.get_stoch_lengths()
+        for start in range(0, len(rule_params), chunk_size)
+    ]
+
+    if max_workers == 1 or len(tasks) == 1:
+        _init_worker(histories)
+        try:
+            results = [_run_chunk(*task) for task in tasks]
+        finally:
+            _init_worker({})
+    else:
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_worker,
+            initargs=(histories,),
+        ) as executor:
+            results = list(executor.map(_run_chunk, *zip(*tasks)))
+
+    return pd.concat(results, ignore_index=True)
+
+
+def rank_params(
+    results: DataFrame,
+    by: str = "total_return",
+    min_trades: int = 1,
+) -> DataFrame:
+    """
+    Наборы параметров по среднему по компаниям значению метрики, лучшие сверху.
+
+    Учитываются только компании, у которых было не меньше min_trades сделок.
+    """
+    traded = results[results.trades >= min_trades]
+    table = traded.groupby(list(SWEEP_PARAMS), dropna=False).agg(
+        tikers=("tiker", "count"),
+        trades=("trades", "sum"),
+        hit_rate=("hit_rate", "mean"),
+        mean_return=("mean_return", "mean"),
+        total_return=("total_return", "mean"),
+        max_drawdown=("max_drawdown", "mean"),
+        exposure=("exposure", "mean"),
+    )
+    return table.sort_values(by, ascending=by in LOWER_IS_BETTER).reset_index()
+
+
+def best_params(
+    results: DataFrame,
+    by: str = "total_return",
+    min_trades: int = 3,
+) -> DataFrame:
+    """Лучший набор параметров для каждой компании и периода."""
+    traded = results[results.trades >= min_trades]
+    ranked = traded.sort_values(by, ascending=by in LOWER_IS_BETTER, kind="stable")
+    return (
+        ranked.groupby(["tiker", "period"], sort=False)
+        .head(1)
+        .sort_values(["tiker", "period"])
+        .reset_index(drop=True)
+    )
+
+
+def _init_worker(histories: dict[str, DataFrame]) -> None:
+    global _histories  # noqa: WPS420
+    _histories = histories
+    _get_backtest.cache_clear()
+
+
+@lru_cache(maxsize=4)
+def _get_backtest(lengths: tuple[int, ...]) -> Backtest:
+    return Backtest(_histories, dict(zip(STOCH_PARAMS, lengths)))
+
+
+def _run_chunk(lengths: tuple[int, ...], rule_params: list[dict]) -> DataFrame:
+    backtest = _get_backtest(lengths)
+    frames = []
+    for params in rule_params:
+        summary = backtest.run(**params).drop(columns="period")
+        values = dict(zip(STOCH_PARAMS, lengths)) | params
+        for position, name in enumerate(SWEEP_PARAMS, start=1):
+            value = values[name]
+            summary.insert(position, name, np.nan if value is None else value)
+        frames.append(summary)
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,73 @@
+import logging
+from functools import lru_cache
+from typing import Optional
+
+import redis
+
+from backend.app.schemas.ta import TADigest
+from backend.app.settings import settings
+from backend.app.utils.ta.ta_run import REDIS_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "tg:digest"
+
+
+@lru_cache
+def get_telegram_digests() -> Optional["TelegramDigestStore"]:
+    if not settings.telegram_digest_url:
+        return None
+    client = redis.Redis.from_url(
+        settings.telegram_digest_url,
+        socket_connect_timeout=REDIS_TIMEOUT,
+        socket_timeout=REDIS_TIMEOUT,
+        decode_responses=True,
+    )
+    return TelegramDigestStore(client)
+
+
+class TelegramDigestStore:
+    """
+    Отпечатки последних отправленных дайджестов пользователей в Redis.
+
+    Дайджест с тем же отпечатком, что и прошлый в этот чат, не отправляется.
+    Пустой дайджест тоже запоминается: после него те же сигналы снова
+    считаются изменением. Недоступный Redis не мешает отправке.
+    """
+
+    def __init__(self, client: redis.Redis, ttl: int = settings.telegram_digest_ttl):
+        self.client = client
+        self.ttl = ttl
+
+    @staticmethod
+    def get_key(digest: TADigest) -> str:
+        return f"{KEY_PREFIX}:{digest.chat_id}:{digest.user_id}"
+
+    def get_changed(self, digests: list[TADigest]) -> list[TADigest]:
+        """Дайджесты, которые отличаются от отправленных в прошлый раз."""
+        checked = [digest for digest in digests if digest.fingerprint]
+        if not checked:
+            return digests
+
+        try:
+            sent = self.client.mget([self.get_key(digest) for digest in checked])
+        except redis.RedisError as ex:
+            logger.warning(f"Telegram digest store is unavailable: '{ex}'")
+            return digests
+
+        unchanged = {
+            id(digest)
+            for digest, fingerprint in zip(checked, sent)
+            if digest.fingerprint == fingerprint
+        }
+        return [digest for digest in digests if id(digest) not in unchanged]
+
+    def save(self, digests: list[TADigest]) -> None:
+        try:
+            pipeline = self.client.pipeline(transaction=False)
+            for digest in digests:
+                if digest.fingerprint:
+                    pipeline.set(self.get_key(digest), digest.fingerprint, ex=self.ttl)
+            pipeline.execute()
+        except redis.RedisError as ex:
+            logger.warning(f"Failed to save Telegram digests: '{ex}'")
@@ -1,15 +1,219 @@
+"""
+Отправка сообщений в Telegram.
+
+Отправитель держит один пул соединений httpx на процесс и соблюдает лимиты
+Bot API (token bucket): общий на бота и отдельный на каждый чат. Несколько
+сообщений для чата склеиваются до лимита длины Telegram, слишком длинные
+делятся по строкам. Ответ 429 повторяется после retry_after из ответа.
+Лимиты действуют в пределах процесса воркера, поэтому общий лимит задается
+с учетом числа процессов.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, Iterable, Optional
+
 import httpx
+
 from backend.app.settings import settings
 
+logger = logging.getLogger(__name__)
+
+MAX_MESSAGE_LENGTH = 4096
+MESSAGES_SEPARATOR = "\n"
+
+
+class TokenBucket:
+    """Не больше rate событий в секунду, с запасом capacity для всплеска."""
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1)
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = self.capacity
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Занимает токен, при необходимости ждет; возвращает время ожидания."""
+        with self.lock:
+            now = self.clock()
+            self.tokens = min(
+                self.capacity,
+                self.tokens + (now - self.updated) * self.rate,
+            )
+            self.updated = now
+            # Токен занимается сразу, даже в долг: параллельные вызовы
+            # получают следующие свободные интервалы, а не ждут одновременно
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+
+        if wait:
+            self.sleep(wait)
+        return wait
+
+
+def split_message(text: str, limit: int = MAX_MESSAGE_LENGTH) -> list[str]:
+    """Делит сообщение на части не длиннее limit, по возможности по строкам."""
+    parts = []
+    current = ""
+    for line in text.splitlines(keepends=True):
+        while len(line) > limit:
+            if current:
+                parts.append(current)
+                current = ""
+            parts.append(line[:limit])
+            line = line[limit:]
+        if current and len(current) + len(line) > limit:
+            parts.append(current)
+            current = ""
+        current = f"{current}{line}"
+    if current:
+        parts.append(current)
+    return parts
+
+
+def pack_messages(
+    messages: Iterable[str],
+    limit: int = MAX_MESSAGE_LENGTH,
+) -> list[str]:
+    """Склеивает сообщения в как можно меньшее число частей не длиннее limit."""
+    parts = []
+    for message in filter(None, messages):
+        for part in split_message(message, limit):
+            if parts and len(parts[-1]) + len(MESSAGES_SEPARATOR) + len(part) <= limit:
+                parts[-1] = f"{parts[-1]}{MESSAGES_SEPARATOR}{part}"
+            else:
+                parts.append(part)
+    return parts
+
+
+class TelegramSender:
+    def __init__(  # noqa: WPS211
+        self,
+        bot_token: str,
+        api_url: str = settings.telegram_api_url,
+        global_rate: float = settings.telegram_global_rate,
+        chat_rate: float = settings.telegram_chat_rate,
+        timeout: float = settings.telegram_timeout,
+        retries: int = settings.telegram_retries,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.client = httpx.Client(
+            base_url=f"{api_url.rstrip('/')}/bot{bot_token}",
+            timeout=timeout,
+        )
+        self.chat_rate = chat_rate
+        self.retries = retries
+        self.sleep = sleep
+        self.global_bucket = TokenBucket(global_rate, sleep=sleep)
+        self.chat_buckets: dict[str, TokenBucket] = {}
+        self.lock = threading.Lock()
+
+    def send_message(self, text: str, chat_id: str) -> None:
+        for attempt in range(self.retries + 1):
+            self._get_chat_bucket(chat_id).acquire()
+            self.global_bucket.acquire()
+            response = self.client.post(
+                "/sendMessage",
+                json={"chat_id": chat_id, "text": text, "parse_mode": "Markdown"},
+            )
+            if (
+                response.status_code != httpx.codes.TOO_MANY_REQUESTS
+                or attempt == self.retries
+            ):
+                response.raise_for_status()
+                return
+
+            retry_after = _get_retry_after(response)
+            logger.warning(
+                f"Telegram rate limit for chat {chat_id}, retry after {retry_after}s",
+            )
+            self.sleep(retry_after)
+
+    def send_messages(
+        self,
+        messages: Iterable[str],
+        chat_id: Optional[str] = None,
+    ) -> int:
+        """Отправляет сообщения в чат по порядку, возвращает число отправленных."""
+        parts = pack_messages(messages)
+        for part in parts:
+            self.send_message(part, chat_id or settings.chat_id)
+        return len(parts)
+
+    def send_chats(
+        self,
+        chat_messages: dict[str, list[str]],
+        max_workers: int = settings.telegram_max_workers,
+    ) -> tuple[int, list[str]]:
+        """
+        Чаты обслуживаются параллельно, сообщения одного чата - по порядку.
+
+        Ошибка в одном чате не прерывает отправку в остальные. Возвращает
+        число отправленных сообщений и чаты, отправить в которые не удалось.
+        """
+        if len(chat_messages) <= 1:
+            results = [
+                self._send_chat(chat_id, messages)
+                for chat_id, messages in chat_messages.items()
+            ]
+        else:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                results = list(
+                    executor.map(
+                        lambda item: self._send_chat(*item),
+                        chat_messages.items(),
+                    ),
+                )
+
+        failed = [
+            chat_id for chat_id, sent in zip(chat_messages, results) if sent is None
+        ]
+        return sum(sent for sent in results if sent is not None), failed
+
+    def close(self) -> None:
+        self.client.close()
+
+    def _send_chat(self, chat_id: str, messages: list[str]) -> Optional[int]:
+        try:
+            return self.send_messages(messages, chat_id)
+        except httpx.HTTPError as ex:
+            logger.error(f"Failed to send Telegram messages to chat {chat_id}: '{ex}'")
+            return None
+
+    def _get_chat_bucket(self, chat_id: str) -> TokenBucket:
+        with self.lock:
+            if chat_id not in self.chat_buckets:
+                self.chat_buckets[chat_id] = TokenBucket(
+                    self.chat_rate,
+                    sleep=self.sleep,
+                )
+            return self.chat_buckets[chat_id]
+
+
+def _get_retry_after(response: httpx.Response) -> float:
+    try:
+        return float(response.json()["parameters"]["retry_after"])
+    except (ValueError, KeyError, TypeError):
+        return 1
+
+
+@lru_cache
+def get_telegram_sender() -> TelegramSender:
+    return TelegramSender(settings.bot_token)
+
 
 def send_sync_tg_message(message: str):
     if message:
-        tg_msg = {
-            "chat_id": settings.chat_id,
-            "text": message,
-            "parse_mode": "Markdown",
-        }
-        api_url = f"https://api.telegram.org/bot{settings.bot_token}/sendMessage"
-        with httpx.Client(timeout=180) as client:
-            response = client.post(api_url, json=tg_msg)
-            response.raise_for_status()
+        get_telegram_sender().send_messages([message])
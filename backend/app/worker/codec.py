@@ -0,0 +1,50 @@
+"""
+Кодирование сообщений задач воркера.
+
+TypeAdapter создается один раз на тип: сборка валидатора pydantic дороже
+самой проверки небольшого сообщения. Списки проверяются одним вызовом.
+Формат задается settings.ta_message_format: "json" - строка, "msgpack" -
+bytes (нужен msgpack-сериализатор Celery). Декодирование принимает оба
+формата, поэтому сообщения, отправленные до смены настройки, читаются.
+"""
+
+from functools import lru_cache
+from typing import Any, Iterable, TypeVar
+
+import msgpack
+from pydantic import BaseModel, TypeAdapter
+
+from backend.app.settings import settings
+
+T = TypeVar("T", bound=BaseModel)  # noqa: WPS111
+
+JSON_FORMAT = "json"
+MSGPACK_FORMAT = "msgpack"
+
+
+@lru_cache
+def get_adapter(type_: Any) -> TypeAdapter:
+    return TypeAdapter(type_)
+
+
+def dumps(model: BaseModel) -> str | bytes:
+    if settings.ta_message_format == MSGPACK_FORMAT:
+        return msgpack.packb(model.model_dump(mode="json"))
+    return model.model_dump_json()
+
+
+def loads(payload: str | bytes, type_: type[T]) -> T:
+    if isinstance(payload, (bytes, bytearray)):
+        return get_adapter(type_).validate_python(msgpack.unpackb(payload))
+    return get_adapter(type_).validate_json(payload)
+
+
+def dumps_list(models: Iterable[BaseModel], type_: type[T]) -> str | bytes:
+    adapter = get_adapter(list[type_])
+    if settings.ta_message_format == MSGPACK_FORMAT:
+        return msgpack.packb(adapter.dump_python(list(models), mode="json"))
+    return adapter.dump_json(list(models)).decode()
+
+
+def loads_list(payload: str | bytes, type_: type[T]) -> list[T]:
+    return loads(payload, list[type_])
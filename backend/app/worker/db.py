@@ -0,0 +1,37 @@
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from backend.app.settings import settings
+
+# Каждая async-задача Celery выполняется в своем event loop (см. async_task),
+# поэтому соединения не переиспользуются между задачами.
+engine = create_async_engine(
+    str(settings.db_url),
+    echo=False,
+    poolclass=NullPool,
+)
+
+WorkerSessionLocal = async_sessionmaker(
+    bind=engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+)
+
+
+@asynccontextmanager
+async def worker_session() -> AsyncGenerator[AsyncSession, None]:
+    """Сессия БД для задач воркера, коммитится при успешном завершении."""
+    session = WorkerSessionLocal()
+
+    try:  # noqa: WPS501
+        yield session
+        await session.commit()
+    except Exception:
+        await session.rollback()
+        raise
+    finally:
+        await session.close()
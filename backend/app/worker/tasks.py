@@ -1,132 +1,708 @@
-import json
+import datetime
 import logging
+import time
+from collections import defaultdict
+from typing import Optional
 
+from asgiref.sync import async_to_sync
 from celery import group
-from pydantic import TypeAdapter
 
-from backend.app.utils.ta.ta_client import send_update_db_request
+from backend.app.db.dao.ta_decision_history import TADecisionHistoryDAO
+from backend.app.settings import settings
+from backend.app.utils.ta.ta_client import (
+    send_decision_changes_request,
+    send_update_db_request,
+)
+from backend.app.utils.ta.ta_aggregator import TADecisionAggregator, get_ta_aggregator
+from backend.app.utils.ta.ta_run import TARunTracker, get_ta_run_tracker
 from backend.app.services.ta_service import TAService
-from backend.app.utils.telegram.telegramm_client import send_sync_tg_message
+from backend.app.utils.ta.ta_calculator import TACalculator
+from backend.app.utils.telegram.telegram_digest import get_telegram_digests
+from backend.app.utils.telegram.telegramm_client import get_telegram_sender
+from backend.app.schemas.company import CompanyDTO, TAParamsDTO
+from backend.app.schemas.enums import TAGenerateStageEnum
 from backend.app.schemas.ta import (
-    TAGenerateMessage,
+    IndicatorSnapshot,
+    TAGenerateProgress,
+    TAStartUsersGenerateMessage,
+    TAUsersChunkMessage,
+    TAGenerateChunkMessage,
     TAFinalMessage,
     DecisionDTO,
+    TADecisionChanges,
+    TADigest,
 )
 from backend.app.schemas.ta import TAStartGenerateMessage
+from backend.app.worker import codec
+from backend.app.worker.async_task import async_task
+from backend.app.worker.db import worker_session
 from backend.app.worker.worker import celery_app
 
 logger = logging.getLogger(__name__)
 
 
-@celery_app.task(name="start_generate_task")
+@celery_app.task(name="start_generate_task", bind=True)
 def start_generate_task(
-    message_json: str,
+    self,
+    message_payload: str | bytes,
 ):
-    message: TAStartGenerateMessage = TypeAdapter(TAStartGenerateMessage).validate_json(
-        message_json,
+    """
+    Запуск расчета TA для пользователя в два этапа.
+
+    Сначала группа задач считает индикаторы по уникальным тикерам (без данных
+    пользователя), затем одна задача применяет к ним стопы и портфель
+    пользователя и отправляет результаты. Если доступен Redis для расчетов,
+    решения собираются по мере готовности пачек (ta_chunk_decisions_task).
+    Ход расчета сохраняется под id этой задачи (TARunTracker).
+    """
+    message = codec.loads(message_payload, TAStartGenerateMessage)
+
+    run_id = self.request.id
+    users_message = TAStartUsersGenerateMessage(
+        period=message.period,
+        messages=[message],
     )
+    if _start_stream(run_id, users_message):
+        return
 
-    task_group = group(
-        ta_generate_task.s(
-            TAGenerateMessage(
-                company=company,
-                period=message.period,
-            ).model_dump_json(),
-            message.user_id,
+    tasks = _get_snapshot_tasks(message.companies, message.period, run_id)
+    _start_run(run_id, users=1, companies=message.companies, chunks=len(tasks))
+
+    task_chain = group(tasks) | ta_user_decisions_task.s(message_payload, run_id)
+    task_chain.delay()
+
+
+@celery_app.task(name="start_users_generate_task", bind=True)
+def start_users_generate_task(
+    self,
+    message_payload: str | bytes,
+):
+    """
+    Запуск расчета TA для нескольких пользователей одной задачей.
+
+    Индикаторы считаются один раз по объединению тикеров всех пользователей,
+    затем одна задача применяет их к каждому пользователю.
+    """
+    message = codec.loads(message_payload, TAStartUsersGenerateMessage)
+
+    run_id = self.request.id
+    if _start_stream(run_id, message):
+        return
+
+    companies = _get_tikers(message)
+    tasks = _get_snapshot_tasks(companies, message.period, run_id)
+    _start_run(
+        run_id,
+        users=len(message.messages),
+        companies=companies,
+        chunks=len(tasks),
+    )
+
+    task_chain = group(tasks) | ta_users_decisions_task.s(message_payload, run_id)
+    task_chain.delay()
+
+
+def _start_stream(run_id: str, message: TAStartUsersGenerateMessage) -> bool:
+    """Запуск расчета без chord; False - сборщик решений недоступен."""
+    aggregator = get_ta_aggregator()
+    if not aggregator:
+        return False
+
+    chunks = _get_decisions_chunks(message)
+    users = [_get_final_message(user_message) for user_message in message.messages]
+    if not aggregator.start(run_id, users, len(chunks)):
+        return False
+
+    _start_run(
+        run_id,
+        users=len(message.messages),
+        companies=_get_tikers(message),
+        chunks=len(chunks),
+    )
+    if not chunks:
+        _finish_stream(run_id, aggregator)
+        return True
+
+    group(
+        ta_chunk_decisions_task.s(codec.dumps(chunk), run_id) for chunk in chunks
+    ).delay()
+    ta_stream_watchdog_task.apply_async(
+        (run_id,),
+        countdown=settings.ta_stream_timeout,
+    )
+    return True
+
+
+def _get_decisions_chunks(
+    message: TAStartUsersGenerateMessage,
+) -> list[TAUsersChunkMessage]:
+    # Уникальные снимки без данных пользователей, как в _get_snapshot_tasks
+    companies = [_get_snapshot_company(company) for company in _get_tikers(message)]
+    chunk_size = max(settings.ta_chunk_size, 1)
+    chunk_indexes = {
+        company.snapshot_key: index // chunk_size
+        for index, company in enumerate(companies)
+    }
+
+    # Компании каждого пользователя раскладываются по пачкам их тикеров
+    chunks_users = [defaultdict(list) for _ in range(0, len(companies), chunk_size)]
+    for user_index, user_message in enumerate(message.messages):
+        for company in user_message.companies:
+            chunks_users[chunk_indexes[company.snapshot_key]][user_index].append(
+                company,
+            )
+
+    return [
+        TAUsersChunkMessage(
+            period=message.period,
+            companies=companies[index * chunk_size : (index + 1) * chunk_size],
+            users=[
+                message.messages[user_index].model_copy(
+                    update={"companies": user_companies},
+                )
+                for user_index, user_companies in chunk_users.items()
+            ],
         )
-        for company in message.companies
+        for index, chunk_users in enumerate(chunks_users)
+    ]
+
+
+def _get_tikers(message: TAStartUsersGenerateMessage) -> list[CompanyDTO]:
+    # Первая компания с ключом снимков среди всех пользователей
+    tikers = {}
+    for user_message in message.messages:
+        for company in user_message.companies:
+            tikers.setdefault(company.snapshot_key, company)
+    return list(tikers.values())
+
+
+def _get_snapshot_company(company: CompanyDTO) -> CompanyDTO:
+    # Для снимков нужны только данные тикера, длины окон и набор индикаторов
+    return CompanyDTO(
+        name=company.name,
+        tiker=company.tiker,
+        type=company.type,
+        ta_params=TAParamsDTO(
+            **company.ta_params.indicator_lengths,
+            indicators=company.ta_params.indicators,
+        ),
     )
-    task_chain = task_group | ta_final_task.s(
-        TAFinalMessage(
-            user_id=message.user_id,
-            send_test_message=message.send_test_message,
-            send_message=message.send_message,
-            update_db=message.update_db,
-        ).model_dump_json(),
+
+
+def _get_final_message(message: TAStartGenerateMessage) -> TAFinalMessage:
+    return TAFinalMessage(
+        user_id=message.user_id,
+        send_test_message=message.send_test_message,
+        send_message=message.send_message,
+        update_db=message.update_db,
+        chat_id=message.chat_id,
     )
 
-    task_chain.delay()
 
+def _start_run(
+    run_id: str,
+    users: int,
+    companies: list[CompanyDTO],
+    chunks: int,
+):
+    tracker = get_ta_run_tracker()
+    if tracker:
+        tracker.start_run(
+            run_id,
+            TAGenerateProgress(
+                stage=TAGenerateStageEnum.INDICATORS,
+                users=users,
+                tikers=len({company.tiker for company in companies}),
+                chunks=chunks,
+            ),
+        )
 
-@celery_app.task(name="ta_generate_task")
-def ta_generate_task(
-    message_json: str,
-    user_id: int,
+
+def _get_snapshot_tasks(
+    companies: list[CompanyDTO],
+    period: str,
+    run_id: str | None = None,
+):
+    # В задачи первого этапа попадают только данные тикера и параметры снимков
+    tikers = {
+        company.snapshot_key: _get_snapshot_company(company) for company in companies
+    }
+    unique_companies = list(tikers.values())
+    chunk_size = max(settings.ta_chunk_size, 1)
+
+    return [
+        ta_snapshot_task.s(
+            codec.dumps(
+                TAGenerateChunkMessage(
+                    companies=unique_companies[start : start + chunk_size],
+                    period=period,
+                ),
+            ),
+            run_id,
+        )
+        for start in range(0, len(unique_companies), chunk_size)
+    ]
+
+
+@celery_app.task(name="ta_chunk_decisions_task", ignore_result=True)
+def ta_chunk_decisions_task(
+    message_payload: str | bytes,
+    run_id: str,
 ):
-    message: TAGenerateMessage = TypeAdapter(TAGenerateMessage).validate_json(
-        message_json,
+    """
+    Индикаторы пачки тикеров и решения пользователей по ним.
+
+    Решения сразу сохраняются в БД, решения для сообщений в Telegram
+    складываются в TADecisionAggregator. Задача последней пачки отправляет
+    сообщения и завершает расчет.
+    """
+    message = codec.loads(message_payload, TAUsersChunkMessage)
+
+    tracker = get_ta_run_tracker()
+    aggregator = get_ta_aggregator()
+    try:
+        _process_decisions_chunk(message, run_id, tracker, aggregator)
+    finally:
+        if (
+            aggregator
+            and aggregator.finish_chunk(run_id)
+            and aggregator.claim_finish(run_id)
+        ):
+            _finish_stream(run_id, aggregator)
+
+
+@celery_app.task(name="ta_stream_watchdog_task", ignore_result=True)
+def ta_stream_watchdog_task(run_id: str):
+    """
+    Завершает расчет, пачки которого не закончились за TA_STREAM_TIMEOUT.
+
+    Задача пачки могла погибнуть до finally (OOM, SIGKILL) или не уменьшить
+    счетчик пачек. Тогда сообщения отправляются по уже собранным решениям.
+    Если расчет уже завершила последняя пачка, задача ничего не делает.
+    """
+    aggregator = get_ta_aggregator()
+    if not aggregator or not aggregator.claim_finish(run_id):
+        return
+
+    logger.error(
+        f"TA run {run_id} did not finish in {settings.ta_stream_timeout}s, "
+        f"pending chunks: {aggregator.get_pending_chunks(run_id)}; "
+        f"finishing with collected decisions",
     )
+    _finish_stream(run_id, aggregator)
+
 
+def _process_decisions_chunk(
+    message: TAUsersChunkMessage,
+    run_id: str,
+    tracker: TARunTracker | None,
+    aggregator: TADecisionAggregator | None,
+):
     ta_service = TAService()
-    try:
-        decisions = ta_service.generate_ta_decision(
-            company=message.company,
-            period=message.period,
-        )
-    except Exception as exception:
-        error_message = (
-            f"Failed to generate decisions for company: {message.company.tiker}, "
-            f"user_id: {user_id}, period: {message.period}. "
-            f"Error: '{exception}'"
+    started = time.perf_counter()
+    snapshots = ta_service.get_indicator_snapshots(
+        companies=message.companies,
+        period=message.period,
+    )
+    if tracker:
+        tracker.add_chunk(
+            run_id,
+            tikers=len(message.companies),
+            computed=len(snapshots),
+            seconds=time.perf_counter() - started,
         )
-        logger.error(error_message)
-        decisions = {}
+
+    users_decisions, seconds = _apply_users_decisions(message.users, snapshots)
+    changes = _get_users_changes(message.users, users_decisions)
+    for user_message in message.users:
+        ta_decisions = users_decisions.get(user_message.user_id)
+        user_changes = changes.get(user_message.user_id)
+        changed = user_changes.changed if user_changes else ta_decisions
+        if ta_decisions and user_message.update_db:
+            update_db_task.delay(
+                codec.dumps_list(ta_decisions, DecisionDTO),
+                user_message.user_id,
+            )
+        if changed and user_message.send_message and aggregator:
+            aggregator.add_decisions(
+                run_id,
+                user_message.user_id,
+                ta_service.get_message_decisions(
+                    changed,
+                    user_message.send_test_message,
+                ),
+            )
+        if tracker:
+            tracker.add_user_decisions(
+                run_id,
+                user_message.user_id,
+                ta_decisions,
+                seconds=seconds[user_message.user_id],
+                processed=False,
+                unchanged=user_changes.unchanged if user_changes else 0,
+            )
 
     logger.info(
-        f"Завершена генерация TA для {message.company.name} для пользователя {user_id}",
+        f"Рассчитаны решения по {len(message.companies)} тикерам "
+        f"для {len(message.users)} пользователей",
+    )
+
+
+def _finish_stream(run_id: str, aggregator: TADecisionAggregator):
+    ta_service = TAService()
+    users = 0
+    digests = []
+    for params, ta_decisions in aggregator.pop_decisions(run_id):
+        users += 1
+        if not params.send_message:
+            continue
+        digest = ta_service.build_digest(ta_decisions, params)
+        if digest:
+            digests.append(digest)
+    if digests:
+        send_telegram_digests_task.delay(codec.dumps_list(digests, TADigest))
+
+    tracker = get_ta_run_tracker()
+    if tracker:
+        tracker.finish_run(run_id, processed_users=users)
+    logger.info(f"Завершена генерация TA для {users} пользователей")
+
+
+@celery_app.task(name="ta_snapshot_task")
+def ta_snapshot_task(
+    message_payload: str | bytes,
+    run_id: str | None = None,
+):
+    message = codec.loads(message_payload, TAGenerateChunkMessage)
+
+    started = time.perf_counter()
+    snapshots = TAService().get_indicator_snapshots(
+        companies=message.companies,
+        period=message.period,
+    )
+
+    tracker = get_ta_run_tracker() if run_id else None
+    if tracker:
+        tracker.add_chunk(
+            run_id,
+            tikers=len(message.companies),
+            computed=len(snapshots),
+            seconds=time.perf_counter() - started,
+        )
+    logger.info(f"Рассчитаны индикаторы для {len(snapshots)} тикеров")
+    return codec.dumps_list(
+        (snapshot for periods in snapshots.values() for snapshot in periods.values()),
+        IndicatorSnapshot,
     )
-    return [dec.model_dump_json() for dec in decisions.values()]
 
 
-@celery_app.task(name="ta_final_task")
-def ta_final_task(  # noqa:  WPS210ß
+@celery_app.task(name="ta_user_decisions_task")
+def ta_user_decisions_task(
     results: list,
-    params_json: str,
+    message_payload: str | bytes,
+    run_id: str | None = None,
 ):
-    logging.debug(f"********* Final task params: {params_json}")
-    params: TAFinalMessage = TypeAdapter(TAFinalMessage).validate_json(params_json)
-
-    logger.info("********* Start final task...")
-    ta_decisions = [
-        TypeAdapter(DecisionDTO).validate_json(dec_json)
-        for sublist in results
-        for dec_json in sublist
-    ]
+    message = codec.loads(message_payload, TAStartGenerateMessage)
 
-    if params.send_message:
-        logging.debug(f"********* Final task decisions: {ta_decisions}")
-        messages = TAService().generate_bulk_tg_messages(
+    tracker = get_ta_run_tracker() if run_id else None
+    if tracker:
+        tracker.start_decisions(run_id)
+
+    started = time.perf_counter()
+    ta_decisions = TAService().apply_user_decisions(
+        companies=message.companies,
+        period=message.period,
+        snapshots=_parse_snapshots(results),
+    )
+    logger.info(
+        f"Завершена генерация TA для {len(message.companies)} компаний "
+        f"для пользователя {message.user_id}",
+    )
+
+    params = _get_final_message(message)
+    changes = _get_user_changes(ta_decisions, params)
+    _finish_generation(ta_decisions, params, changes)
+    if tracker:
+        tracker.add_user_decisions(
+            run_id,
+            message.user_id,
             ta_decisions,
-            params.send_test_message,
+            seconds=time.perf_counter() - started,
+            unchanged=changes.unchanged if changes else 0,
         )
-        logging.debug(f"********* Final task messages: {messages}")
-        for message in messages:
-            send_telegram_task.delay(message)
+        tracker.finish_run(run_id)
+    return [dec.model_dump_json() for dec in ta_decisions]
 
-    if params.update_db:
-        logging.info("********* Final task start saving to DB...")
-        decisions_json = [dec.model_dump() for dec in ta_decisions]
-        update_db_task.delay(json.dumps(decisions_json), params.user_id)
 
-    logger.info("********* Finish final task")
+@celery_app.task(name="ta_users_decisions_task")
+def ta_users_decisions_task(
+    results: list,
+    message_payload: str | bytes,
+    run_id: str | None = None,
+):
+    message = codec.loads(message_payload, TAStartUsersGenerateMessage)
+
+    tracker = get_ta_run_tracker() if run_id else None
+    if tracker:
+        tracker.start_decisions(run_id)
+
+    users_decisions, seconds = _apply_users_decisions(
+        message.messages,
+        _parse_snapshots(results),
+    )
+    changes = _get_users_changes(message.messages, users_decisions)
+    decisions_count = 0
+    for user_message in message.messages:
+        user_changes = changes.get(user_message.user_id)
+        ta_decisions = _finish_user_generation(
+            user_message,
+            users_decisions.get(user_message.user_id),
+            user_changes,
+        )
+        decisions_count += len(ta_decisions or [])
+
+        if tracker:
+            tracker.add_user_decisions(
+                run_id,
+                user_message.user_id,
+                ta_decisions,
+                seconds=seconds[user_message.user_id],
+                unchanged=user_changes.unchanged if user_changes else 0,
+            )
+
+    if tracker:
+        tracker.finish_run(run_id)
+    logger.info(
+        f"Завершена генерация TA для {len(message.messages)} пользователей, "
+        f"решений: {decisions_count}",
+    )
+    return decisions_count
+
+
+def _finish_user_generation(
+    user_message: TAStartGenerateMessage,
+    ta_decisions: Optional[list[DecisionDTO]],
+    changes: TADecisionChanges | None,
+) -> Optional[list[DecisionDTO]]:
+    """Сообщения и сохранение решений пользователя; None - расчет не удался."""
+    if ta_decisions is None:
+        return None
+    try:
+        _finish_generation(ta_decisions, _get_final_message(user_message), changes)
+    except Exception as exception:
+        logger.error(
+            f"Failed to finish TA generation for user "
+            f"{user_message.user_id}: '{exception}'",
+        )
+        return None
+    return ta_decisions
+
+
+def _parse_snapshots(results: list) -> dict[str, dict[str, IndicatorSnapshot]]:
+    snapshots = defaultdict(dict)
+    for payload in results:
+        for snapshot in codec.loads_list(payload, IndicatorSnapshot):
+            snapshots[snapshot.snapshot_key][snapshot.period.value] = snapshot
+    return snapshots
+
+
+def _apply_users_decisions(
+    users: list[TAStartGenerateMessage],
+    snapshots: dict[str, dict[str, IndicatorSnapshot]],
+) -> tuple[dict[int, list[DecisionDTO]], dict[int, float]]:
+    """Решения пользователей по готовым индикаторам и время расчета каждого."""
+    ta_service = TAService()
+    users_decisions = {}
+    seconds = {}
+    for user_message in users:
+        started = time.perf_counter()
+        try:
+            users_decisions[user_message.user_id] = ta_service.apply_user_decisions(
+                companies=user_message.companies,
+                period=user_message.period,
+                snapshots=snapshots,
+            )
+        except Exception as exception:
+            logger.error(
+                f"Failed to apply TA decisions for user {user_message.user_id}: "
+                f"'{exception}'",
+            )
+        seconds[user_message.user_id] = time.perf_counter() - started
+    return users_decisions, seconds
+
+
+def _is_changes_only(params: TAStartGenerateMessage | TAFinalMessage) -> bool:
+    # Сравнение нужно только для сообщений, тестовая отправка показывает все решения
+    return (
+        settings.ta_changes_only
+        and not params.send_test_message
+        and params.send_message
+    )
+
 
+def _get_users_changes(
+    users: list[TAStartGenerateMessage],
+    users_decisions: dict[int, list[DecisionDTO]],
+) -> dict[int, TADecisionChanges]:
+    return _get_decision_changes(
+        {
+            user_message.user_id: users_decisions[user_message.user_id]
+            for user_message in users
+            if user_message.user_id in users_decisions
+            and _is_changes_only(user_message)
+        },
+    )
+
+
+def _get_user_changes(
+    ta_decisions: list[DecisionDTO],
+    params: TAFinalMessage,
+) -> TADecisionChanges | None:
+    if not _is_changes_only(params):
+        return None
+    return _get_decision_changes({params.user_id: ta_decisions}).get(params.user_id)
+
+
+def _get_decision_changes(
+    users_decisions: dict[int, list[DecisionDTO]],
+) -> dict[int, TADecisionChanges]:
+    """
+    Изменения решений пользователей относительно сохраненных.
+
+    Прошлые решения всех пользователей читаются одним запросом. Если сравнить
+    не удалось, результат пустой: отправляются все решения.
+    """
+    if not users_decisions:
+        return {}
+
+    try:
+        if settings.ta_update_db_mode == "http":
+            changes = send_decision_changes_request(
+                codec.get_adapter(dict[int, list[DecisionDTO]]).dump_python(
+                    users_decisions,
+                    mode="json",
+                ),
+            )
+            return codec.get_adapter(dict[int, TADecisionChanges]).validate_python(
+                changes,
+            )
+        return async_to_sync(_load_decision_changes)(users_decisions)
+    except Exception as exception:
+        logger.error(f"Failed to compare TA decisions with saved: '{exception}'")
+        return {}
 
-@celery_app.task(name="send_telegram_task")
-def send_telegram_task(
-    message: str,
+
+async def _load_decision_changes(
+    users_decisions: dict[int, list[DecisionDTO]],
+) -> dict[int, TADecisionChanges]:
+    async with worker_session() as session:
+        return await TAService(session).get_decision_changes(users_decisions)
+
+
+def _finish_generation(
+    ta_decisions: list[DecisionDTO],
+    params: TAFinalMessage,
+    changes: TADecisionChanges | None = None,
 ):
-    logger.info(f"Send message: '{message}'")
-    send_sync_tg_message(message)
+    """
+    Записываются все решения (цена и индикаторы обновляются и у неизменившихся),
+    в сообщения попадают только changes.changed, без changes - все решения.
+    """
+    message_decisions = ta_decisions
+    if changes is not None:
+        logger.info(
+            f"Решения TA пользователя {params.user_id}: изменилось "
+            f"{len(changes.changed)}, без изменений {changes.unchanged}, "
+            f"переходы {changes.transitions}",
+        )
+        message_decisions = changes.changed
+
+    if params.send_message:
+        logging.debug(f"********* Final task decisions: {message_decisions}")
+        digest = TAService().build_digest(message_decisions, params)
+        logging.debug(f"********* Final task digest: {digest}")
+        if digest:
+            send_telegram_digests_task.delay(codec.dumps_list([digest], TADigest))
+
+    if params.update_db and ta_decisions:
+        logging.info("********* Final task start saving to DB...")
+        update_db_task.delay(
+            codec.dumps_list(ta_decisions, DecisionDTO),
+            params.user_id,
+        )
 
 
-@celery_app.task(name="update_db_task")
-def update_db_task(
-    decisions_str: str,
+@celery_app.task(name="send_telegram_digests_task")
+def send_telegram_digests_task(
+    digests_payload: str | bytes,
+):
+    """Дайджесты пользователей по их чатам; неизменившиеся не отправляются."""
+    digests = codec.loads_list(digests_payload, TADigest)
+    store = get_telegram_digests()
+    changed = store.get_changed(digests) if store else digests
+
+    chat_messages = defaultdict(list)
+    for digest in changed:
+        if digest.messages:
+            chat_messages[digest.chat_id].extend(digest.messages)
+    sent, failed = get_telegram_sender().send_chats(dict(chat_messages))
+
+    if store:
+        # Дайджесты чатов с ошибкой не запоминаются и уйдут при следующем расчете
+        store.save([digest for digest in changed if digest.chat_id not in failed])
+    if failed:
+        logger.error(f"Failed to send Telegram digests to chats: {failed}")
+    logger.info(
+        f"Sent {sent} Telegram messages to {len(chat_messages) - len(failed)} chats, "
+        f"{len(digests) - len(changed)} digests are unchanged",
+    )
+    return failed
+
+
+@async_task(celery_app, name="update_db_task")
+async def update_db_task(
+    decisions_payload: str | bytes,
     user_id: int,
 ):
-    logger.debug(f"Send update DB message: '{decisions_str}'")
-    decisions_json = json.loads(decisions_str)
-    send_update_db_request(decisions_json, user_id=user_id)
+    logger.debug(f"Send update DB message: '{decisions_payload}'")
+    decisions = codec.loads_list(decisions_payload, DecisionDTO)
+
+    if settings.ta_update_db_mode == "http":
+        send_update_db_request(
+            codec.get_adapter(list[DecisionDTO]).dump_python(decisions, mode="json"),
+            user_id=user_id,
+        )
+        return
+
+    async with worker_session() as session:
+        saved_count = await TAService(session).save_ta_decisions(
+            user_id=user_id,
+            decisions=decisions,
+        )
+    logger.info(f"Сохранено {saved_count} решений TA для пользователя {user_id}")
+
+
+@async_task(celery_app, name="ta_history_cleanup_task")
+async def ta_history_cleanup_task() -> int:
+    if not settings.ta_decision_history_days:
+        return 0
+
+    date = datetime.datetime.utcnow() - datetime.timedelta(
+        days=settings.ta_decision_history_days,
+    )
+    async with worker_session() as session:
+        deleted = await TADecisionHistoryDAO(session).delete_before(date)
+    logger.info(f"Удалено {deleted} решений TA из истории до {date}")
+    return deleted
+
+
+@celery_app.task(name="ta_rebuild_indicators_task", ignore_result=True)
+def ta_rebuild_indicators_task(tikers: list[str]):
+    """Сброс состояний инкрементальных индикаторов после смены длин окон."""
+    ta_calculator = TACalculator()
+    for tiker in tikers:
+        ta_calculator.rebuild_incremental_indicators(tiker)
+    logger.info(f"Сброшены состояния индикаторов TA: {tikers}")
 
 
 @celery_app.task(ignore_result=True)
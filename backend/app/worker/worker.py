@@ -1,5 +1,6 @@
 import logging
 from celery import Celery
+from celery.schedules import crontab
 
 from backend.app.settings import settings
 
@@ -10,3 +11,16 @@ celery_app = Celery("tasks")
 
 celery_app.conf.broker_url = settings.celery_broker_url
 celery_app.conf.result_backend = settings.celery_backend_url
+# Периодические задачи, запускаются отдельным процессом celery beat
+celery_app.conf.beat_schedule = {
+    "ta-history-cleanup": {
+        "task": "ta_history_cleanup_task",
+        "schedule": crontab(hour=settings.ta_history_cleanup_hour, minute=0),
+    },
+}
+
+if settings.ta_message_format == "msgpack":
+    # Сообщения задач кодируются в bytes (backend.app.worker.codec)
+    celery_app.conf.task_serializer = "msgpack"
+    celery_app.conf.result_serializer = "msgpack"
+    celery_app.conf.accept_content = ["json", "msgpack"]
@@ -1,4 +1,5 @@
-from typing import AsyncGenerator, Any
+from pathlib import Path
+from typing import AsyncGenerator, Any, Generator
 
 import pytest
 from celery import Celery
@@ -11,6 +12,12 @@ from sqlmodel.ext.asyncio.session import AsyncSession
 from backend.app.main import app
 from backend.app.db.db import get_session, settings
 from backend.app.db.utils import create_database, drop_database
+from backend.app.settings import settings as app_settings
+from backend.app.utils.moex.moex_reader import get_history_store, get_intraday_store
+from backend.app.utils.ta.ta_cache import get_ta_cache
+from backend.app.utils.ta.ta_aggregator import get_ta_aggregator
+from backend.app.utils.ta.ta_run import get_ta_run_reader, get_ta_run_tracker
+from backend.app.utils.telegram.telegram_digest import get_telegram_digests
 from backend.tests.utils.common import (
     get_superuser_token_headers,
     get_user_token_headers,
@@ -65,6 +72,40 @@ async def dbsession(
         await connection.close()
 
 
+@pytest.fixture(autouse=True)
+def _disable_ta_redis(monkeypatch: pytest.MonkeyPatch) -> Generator[None, None, None]:
+    """Тесты не должны делить кэш, ход расчетов и дайджесты через общий Redis."""
+    monkeypatch.setattr(app_settings, "ta_cache_url", "")
+    monkeypatch.setattr(app_settings, "ta_run_url", "")
+    monkeypatch.setattr(app_settings, "telegram_digest_url", "")
+    clients = (
+        get_ta_cache,
+        get_ta_run_tracker,
+        get_ta_run_reader,
+        get_ta_aggregator,
+        get_telegram_digests,
+    )
+    for get_client in clients:
+        get_client.cache_clear()
+    yield
+    for get_client in clients:
+        get_client.cache_clear()
+
+
+@pytest.fixture(autouse=True)
+def _isolate_moex_history(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+) -> Generator[None, None, None]:
+    """Дневная и 10-минутная история MOEX теста - во временном каталоге."""
+    monkeypatch.setattr(app_settings, "moex_history_dir", tmp_path / "moex_history")
+    for get_store in (get_history_store, get_intraday_store):
+        get_store.cache_clear()
+    yield
+    for get_store in (get_history_store, get_intraday_store):
+        get_store.cache_clear()
+
+
 @pytest.fixture(scope="session")
 def anyio_backend() -> str:
     return "asyncio"
@@ -1,10 +1,14 @@
 import uuid
 
 import pytest
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from backend.app.db.dao.companies import CompanyDAO
 from backend.app.db.dao.ta_decisions import TADecisionDAO
+from backend.app.db.models.ta_decision import TADecisionModel
+from backend.app.schemas.enums import DecisionEnum, PeriodEnum
+from backend.app.schemas.ta import DecisionDTO
 from backend.tests.utils.common import create_test_user, create_test_company
 
 
@@ -98,3 +102,129 @@ async def test_update_stoch_decisions(
     assert ta_decision.k == 0.4
     assert ta_decision.d == 0.6
     assert ta_decision.last_price == 110.0
+
+
+@pytest.mark.anyio
+async def test_bulk_upsert_ta_decisions(
+    dbsession: AsyncSession,
+) -> None:
+    user = await create_test_user(dbsession)
+    company1 = await create_test_company(dbsession, user_id=user.id)
+    company2 = await create_test_company(dbsession, user_id=user.id)
+    other_company = await create_test_company(dbsession)
+
+    decision_dao = TADecisionDAO(dbsession)
+    await decision_dao.update_or_create_ta_decision_model(
+        company1, "D", "BUY", 0.5, 0.3, 100.0
+    )
+    await dbsession.flush()
+
+    count = await decision_dao.bulk_upsert_ta_decisions(
+        user_id=user.id,
+        decisions=[
+            DecisionDTO(
+                tiker=company1.tiker,
+                decision=DecisionEnum.SELL,
+                period=PeriodEnum.DAY,
+                k=90.0,
+                d=95.0,
+                last_price=110.0,
+            ),
+            DecisionDTO(
+                tiker=company1.tiker,
+                decision=DecisionEnum.RELAX,
+                period=PeriodEnum.WEEK,
+            ),
+            DecisionDTO(
+                tiker=company2.tiker,
+                decision=DecisionEnum.BUY,
+                period=PeriodEnum.DAY,
+                k=10.0,
+            ),
+            # Компания другого пользователя пропускается
+            DecisionDTO(
+                tiker=other_company.tiker,
+                decision=DecisionEnum.BUY,
+                period=PeriodEnum.DAY,
+            ),
+            # Неизвестный тикер пропускается
+            DecisionDTO(
+                tiker=uuid.uuid4().hex,
+                decision=DecisionEnum.BUY,
+                period=PeriodEnum.DAY,
+            ),
+        ],
+    )
+    assert count == 3
+
+    rows = await dbsession.execute(
+        select(TADecisionModel)
+        .execution_options(populate_existing=True)
+        .order_by(TADecisionModel.company_id, TADecisionModel.period)
+    )
+    decisions = {(dec.company_id, dec.period): dec for dec in rows.scalars().fetchall()}
+
+    assert len(decisions) == 3
+    updated = decisions[(company1.id, "D")]
+    assert updated.decision == "SELL"
+    assert updated.k == 90.0
+    assert updated.d == 95.0
+    assert updated.last_price == 110.0
+    assert decisions[(company1.id, "W")].decision == "RELAX"
+    assert decisions[(company2.id, "D")].decision == "BUY"
+    assert decisions[(company2.id, "D")].k == 10.0
+
+
+@pytest.mark.anyio
+async def test_bulk_upsert_ta_decisions_empty(
+    dbsession: AsyncSession,
+) -> None:
+    decision_dao = TADecisionDAO(dbsession)
+    assert await decision_dao.bulk_upsert_ta_decisions(user_id=1, decisions=[]) == 0
+
+
+@pytest.mark.anyio
+async def test_get_users_decisions(
+    dbsession: AsyncSession,
+) -> None:
+    decision_dao = TADecisionDAO(dbsession)
+    user1 = await create_test_user(dbsession)
+    user2 = await create_test_user(dbsession)
+    company1 = await create_test_company(dbsession, user_id=user1.id)
+    company2 = await create_test_company(dbsession, user_id=user1.id)
+    company3 = await create_test_company(dbsession, user_id=user2.id)
+    for company, decision in (
+        (company1, "BUY"),
+        (company2, "SELL"),
+        (company3, "RELAX"),
+    ):
+        await decision_dao.update_or_create_ta_decision_model(
+            company, "D", decision, 10.0, 20.0, 100.0
+        )
+    await dbsession.flush()
+
+    decisions = await decision_dao.get_users_decisions([user1.id, user2.id])
+    assert {
+        user_id: sorted((dec.tiker, dec.decision) for dec in user_decisions)
+        for user_id, user_decisions in decisions.items()
+    } == {
+        user1.id: sorted(
+            [(company1.tiker, DecisionEnum.BUY), (company2.tiker, DecisionEnum.SELL)],
+        ),
+        user2.id: [(company3.tiker, DecisionEnum.RELAX)],
+    }
+    assert decisions[user2.id][0] == DecisionDTO(
+        tiker=company3.tiker,
+        decision=DecisionEnum.RELAX,
+        period=PeriodEnum.DAY,
+        k=10.0,
+        d=20.0,
+        last_price=100.0,
+    )
+
+    decisions = await decision_dao.get_users_decisions(
+        [user1.id],
+        tikers=[company2.tiker],
+    )
+    assert [dec.tiker for dec in decisions[user1.id]] == [company2.tiker]
+    assert await decision_dao.get_users_decisions([user1.id], tikers=[]) == {}
@@ -0,0 +1,142 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.app.db.dao.ta_decision_history import TADecisionHistoryDAO
+from backend.app.db.dao.ta_decisions import TADecisionDAO
+from backend.app.schemas.enums import DecisionEnum, PeriodEnum
+from backend.app.schemas.ta import DecisionDTO, TADecisionHistoryDTO
+from backend.tests.utils.common import create_test_user, create_test_company
+
+START = datetime(2026, 1, 1)
+
+
+def get_row(company_id: int, period: str, decision: str, price: float) -> dict:
+    return {
+        "company_id": company_id,
+        "period": period,
+        "decision": decision,
+        "k": None,
+        "d": None,
+        "last_price": price,
+    }
+
+
+@pytest.mark.anyio
+async def test_decision_history(
+    dbsession: AsyncSession,
+) -> None:
+    company1 = await create_test_company(dbsession)
+    company2 = await create_test_company(dbsession)
+    history_dao = TADecisionHistoryDAO(dbsession)
+
+    for day, decision in enumerate(("RELAX", "BUY", "SELL")):
+        await history_dao.add_decisions(
+            [
+                get_row(company1.id, "D", decision, 100.0 + day),
+                get_row(company2.id, "D", "RELAX", 200.0 + day),
+            ],
+            date=START + timedelta(days=day),
+        )
+    await history_dao.add_decisions(
+        [get_row(company1.id, "W", "BUY", 100.0)],
+        date=START,
+    )
+
+    ############## Диапазон дат
+    history = await history_dao.get_history(
+        [company1.id],
+        date_from=START + timedelta(days=1),
+        period="D",
+    )
+    assert [(dec.decision, dec.last_price) for dec in history] == [
+        (DecisionEnum.BUY, 101.0),
+        (DecisionEnum.SELL, 102.0),
+    ]
+    history = await history_dao.get_history(
+        [company1.id, company2.id],
+        date_from=START,
+        date_to=START + timedelta(days=1),
+    )
+    assert [(dec.company_id, dec.period) for dec in history] == [
+        (company1.id, PeriodEnum.DAY),
+        (company1.id, PeriodEnum.WEEK),
+        (company2.id, PeriodEnum.DAY),
+    ]
+
+    ############## Последние решения
+    latest = await history_dao.get_latest([company1.id, company2.id])
+    assert latest == [
+        TADecisionHistoryDTO(
+            company_id=company1.id,
+            period=PeriodEnum.DAY,
+            date=START + timedelta(days=2),
+            decision=DecisionEnum.SELL,
+            last_price=102.0,
+        ),
+        TADecisionHistoryDTO(
+            company_id=company1.id,
+            period=PeriodEnum.WEEK,
+            date=START,
+            decision=DecisionEnum.BUY,
+            last_price=100.0,
+        ),
+        TADecisionHistoryDTO(
+            company_id=company2.id,
+            period=PeriodEnum.DAY,
+            date=START + timedelta(days=2),
+            decision=DecisionEnum.RELAX,
+            last_price=202.0,
+        ),
+    ]
+    latest = await history_dao.get_latest(
+        [company1.id],
+        period="D",
+        before=START + timedelta(days=2),
+    )
+    assert [(dec.decision, dec.date) for dec in latest] == [
+        (DecisionEnum.BUY, START + timedelta(days=1)),
+    ]
+
+    ############## Удаление старых решений
+    assert await history_dao.delete_before(START + timedelta(days=1)) == 3
+    history = await history_dao.get_history([company1.id, company2.id], START)
+    assert len(history) == 4
+    assert min(dec.date for dec in history) == START + timedelta(days=1)
+
+
+@pytest.mark.anyio
+async def test_bulk_upsert_ta_decisions_history(
+    dbsession: AsyncSession,
+) -> None:
+    user = await create_test_user(dbsession)
+    company = await create_test_company(dbsession, user_id=user.id)
+    decision_dao = TADecisionDAO(dbsession)
+    history_dao = TADecisionHistoryDAO(dbsession)
+
+    for decision, history in (
+        (DecisionEnum.BUY, True),
+        (DecisionEnum.SELL, True),
+        (DecisionEnum.RELAX, False),
+    ):
+        await decision_dao.bulk_upsert_ta_decisions(
+            user_id=user.id,
+            decisions=[
+                DecisionDTO(
+                    tiker=company.tiker,
+                    decision=decision,
+                    period=PeriodEnum.DAY,
+                    k=10.0,
+                    last_price=100.0,
+                ),
+            ],
+            history=history,
+        )
+
+    # Последнее решение перезаписывается, история только дополняется
+    saved = await decision_dao.get_ta_decision_models_by_company_id(company.id)
+    assert [dec.decision for dec in saved] == ["RELAX"]
+    history = await history_dao.get_history([company.id], START)
+    assert [dec.decision for dec in history] == [DecisionEnum.BUY, DecisionEnum.SELL]
+    assert history[0].k == 10.0
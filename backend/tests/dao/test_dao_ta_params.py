@@ -0,0 +1,82 @@
+import pytest
+from backend.app.db.dao.strategies import StrategiesDAO
+from backend.app.db.dao.ta_params import TAParamsDAO
+from backend.app.schemas.company import TAParamsDTO
+from backend.app.schemas.enums import PeriodEnum
+from backend.tests.utils.common import create_test_company
+from fastapi import FastAPI, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+@pytest.mark.anyio
+async def test_get_companies_params(
+    fastapi_app: FastAPI,
+    dbsession: AsyncSession,
+) -> None:
+    dao = TAParamsDAO(dbsession)
+    company = await create_test_company(dbsession, need_add_strategy=True)
+    other_company = await create_test_company(dbsession)
+    strategy = await StrategiesDAO(dbsession).get_strategy_model_by_name("TEST1")
+
+    await dao.save_params(
+        {"bottom_border": 40, "periods": [PeriodEnum.WEEK, PeriodEnum.DAY]},
+        company_id=company.id,
+    )
+    await dao.save_params(
+        {"bottom_border": 30, "top_border": 70, "stoch_k": 9},
+        strategy_id=strategy.id,
+    )
+    await dbsession.flush()
+
+    params = await dao.get_companies_params([company.id, other_company.id])
+
+    # Поля компании важнее полей стратегии, пустые поля - по умолчанию
+    assert params[company.id] == TAParamsDTO(
+        bottom_border=40,
+        top_border=70,
+        stoch_k=9,
+        periods=[PeriodEnum.WEEK, PeriodEnum.DAY],
+    )
+    assert params[company.id].indicators_key == "k9d3s3a14"
+    assert params[other_company.id] == TAParamsDTO()
+
+
+@pytest.mark.anyio
+async def test_save_params(
+    fastapi_app: FastAPI,
+    dbsession: AsyncSession,
+) -> None:
+    dao = TAParamsDAO(dbsession)
+    company = await create_test_company(dbsession)
+
+    first = await dao.save_params({"bottom_border": 40}, company_id=company.id)
+    await dbsession.flush()
+    second = await dao.save_params({"top_border": 75}, company_id=company.id)
+    await dbsession.flush()
+
+    # Параметры заменяются целиком в той же строке
+    assert second.id == first.id
+    params = await dao.get_companies_params([company.id])
+    assert params[company.id] == TAParamsDTO(top_border=75)
+
+    with pytest.raises(HTTPException):
+        await dao.save_params({"bottom_border": 40})
+
+
+@pytest.mark.anyio
+async def test_save_params_indicators(
+    fastapi_app: FastAPI,
+    dbsession: AsyncSession,
+) -> None:
+    dao = TAParamsDAO(dbsession)
+    company = await create_test_company(dbsession)
+
+    await dao.save_params({"indicators": ["macd", "rsi"]}, company_id=company.id)
+    await dbsession.flush()
+
+    params = await dao.get_companies_params([company.id])
+    assert params[company.id].indicators == ["macd", "rsi"]
+    assert params[company.id].indicators_key == "k14d3s3a14_macd-rsi"
+
+    with pytest.raises(HTTPException):
+        await dao.save_params({"indicators": ["unknown"]}, company_id=company.id)
@@ -1,7 +1,11 @@
 import pytest
 from backend.app.security import verify_password
 from backend.app.db.dao.user import UserDAO
-from backend.tests.utils.common import random_email, random_lower_string
+from backend.tests.utils.common import (
+    create_test_user,
+    random_email,
+    random_lower_string,
+)
 from fastapi import FastAPI
 from fastapi.encoders import jsonable_encoder
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -91,3 +95,22 @@ async def test_update_user(
     assert user_updated
     assert user.email == user_updated.email
     assert verify_password(new_password, user_updated.hashed_password)
+
+
+@pytest.mark.anyio
+async def test_get_active_users(
+    fastapi_app: FastAPI,
+    dbsession: AsyncSession,
+) -> None:
+    active = await create_test_user(dbsession)
+    other = await create_test_user(dbsession)
+    inactive = await create_test_user(dbsession, is_active=False)
+
+    dao = UserDAO(session=dbsession)
+
+    users = await dao.get_active_users()
+    assert {active.id, other.id} <= {user.id for user in users}
+    assert inactive.id not in {user.id for user in users}
+
+    users = await dao.get_active_users([active.id, inactive.id])
+    assert [user.id for user in users] == [active.id]
@@ -0,0 +1,136 @@
+import json
+import logging
+import time
+from unittest.mock import patch
+
+import pytest
+from pydantic import TypeAdapter
+
+from backend.app.schemas.company import CompanyDTO, CompanyStopDTO
+from backend.app.schemas.enums import DecisionEnum, PeriodEnum
+from backend.app.schemas.ta import DecisionDTO, TAStartGenerateMessage
+from backend.app.worker import codec
+
+logger = logging.getLogger(__name__)
+
+
+def get_message(count: int = 3) -> TAStartGenerateMessage:
+    return TAStartGenerateMessage(
+        user_id=1,
+        period=PeriodEnum.ALL,
+        send_message=True,
+        companies=[
+            CompanyDTO(
+                name=f"Test{num}",
+                tiker=f"TST{num}",
+                has_shares=num % 2 == 0,
+                stops=[CompanyStopDTO(period=PeriodEnum.DAY, value=100.0 + num)],
+            )
+            for num in range(count)
+        ],
+    )
+
+
+def get_decisions(count: int = 3) -> list[DecisionDTO]:
+    return [
+        DecisionDTO(
+            tiker=f"TST{num}",
+            decision=DecisionEnum.BUY,
+            period=PeriodEnum.DAY,
+            last_price=100.5 + num,
+            k=20.0,
+            d=10.0,
+        )
+        for num in range(count)
+    ]
+
+
+@pytest.mark.parametrize("message_format", ["json", "msgpack"])
+def test_codec_roundtrip(message_format):
+    message = get_message()
+    decisions = get_decisions()
+
+    with patch.object(codec.settings, "ta_message_format", message_format):
+        payload = codec.dumps(message)
+        decisions_payload = codec.dumps_list(decisions, DecisionDTO)
+
+    assert isinstance(payload, bytes) is (message_format == "msgpack")
+    # Декодирование не зависит от текущей настройки
+    assert codec.loads(payload, TAStartGenerateMessage) == message
+    assert codec.loads_list(decisions_payload, DecisionDTO) == decisions
+
+
+def test_codec_msgpack_is_compact():
+    message = get_message(100)
+
+    with patch.object(codec.settings, "ta_message_format", "msgpack"):
+        msgpack_payload = codec.dumps(message)
+
+    assert len(msgpack_payload) < len(codec.dumps(message).encode())
+
+
+def test_codec_json_compatible_with_models():
+    decisions = get_decisions()
+
+    assert codec.dumps(decisions[0]) == decisions[0].model_dump_json()
+    assert json.loads(codec.dumps_list(decisions, DecisionDTO)) == [
+        dec.model_dump(mode="json") for dec in decisions
+    ]
+    assert codec.loads_list("[]", DecisionDTO) == []
+
+
+def test_codec_reuses_adapters():
+    assert codec.get_adapter(list[DecisionDTO]) is codec.get_adapter(
+        list[DecisionDTO],
+    )
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("count", [10, 100, 1000])
+def test_codec_benchmark(count):
+    message = get_message(count)
+    decisions = get_decisions(count)
+    results = [[dec.model_dump_json() for dec in decisions]]
+    decisions_payload = codec.dumps_list(decisions, DecisionDTO)
+    payload = message.model_dump_json()
+    repeat = 100
+
+    # Как было: TypeAdapter на каждый вызов и на каждое решение из результатов chord
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        TypeAdapter(TAStartGenerateMessage).validate_json(payload)
+        legacy = [
+            TypeAdapter(DecisionDTO).validate_json(dec_json)
+            for sublist in results
+            for dec_json in sublist
+        ]
+        json.dumps([dec.model_dump() for dec in legacy])
+    legacy_time = (time.perf_counter() - t0) / repeat
+
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        codec.loads(payload, TAStartGenerateMessage)
+        result = codec.loads_list(decisions_payload, DecisionDTO)
+        codec.dumps_list(result, DecisionDTO)
+    codec_time = (time.perf_counter() - t0) / repeat
+
+    with patch.object(codec.settings, "ta_message_format", "msgpack"):
+        msgpack_payload = codec.dumps(message)
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        codec.loads(msgpack_payload, TAStartGenerateMessage)
+    msgpack_time = (time.perf_counter() - t0) / repeat
+
+    logger.info(
+        "codec, %d companies/decisions: legacy %.3fms, codec %.3fms, "
+        "message json %dB, msgpack %dB (%.3fms)",
+        count,
+        legacy_time * 1000,
+        codec_time * 1000,
+        len(payload),
+        len(msgpack_payload),
+        msgpack_time * 1000,
+    )
+    assert result == legacy
+    assert codec_time < legacy_time
+    assert len(msgpack_payload) < len(payload)
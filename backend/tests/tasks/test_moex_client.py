@@ -0,0 +1,135 @@
+import httpx
+import pytest
+
+from backend.app.utils.moex.moex_client import MoexISSClient, MoexSyncClient
+
+HISTORY_COLUMNS = ["TRADEDATE", "CLOSE"]
+
+
+def history_page(start: int, total: int, page_size: int) -> dict:
+    return {
+        "history": {
+            "columns": HISTORY_COLUMNS,
+            "data": [
+                [f"2024-01-{num + 1:02d}", 100.0 + num]
+                for num in range(start, min(start + page_size, total))
+            ],
+        },
+        "history.cursor": {
+            "columns": ["INDEX", "TOTAL", "PAGESIZE"],
+            "data": [[start, total, page_size]],
+        },
+    }
+
+
+@pytest.mark.anyio
+async def test_get_board_history_pages():
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        start = int(request.url.params.get("start", 0))
+        return httpx.Response(200, json=history_page(start, total=25, page_size=10))
+
+    client = MoexISSClient(
+        base_url="https://iss.test/iss",
+        transport=httpx.MockTransport(handler),
+    )
+    rows = await client.get_board_history("SBER", "2024-01-01", ("TRADEDATE", "CLOSE"))
+    await client.aclose()
+
+    assert len(rows) == 25
+    assert rows[0] == {"TRADEDATE": "2024-01-01", "CLOSE": 100.0}
+    assert rows[-1]["TRADEDATE"] == "2024-01-25"
+    assert len(requests) == 3
+    assert requests[0].url.path == (
+        "/iss/history/engines/stock/markets/shares/boards/TQBR/securities/SBER.json"
+    )
+    assert requests[0].url.params["history.columns"] == "TRADEDATE,CLOSE"
+
+
+@pytest.mark.anyio
+async def test_get_board_candles_pages():
+    def handler(request: httpx.Request) -> httpx.Response:
+        start = int(request.url.params["start"])
+        size = 500 if start == 0 else 3
+        return httpx.Response(
+            200,
+            json={
+                "candles": {
+                    "columns": ["begin", "close"],
+                    "data": [
+                        ["2024-01-01 10:00:00", start + num] for num in range(size)
+                    ],
+                },
+            },
+        )
+
+    client = MoexISSClient(
+        base_url="https://iss.test/iss",
+        transport=httpx.MockTransport(handler),
+    )
+    candles = await client.get_board_candles("SBER", "2024-01-01")
+    await client.aclose()
+
+    assert len(candles) == 503
+    assert candles[-1]["close"] == 502
+
+
+@pytest.mark.anyio
+async def test_get_json_retries():
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        if len(calls) == 1:
+            raise httpx.ConnectError("connection refused", request=request)
+        if len(calls) == 2:
+            return httpx.Response(503)
+        return httpx.Response(200, json=history_page(0, total=1, page_size=10))
+
+    client = MoexISSClient(
+        base_url="https://iss.test/iss",
+        retry_backoff=0,
+        transport=httpx.MockTransport(handler),
+    )
+    rows = await client.get_board_history("SBER", "2024-01-01")
+    await client.aclose()
+
+    assert len(calls) == 3
+    assert len(rows) == 1
+
+
+@pytest.mark.anyio
+async def test_get_json_retries_exhausted():
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(429)
+
+    client = MoexISSClient(
+        base_url="https://iss.test/iss",
+        retries=2,
+        retry_backoff=0,
+        transport=httpx.MockTransport(handler),
+    )
+    with pytest.raises(httpx.HTTPStatusError):
+        await client.get_board_history("SBER", "2024-01-01")
+    await client.aclose()
+
+
+def test_sync_client_reuses_connection_pool():
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json=history_page(0, total=1, page_size=10))
+
+    sync_client = MoexSyncClient(
+        MoexISSClient(
+            base_url="https://iss.test/iss",
+            transport=httpx.MockTransport(handler),
+        ),
+    )
+    first = sync_client.run(sync_client.client.get_board_history("SBER", "2024-01-01"))
+    http_client = sync_client.client._client
+    second = sync_client.run(sync_client.client.get_board_history("LKOH", "2024-01-01"))
+
+    assert first == second
+    assert sync_client.client._client is http_client
+    sync_client.run(sync_client.client.aclose())
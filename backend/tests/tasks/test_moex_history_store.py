@@ -0,0 +1,142 @@
+import datetime
+import threading
+from unittest.mock import AsyncMock, patch
+
+from backend.app.utils.moex.moex_history_store import MoexHistoryStore
+from backend.app.utils.moex.moex_reader import MoexReader
+
+
+def make_rows(*dates: str) -> list[dict]:
+    return [
+        {
+            "OPEN": 100.0 + num,
+            "HIGH": 110.0 + num,
+            "LOW": 90.0 + num,
+            "TRADEDATE": date,
+            "CLOSE": 105.0 + num,
+            "VOLUME": 1000 + num,
+            "VALUE": 100000.0 + num,
+        }
+        for num, date in enumerate(dates)
+    ]
+
+
+def test_history_store_save_and_get(tmp_path):
+    store = MoexHistoryStore(tmp_path)
+    start = datetime.date(2024, 1, 1)
+    store.save_history(
+        "TQBR",
+        "SBER",
+        make_rows("2024-01-03", "2024-01-04", "2024-01-05"),
+        covered_from=start,
+    )
+
+    rows = store.get_history("TQBR", "SBER", datetime.date(2024, 1, 4))
+    assert [row["TRADEDATE"] for row in rows] == ["2024-01-04", "2024-01-05"]
+    assert rows[0]["CLOSE"] == 106.0
+    assert rows[0]["VOLUME"] == 1001
+
+    assert store.get_history("TQBR", "LKOH", start) == []
+    assert (
+        store.get_history("TQBR", "SBER", start, datetime.date(2024, 1, 3))[0]["OPEN"]
+        == 100.0
+    )
+
+
+def test_history_store_fetch_start(tmp_path):
+    store = MoexHistoryStore(tmp_path)
+    start = datetime.date(2024, 1, 1)
+
+    # Пустое хранилище - грузим все
+    assert store.get_fetch_start("TQBR", "SBER", start) == start
+
+    store.save_history(
+        "TQBR",
+        "SBER",
+        make_rows("2024-01-03", "2024-01-04"),
+        covered_from=start,
+    )
+    # История покрыта - грузим только хвост начиная с последнего дня
+    assert store.get_fetch_start("TQBR", "SBER", start) == datetime.date(2024, 1, 4)
+    assert store.get_fetch_start(
+        "TQBR", "SBER", datetime.date(2024, 1, 2)
+    ) == datetime.date(2024, 1, 4)
+
+    # Запрошен более ранний период, чем загружен - грузим все заново
+    earlier = datetime.date(2023, 6, 1)
+    assert store.get_fetch_start("TQBR", "SBER", earlier) == earlier
+
+
+def test_moex_reader_fetches_only_missing_tail(tmp_path):
+    store = MoexHistoryStore(tmp_path)
+    reader = MoexReader(history_store=store)
+    start = datetime.date(2024, 1, 1)
+
+    with patch.object(
+        MoexReader,
+        "_fetch_board_history",
+        new_callable=AsyncMock,
+        return_value=make_rows("2024-01-03", "2024-01-04"),
+    ) as mock_fetch:
+        df = reader.get_company_history(start=start, tiker="SBER", add_current=False)
+
+    assert mock_fetch.call_args.args[1] == start
+    assert list(df.index.strftime("%Y-%m-%d")) == ["2024-01-03", "2024-01-04"]
+
+    with patch.object(
+        MoexReader,
+        "_fetch_board_history",
+        new_callable=AsyncMock,
+        return_value=make_rows("2024-01-04", "2024-01-05"),
+    ) as mock_fetch:
+        df = reader.get_company_history(start=start, tiker="SBER", add_current=False)
+
+    assert mock_fetch.call_args.args[1] == datetime.date(2024, 1, 4)
+    assert list(df.index.strftime("%Y-%m-%d")) == [
+        "2024-01-03",
+        "2024-01-04",
+        "2024-01-05",
+    ]
+    assert list(df.columns) == ["OPEN", "HIGH", "LOW", "CLOSE", "VOLUME", "VALUE"]
+    # Перезапрошенный последний день обновлен
+    assert df.loc["2024-01-04", "CLOSE"] == 105.0
+
+
+def test_moex_reader_does_not_block_event_loop(tmp_path):
+    store = MoexHistoryStore(tmp_path)
+    reader = MoexReader(history_store=store)
+    threads = {"loop": set(), "store": set()}
+
+    async def fetch(*args):
+        threads["loop"].add(threading.get_ident())
+        return make_rows("2024-01-03")
+
+    def in_thread(method):
+        def wrapper(*args, **kwargs):
+            threads["store"].add(threading.get_ident())
+            return method(*args, **kwargs)
+
+        return wrapper
+
+    with patch.object(
+        MoexReader,
+        "_fetch_board_history",
+        side_effect=fetch,
+    ), patch.object(
+        store,
+        "get_fetch_start",
+        in_thread(store.get_fetch_start),
+    ), patch.object(
+        store,
+        "get_history",
+        in_thread(store.get_history),
+    ):
+        reader.get_companies_history(
+            start=datetime.date(2024, 1, 1),
+            tikers=["SBER", "LKOH"],
+            add_current=False,
+        )
+
+    # Запросы к SQLite выполняются вне потока цикла событий
+    assert threads["store"]
+    assert not threads["store"] & threads["loop"]
@@ -0,0 +1,140 @@
+import datetime
+import threading
+from unittest.mock import AsyncMock, patch
+
+from backend.app.utils.moex.moex_intraday_store import MoexIntradayStore
+from backend.app.utils.moex.moex_reader import MoexReader
+
+
+def make_rows(*begins: str) -> list[dict]:
+    return [
+        {
+            "BEGIN": begin,
+            "OPEN": 100.0 + num,
+            "HIGH": 110.0 + num,
+            "LOW": 90.0 + num,
+            "CLOSE": 105.0 + num,
+            "VOLUME": 1000 + num,
+            "VALUE": 100000.0 + num,
+        }
+        for num, begin in enumerate(begins)
+    ]
+
+
+def make_candles(*begins: str) -> list[dict]:
+    """Свечи в виде ответа ISS candles.json."""
+    return [
+        {key.lower(): value for key, value in row.items()} for row in make_rows(*begins)
+    ]
+
+
+def test_intraday_store_fetch_start(tmp_path):
+    store = MoexIntradayStore(tmp_path)
+    start = datetime.datetime(2024, 1, 3, 10)
+
+    # Пустое хранилище - грузим все
+    assert store.get_fetch_start("TQBR", "SBER", start) == start
+
+    store.save_candles(
+        "TQBR",
+        "SBER",
+        make_rows("2024-01-03 10:00:00", "2024-01-03 10:10:00"),
+        covered_from=start,
+    )
+    # Грузим только хвост начиная с последней свечи
+    assert store.get_fetch_start("TQBR", "SBER", start) == datetime.datetime(
+        2024, 1, 3, 10, 10
+    )
+
+    # Запрошен более ранний период, чем загружен - грузим все заново
+    earlier = datetime.datetime(2024, 1, 2, 10)
+    assert store.get_fetch_start("TQBR", "SBER", earlier) == earlier
+
+
+def test_intraday_store_delete_before(tmp_path):
+    store = MoexIntradayStore(tmp_path)
+    start = datetime.datetime(2024, 1, 2, 10)
+    store.save_candles(
+        "TQBR",
+        "SBER",
+        make_rows("2024-01-02 10:00:00", "2024-01-03 10:00:00"),
+        covered_from=start,
+    )
+
+    before = datetime.datetime(2024, 1, 3)
+    assert store.delete_before(before, "TQBR") == 1
+
+    rows = store.get_candles("TQBR", "SBER", start)
+    assert [row["BEGIN"] for row in rows] == ["2024-01-03 10:00:00"]
+    assert rows[0]["CLOSE"] == 106.0
+    # Удаленный период больше не считается покрытым
+    assert store.get_fetch_start("TQBR", "SBER", start) == start
+
+
+def test_moex_reader_fetches_only_new_candles(tmp_path):
+    store = MoexIntradayStore(tmp_path)
+    reader = MoexReader(intraday_store=store)
+    start = datetime.datetime(2024, 1, 3, 10)
+
+    with patch.object(
+        MoexReader,
+        "_fetch_board_candles",
+        new_callable=AsyncMock,
+        return_value=make_candles("2024-01-03 10:00:00", "2024-01-03 10:10:00"),
+    ) as mock_fetch:
+        reader.get_companies_intraday(start=start, tikers=["SBER"])
+
+    assert mock_fetch.call_args.args[1] == start
+
+    with patch.object(
+        MoexReader,
+        "_fetch_board_candles",
+        new_callable=AsyncMock,
+        return_value=make_candles("2024-01-03 10:10:00", "2024-01-03 10:20:00"),
+    ) as mock_fetch:
+        df = reader.get_companies_intraday(start=start, tikers=["SBER"])["SBER"]
+
+    assert mock_fetch.call_args.args[1] == datetime.datetime(2024, 1, 3, 10, 10)
+    assert list(df.index.strftime("%H:%M")) == ["10:00", "10:10", "10:20"]
+    assert list(df.columns) == ["OPEN", "HIGH", "LOW", "CLOSE", "VOLUME", "VALUE"]
+    # Перезапрошенная последняя свеча обновлена
+    assert df.loc["2024-01-03 10:10", "CLOSE"] == 105.0
+
+
+def test_moex_reader_intraday_does_not_block_event_loop(tmp_path):
+    store = MoexIntradayStore(tmp_path)
+    reader = MoexReader(intraday_store=store)
+    threads = {"loop": set(), "store": set()}
+
+    async def fetch(*args):
+        threads["loop"].add(threading.get_ident())
+        return make_candles("2024-01-03 10:00:00")
+
+    def in_thread(method):
+        def wrapper(*args, **kwargs):
+            threads["store"].add(threading.get_ident())
+            return method(*args, **kwargs)
+
+        return wrapper
+
+    with patch.object(
+        MoexReader,
+        "_fetch_board_candles",
+        side_effect=fetch,
+    ), patch.object(
+        store,
+        "get_fetch_start",
+        in_thread(store.get_fetch_start),
+    ), patch.object(
+        store,
+        "delete_before",
+        in_thread(store.delete_before),
+    ):
+        reader.get_companies_intraday(
+            start=datetime.datetime(2024, 1, 3, 10),
+            tikers=["SBER", "LKOH"],
+        )
+
+    # Запросы к SQLite выполняются вне потока цикла событий
+    assert threads["store"]
+    assert not threads["store"] & threads["loop"]
@@ -0,0 +1,55 @@
+import datetime
+
+import pytest
+
+from backend.app.utils.moex.moex_session import (
+    MSK,
+    get_next_session_open,
+    get_session_ttl,
+    get_trading_date,
+    is_session_open,
+)
+
+
+def msk(*args) -> datetime.datetime:
+    return datetime.datetime(*args, tzinfo=MSK)
+
+
+@pytest.mark.parametrize(
+    "now, expected",
+    [
+        (msk(2024, 10, 16, 9, 0), False),
+        (msk(2024, 10, 16, 12, 0), True),
+        (msk(2024, 10, 16, 23, 55), False),
+        (msk(2024, 10, 19, 12, 0), False),  # суббота
+    ],
+)
+def test_is_session_open(now, expected):
+    assert is_session_open(now) is expected
+
+
+def test_get_next_session_open():
+    # Пятница вечером - следующая сессия в понедельник
+    assert get_next_session_open(msk(2024, 10, 18, 23, 55)) == msk(
+        2024,
+        10,
+        21,
+        9,
+        50,
+    )
+    assert get_next_session_open(msk(2024, 10, 16, 5, 0)) == msk(2024, 10, 16, 9, 50)
+
+
+def test_get_session_ttl():
+    # Во время торгов - не дольше session_ttl
+    assert get_session_ttl(600, msk(2024, 10, 16, 12, 0)) == 600
+    # и не дольше закрытия сессии
+    assert get_session_ttl(600, msk(2024, 10, 16, 23, 48)) == 120
+    # После закрытия - до открытия следующей сессии
+    assert get_session_ttl(600, msk(2024, 10, 16, 23, 50)) == 10 * 60 * 60
+
+
+def test_get_trading_date_uses_moscow_time():
+    now = datetime.datetime(2024, 10, 16, 22, 0, tzinfo=datetime.timezone.utc)
+
+    assert get_trading_date(now) == datetime.date(2024, 10, 17)
@@ -0,0 +1,186 @@
+import datetime
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.app.schemas.company import CompanyDTO, TAParamsDTO
+from backend.app.utils.moex.moex_history_store import MoexHistoryStore
+from backend.app.utils.ta import ta_indicators
+from backend.app.utils.ta.ta_backtest import (
+    EXIT_END,
+    EXIT_SIGNAL,
+    EXIT_STOP,
+    Backtest,
+    BacktestPanels,
+    load_histories,
+)
+from backend.app.utils.ta.ta_calculator import TACalculator
+from backend.app.utils.ta.ta_resampler import resample_ohlc
+from backend.tests.tasks.test_moex_history_store import make_rows
+
+
+@pytest.fixture
+def histories():
+    file_path = Path(__file__).parent.parent / "data/mocked_lkoh_history.csv"
+    df = pd.read_csv(file_path)
+    df["DATE"] = pd.to_datetime(df["DATE"])
+    df.set_index("DATE", inplace=True)
+
+    with_gaps = df.drop(df.index[100:140]).copy()
+    with_gaps.iloc[::50, 0:4] = np.nan
+    return {
+        "LKOH": df,
+        "GAPS": with_gaps,
+        "T20": df.iloc[:-20] * 1.2,
+        "SHORT": df.iloc[-10:],
+        "EMPTY": pd.DataFrame(),
+    }
+
+
+@pytest.mark.parametrize("period", ["D", "W", "M"])
+def test_backtest_decisions_equal_calculator(histories, period):
+    calculator = TACalculator()
+    decisions = Backtest(histories).get_decisions(period)
+
+    for tiker, df in histories.items():
+        for row in range(0, len(df.index), 23):
+            expected = calculator.get_company_ta_decisions(
+                CompanyDTO(name=tiker, tiker=tiker),
+                period,
+                df.iloc[: row + 1],
+            )
+            assert decisions[(tiker, df.index[row])] == expected[period].decision
+
+
+@pytest.mark.parametrize("period", ["D", "W", "M"])
+def test_backtest_decisions_without_look_ahead(histories, period):
+    decisions = Backtest(histories).get_decisions(period)
+    truncated = Backtest(
+        {tiker: df.iloc[:-45] for tiker, df in histories.items()},
+    ).get_decisions(period)
+
+    # Будущие свечи (в том числе текущей недели и месяца) не меняют решений
+    pd.testing.assert_series_equal(decisions.loc[truncated.index], truncated)
+
+
+@pytest.mark.parametrize("period", ["D", "W", "M"])
+def test_backtest_stoch_lengths(histories, period):
+    lengths = {"k": 9, "d": 2, "smooth_k": 4}
+    frame = BacktestPanels(histories, lengths)[period]
+    df = histories["LKOH"]
+
+    for row in range(30, len(df.index), 41):
+        history = df.iloc[: row + 1]
+        if period != "D":
+            history = resample_ohlc(history, period)
+        stoch_k, stoch_d = ta_indicators.stoch(
+            history.HIGH.to_numpy(),
+            history.LOW.to_numpy(),
+            history.CLOSE.to_numpy(),
+            **lengths,
+        )
+        np.testing.assert_allclose(
+            [frame.last("k")[row], frame.last("d")[row]],
+            [stoch_k[-1], stoch_d[-1]],
+            rtol=1e-12,
+        )
+
+
+def test_backtest_default_stoch_lengths(histories):
+    params = TAParamsDTO()
+    panels = BacktestPanels(histories)
+
+    assert panels.stoch_lengths == {
+        "k": params.stoch_k,
+        "d": params.stoch_d,
+        "smooth_k": params.stoch_smooth_k,
+    }
+
+
+def test_backtest_trades():
+    dates = pd.bdate_range("2024-01-01", periods=12)
+    close = np.array([100, 101, 102, 103, 104, 105, 104, 90, 95, 96, 97, 98.0])
+    history = pd.DataFrame(
+        {"OPEN": close, "CLOSE": close, "HIGH": close + 1, "LOW": close - 1},
+        index=dates,
+    )
+    decisions = np.array(
+        [
+            "BUY",  # вход на открытии дня 1
+            "BUY",  # продолжение сигнала - нового входа нет
+            "RELAX",
+            "SELL",  # выход на открытии дня 4
+            "BUY",  # вход на открытии дня 5, стоп на дне 7
+            "RELAX",
+            "RELAX",
+            "RELAX",
+            "BUY",  # вход на открытии дня 9, открыта до конца истории
+            "RELAX",
+            "RELAX",
+            "SELL",  # SELL на последний день не исполняется
+        ],
+        dtype=object,
+    )
+
+    backtest = Backtest({"SBER": history})
+    with patch.object(Backtest, "_calculate_decisions", return_value=decisions):
+        trades = backtest.get_trades("D", stop_loss=0.1)
+        summary = backtest.run("D", stop_loss=0.1).iloc[0]
+
+    assert [
+        (trade.entry_price, trade.exit_price, trade.reason) for trade in trades
+    ] == [(101, 104, EXIT_SIGNAL), (105, 90, EXIT_STOP), (96, 98, EXIT_END)]
+    assert trades[1].exit_date == dates[7].date()
+
+    profits = [104 / 101 - 1, 90 / 105 - 1, 98 / 96 - 1]
+    assert summary.trades == 3
+    assert summary.hit_rate == pytest.approx(2 / 3)
+    assert summary.mean_return == pytest.approx(np.mean(profits))
+    assert summary.total_return == pytest.approx(np.prod(np.add(profits, 1)) - 1)
+    # Пик капитала на дне 5, затем падение до стопа
+    assert summary.max_drawdown == pytest.approx(1 - 90 / 105)
+
+    # Без стопа вторая сделка держится до конца, новый BUY ее не открывает
+    with patch.object(Backtest, "_calculate_decisions", return_value=decisions):
+        trades = backtest.get_trades("D", stop_loss=None)
+    assert [(trade.exit_price, trade.reason) for trade in trades] == [
+        (104, EXIT_SIGNAL),
+        (98, EXIT_END),
+    ]
+
+
+def test_backtest_run(histories):
+    backtest = Backtest(histories)
+    summary = backtest.run("W", stop_loss=None)
+
+    assert list(summary.tiker) == ["LKOH", "GAPS", "T20", "SHORT"]
+    assert (summary.trades > 0).sum() == 3
+    assert ((summary.max_drawdown >= 0) & (summary.max_drawdown < 1)).all()
+
+    # Индикаторы считаются один раз, перебор границ их переиспользует
+    with patch("backend.app.utils.ta.ta_backtest.ta_indicators.stoch") as stoch:
+        relaxed = backtest.run("W", bottom_border=70, stop_loss=None)
+    stoch.assert_not_called()
+    assert relaxed.trades.sum() > summary.trades.sum()
+
+
+def test_load_histories(tmp_path):
+    store = MoexHistoryStore(tmp_path)
+    start = datetime.date(2024, 1, 1)
+    store.save_history(
+        "TQBR",
+        "SBER",
+        make_rows("2024-01-03", "2024-01-04"),
+        covered_from=start,
+    )
+
+    histories = load_histories(["SBER", "LKOH"], start, store=store)
+
+    assert list(histories) == ["SBER"]
+    assert list(histories["SBER"].index) == list(
+        pd.to_datetime(["2024-01-03", "2024-01-04"]),
+    )
+    assert histories["SBER"].CLOSE.tolist() == [105.0, 106.0]
@@ -0,0 +1,143 @@
+import datetime
+from pathlib import Path
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+import redis
+
+from backend.app.schemas.company import CompanyDTO, CompanyStopDTO
+from backend.app.schemas.enums import DecisionEnum, PeriodEnum
+from backend.app.schemas.ta import IndicatorSnapshot
+from backend.app.services.ta_service import TAService
+from backend.app.utils.ta.ta_cache import TASnapshotCache
+from backend.app.utils.ta.ta_calculator import TACalculator
+
+TRADING_DATE = datetime.date(2024, 10, 16)
+
+
+class FakeRedis:
+    """Минимальный Redis в памяти: mget и pipeline с set."""
+
+    def __init__(self):
+        self.data = {}
+        self.ttl = {}
+
+    def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def set(self, key, value, ex=None):  # noqa: WPS125
+        self.data[key] = value.encode()
+        self.ttl[key] = ex
+
+    def execute(self):
+        return []
+
+
+class BrokenRedis:
+    def mget(self, keys):
+        raise redis.ConnectionError("Connection refused")
+
+    def pipeline(self, transaction=True):
+        raise redis.ConnectionError("Connection refused")
+
+
+@pytest.fixture
+def sample_lkoh_dataframe():
+    file_path = Path(__file__).parent.parent / "data/mocked_lkoh_history.csv"
+    df = pd.read_csv(file_path)
+    df["DATE"] = pd.to_datetime(df["DATE"])
+    df.set_index("DATE", inplace=True)
+    return df
+
+
+def get_snapshot(tiker: str, period: str) -> IndicatorSnapshot:
+    return IndicatorSnapshot(
+        tiker=tiker,
+        period=period,
+        date=TRADING_DATE,
+        last_price=100.5,
+        computed=True,
+        k=20.0,
+        d=10.0,
+    )
+
+
+def test_ta_cache_roundtrip():
+    client = FakeRedis()
+    cache = TASnapshotCache(client, session_ttl=600)
+    snapshots = {
+        "SBER": {period: get_snapshot("SBER", period) for period in ("M", "W")},
+        "GAZP": {"M": get_snapshot("GAZP", "M")},
+    }
+
+    cache.save_snapshots(snapshots, trading_date=TRADING_DATE)
+
+    assert "ta:snapshot:TQBR:SBER:W:2024-10-16" in client.data
+    assert all(0 < ttl for ttl in client.ttl.values())
+    # Для GAZP нет недельного снимка - это промах
+    assert cache.get_snapshots(
+        ["SBER", "GAZP"],
+        ("M", "W"),
+        trading_date=TRADING_DATE,
+    ) == {"SBER": snapshots["SBER"]}
+    # Другая торговая дата - другой ключ
+    next_date = TRADING_DATE + datetime.timedelta(days=1)
+    assert cache.get_snapshots(["SBER"], ("M", "W"), trading_date=next_date) == {}
+
+
+def test_ta_cache_unavailable():
+    cache = TASnapshotCache(BrokenRedis())
+
+    cache.save_snapshots({"SBER": {"M": get_snapshot("SBER", "M")}})
+    assert cache.get_snapshots(["SBER"], ("M",)) == {}
+
+
+def test_indicator_snapshots_shared_cache_between_users(sample_lkoh_dataframe):
+    cache = TASnapshotCache(FakeRedis())
+    service = TAService()
+    first_user = [CompanyDTO(name="SBER", tiker="SBER", has_shares=True)]
+    second_user = [
+        CompanyDTO(
+            name="SBER",
+            tiker="SBER",
+            has_shares=True,
+            stops=[CompanyStopDTO(period=PeriodEnum.DAY, value=1_000_000)],
+        ),
+    ]
+
+    with (
+        patch("backend.app.services.ta_service.get_ta_cache", return_value=cache),
+        patch.object(
+            TACalculator,
+            "get_histories_data",
+            return_value={"SBER": sample_lkoh_dataframe},
+        ) as mock_get_histories_data,
+    ):
+        first_decisions = service.apply_user_decisions(
+            first_user,
+            "All",
+            service.get_indicator_snapshots(first_user, "All"),
+        )
+        second_decisions = service.apply_user_decisions(
+            second_user,
+            "All",
+            service.get_indicator_snapshots(second_user, "All"),
+        )
+
+    # История загружена и проанализирована один раз
+    mock_get_histories_data.assert_called_once()
+    expected = TACalculator().get_company_ta_decisions(
+        first_user[0],
+        "All",
+        sample_lkoh_dataframe,
+    )
+    assert first_decisions == list(expected.values())
+
+    # Стопы второго пользователя применяются к общим индикаторам
+    second_by_period = {decision.period: decision for decision in second_decisions}
+    assert second_by_period[PeriodEnum.DAY].decision == DecisionEnum.SELL
+    assert second_by_period[PeriodEnum.WEEK].k == expected["W"].k
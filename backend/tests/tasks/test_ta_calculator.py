@@ -157,6 +157,28 @@ def test_get_stoch_decisions_with_stop(
     assert decisions[period].tiker == company.tiker
 
 
+@patch("backend.app.utils.moex.moex_reader.MoexReader.get_company_history")
+def test_get_company_ta_decisions_computes_each_period_once(
+    mock_get_company_history,
+    sample_lkoh_dataframe,
+):
+    mock_get_company_history.return_value = sample_lkoh_dataframe
+
+    calculator = TACalculator()
+    company = CompanyDTO(name="Лукойл", tiker="LKOH")
+
+    with patch.object(
+        TACalculator,
+        "_generate_ta_df",
+        autospec=True,
+        side_effect=TACalculator._generate_ta_df,
+    ) as mock_generate_ta_df:
+        decisions = calculator.get_company_ta_decisions(company, "All")
+
+    assert set(decisions.keys()) == {"M", "W", "D"}
+    assert mock_generate_ta_df.call_count == 3
+
+
 def test_get_stoch(
     sample_lkoh_dataframe,
 ) -> None:
@@ -0,0 +1,149 @@
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.app.schemas.company import CompanyDTO, TAParamsDTO, get_snapshot_key
+from backend.app.utils.ta.ta_calculator import TACalculator
+from backend.app.utils.ta.ta_incremental import (
+    IncrementalIndicators,
+    IndicatorState,
+    IndicatorStateStore,
+)
+from backend.app.utils.ta.ta_resampler import resample_ohlc
+
+TOLERANCE = 1e-8
+
+
+@pytest.fixture
+def sample_lkoh_dataframe():
+    file_path = Path(__file__).parent.parent / "data/mocked_lkoh_history.csv"
+    df = pd.read_csv(file_path)
+    df["DATE"] = pd.to_datetime(df["DATE"])
+    df.set_index("DATE", inplace=True)
+    return df
+
+
+def get_frame(df: pd.DataFrame, period: str) -> pd.DataFrame:
+    return df if period == "D" else resample_ohlc(df, period)
+
+
+def assert_last_row_equal(expected: pd.DataFrame, result: pd.DataFrame):
+    assert list(result.columns) == ["k", "d", "adx", "dmp", "dmn"]
+    assert result.index[-1] == expected.index[-1]
+    np.testing.assert_allclose(
+        result.iloc[-1].to_numpy(dtype=float),
+        expected.iloc[-1].to_numpy(dtype=float),
+        rtol=0,
+        atol=TOLERANCE,
+    )
+
+
+@pytest.mark.parametrize("period", ["D", "W", "M"])
+def test_rebuild_matches_pandas_ta(sample_lkoh_dataframe, period):
+    frame = get_frame(sample_lkoh_dataframe, period)
+    expected = TACalculator()._generate_ta_df(frame.copy())
+
+    result = IncrementalIndicators().rebuild(frame)
+
+    assert_last_row_equal(expected, result)
+
+
+@pytest.mark.parametrize("period", ["D", "W", "M"])
+def test_update_matches_pandas_ta_day_by_day(sample_lkoh_dataframe, period):
+    calculator = TACalculator()
+    engine = IncrementalIndicators()
+
+    # Каждый "запуск" видит историю на день больше, последняя неделя или месяц
+    # при этом меняется, пока не закроется
+    for rows in range(400, 560, 3):
+        daily = sample_lkoh_dataframe.iloc[:rows]
+        frame = get_frame(daily, period)
+        expected = calculator._generate_ta_df(frame.copy())
+
+        # Состояние сохраняется между запусками
+        engine = IncrementalIndicators(IndicatorState.from_json(engine.state.to_json()))
+        result = engine.update(frame)
+
+        assert_last_row_equal(expected, result)
+        assert engine.state.last_date == str(frame.index[-2].date())
+
+
+def test_update_without_new_candles(sample_lkoh_dataframe):
+    engine = IncrementalIndicators()
+    engine.update(sample_lkoh_dataframe)
+    state = engine.state
+
+    result = engine.update(sample_lkoh_dataframe.iloc[:-1])
+
+    assert engine.state == state
+    assert result.index[-1] == sample_lkoh_dataframe.index[-2]
+
+
+def test_indicator_state_store(tmp_path, sample_lkoh_dataframe):
+    store = IndicatorStateStore(tmp_path)
+    engine = IncrementalIndicators()
+    engine.update(sample_lkoh_dataframe)
+
+    assert store.load("LKOH", "D") is None
+    store.save("LKOH", "D", engine.state)
+    assert store.load("LKOH", "D") == engine.state
+
+    store.delete("LKOH")
+    assert store.load("LKOH", "D") is None
+
+
+def test_indicator_state_store_delete_tiker(tmp_path):
+    store = IndicatorStateStore(tmp_path)
+    state = IndicatorState()
+    custom = TAParamsDTO(stoch_k=5, adx_length=20).lengths_key
+    keys = [
+        get_snapshot_key(tiker, lengths_key)
+        for tiker in ("LKOH", "LKOHP", "SBER")
+        for lengths_key in ("", custom)
+    ]
+    for key in keys:
+        store.save(key, "D", state)
+
+    # Состояния с длинами компаний удаляются вместе с состоянием по умолчанию
+    store.delete_tiker("LKOH")
+    assert [key for key in keys if store.load(key, "D")] == keys[2:]
+
+
+@patch("backend.app.utils.ta.ta_calculator.settings.ta_incremental_indicators", True)
+@patch("backend.app.utils.moex.moex_reader.MoexReader.get_company_history")
+def test_get_company_ta_decisions_incremental(
+    mock_get_company_history,
+    tmp_path,
+    sample_lkoh_dataframe,
+):
+    company = CompanyDTO(name="Лукойл", tiker="LKOH")
+    mock_get_company_history.return_value = sample_lkoh_dataframe.copy()
+    with patch(
+        "backend.app.utils.ta.ta_calculator.settings.ta_incremental_indicators",
+        False,
+    ):
+        expected = TACalculator().get_company_ta_decisions(company, "All")
+
+    store = IndicatorStateStore(tmp_path)
+    with patch(
+        "backend.app.utils.ta.ta_calculator.get_indicator_state_store",
+        return_value=store,
+    ):
+        for rows in (len(sample_lkoh_dataframe) - 10, len(sample_lkoh_dataframe)):
+            mock_get_company_history.return_value = sample_lkoh_dataframe.iloc[
+                :rows
+            ].copy()
+            result = TACalculator().get_company_ta_decisions(company, "All")
+
+        assert store.load("LKOH", "W") is not None
+        TACalculator().rebuild_incremental_indicators("LKOH")
+        assert store.load("LKOH", "W") is None
+
+    assert result.keys() == expected.keys()
+    for period, decision in expected.items():
+        assert result[period].decision == decision.decision
+        assert result[period].k == pytest.approx(decision.k, abs=TOLERANCE)
+        assert result[period].d == pytest.approx(decision.d, abs=TOLERANCE)
@@ -0,0 +1,176 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pandas_ta as ta  # noqa: F401
+import pytest
+
+from backend.app.schemas.company import TAParamsDTO
+from backend.app.utils.ta import ta_indicators
+from backend.app.utils.ta.ta_calculator import TACalculator
+from backend.app.utils.ta.ta_registry import compute_indicators, get_indicator
+from backend.app.utils.ta.ta_resampler import resample_ohlc
+
+
+@pytest.fixture
+def sample_lkoh_dataframe():
+    file_path = Path(__file__).parent.parent / "data/mocked_lkoh_history.csv"
+    df = pd.read_csv(file_path)
+    df["DATE"] = pd.to_datetime(df["DATE"])
+    df.set_index("DATE", inplace=True)
+    return df
+
+
+def get_period_df(df: pd.DataFrame, period: str) -> pd.DataFrame:
+    return df if period == "D" else resample_ohlc(df, period)
+
+
+@pytest.mark.parametrize("period", ["D", "W", "M"])
+def test_numpy_indicators_equal_pandas_ta(sample_lkoh_dataframe, period):
+    df = get_period_df(sample_lkoh_dataframe, period)
+    calculator = TACalculator()
+
+    expected = calculator._generate_pandas_ta_df(df.copy())
+    result = calculator._generate_numpy_ta_df(df)
+
+    pd.testing.assert_frame_equal(result, expected, check_exact=True)
+
+
+def test_numpy_indicators_do_not_modify_df(sample_lkoh_dataframe):
+    df = sample_lkoh_dataframe.copy()
+
+    TACalculator()._generate_numpy_ta_df(df)
+
+    pd.testing.assert_frame_equal(df, sample_lkoh_dataframe)
+
+
+def test_rolling_mean_equals_pandas():
+    rng = np.random.default_rng(9)
+    values = rng.standard_normal(500).cumsum()
+    values[100:103] = np.nan
+    values[200:210] = 5.0  # одинаковые значения подряд
+    values[300:310] = -np.abs(values[300:310])
+
+    for length in (1, 3, 14):
+        np.testing.assert_array_equal(
+            ta_indicators.rolling_mean(values, length),
+            pd.Series(values).rolling(length).mean().to_numpy(),
+        )
+
+
+def test_wilder_mean_equals_pandas():
+    rng = np.random.default_rng(14)
+    values = rng.random(500) * 100
+    values[:3] = np.nan
+    values[250:260] = np.nan
+
+    np.testing.assert_array_equal(
+        ta_indicators.wilder_mean(values, 14),
+        pd.Series(values).ewm(alpha=1 / 14, min_periods=14).mean().to_numpy(),
+    )
+
+
+def test_rolling_min_max_short_series():
+    values = np.arange(5, dtype=np.float64)
+
+    assert np.isnan(ta_indicators.rolling_min(values, 14)).all()
+    assert np.isnan(ta_indicators.rolling_max(values, 14)).all()
+
+
+def test_indicators_on_panel(sample_lkoh_dataframe):
+    # Несколько компаний в одном массиве (компания, время)
+    df = sample_lkoh_dataframe
+    high, low, close = (df[column].to_numpy() for column in ("HIGH", "LOW", "CLOSE"))
+    panel = [np.stack([values, values * 2]) for values in (high, low, close)]
+
+    panel_k, panel_d = ta_indicators.stoch(*panel)
+    panel_adx, _, _ = ta_indicators.adx(*panel)
+    stoch_k, stoch_d = ta_indicators.stoch(high * 2, low * 2, close * 2)
+    adx, _, _ = ta_indicators.adx(high, low, close)
+
+    np.testing.assert_array_equal(panel_k[1], stoch_k)
+    np.testing.assert_array_equal(panel_d[1], stoch_d)
+    np.testing.assert_array_equal(panel_adx[0], adx)
+
+
+@pytest.mark.parametrize("length", [1, 3, 14])
+def test_recurrences_on_panel_equal_pandas(length):
+    # Ряды с разными пропусками считаются за один проход по времени
+    rng = np.random.default_rng(length)
+    panel = rng.standard_normal((4, 300)).cumsum(axis=-1) + 100
+    panel[1, :40] = np.nan
+    panel[2, 100:110] = np.nan
+    panel[3] = np.nan
+
+    means = ta_indicators.rolling_mean(panel, length)
+    wilder = ta_indicators.wilder_mean(panel, length)
+    for row, values in enumerate(panel):
+        series = pd.Series(values)
+        np.testing.assert_array_equal(
+            means[row], series.rolling(length).mean().to_numpy()
+        )
+        np.testing.assert_array_equal(
+            wilder[row],
+            series.ewm(alpha=1 / length, min_periods=length).mean().to_numpy(),
+        )
+        np.testing.assert_array_equal(
+            ta_indicators.ema(panel, length)[row],
+            ta_indicators.ema(values, length),
+        )
+
+
+def test_ema_equals_pandas():
+    rng = np.random.default_rng(12)
+    values = rng.random(300) * 100
+    values[:5] = np.nan
+
+    series = pd.Series(values[5:])
+    expected = series.copy()
+    expected.iloc[:25] = np.nan
+    expected.iloc[25] = series.iloc[:26].mean()
+    expected = expected.ewm(span=26, adjust=False).mean()
+
+    np.testing.assert_allclose(
+        ta_indicators.ema(values, 26)[5:],
+        expected.to_numpy(),
+        rtol=1e-12,
+    )
+    assert np.isnan(ta_indicators.ema(values, 26)[:30]).all()
+
+
+def test_rsi_and_bbands_equal_pandas(sample_lkoh_dataframe):
+    close = sample_lkoh_dataframe.CLOSE
+    change = close.diff()
+    gain = change.clip(lower=0).ewm(alpha=1 / 14, min_periods=14).mean()
+    loss = (-change).clip(lower=0).ewm(alpha=1 / 14, min_periods=14).mean()
+
+    np.testing.assert_allclose(
+        ta_indicators.rsi(close.to_numpy(), 14),
+        (100 * gain / (gain + loss)).to_numpy(),
+        rtol=1e-12,
+    )
+
+    lower, mid, upper = ta_indicators.bbands(close.to_numpy(), 20, 2)
+    std = close.rolling(20).std(ddof=0)
+    np.testing.assert_array_equal(mid, close.rolling(20).mean().to_numpy())
+    np.testing.assert_allclose(upper - mid, 2 * std.to_numpy(), rtol=1e-9)
+    np.testing.assert_allclose(mid - lower, 2 * std.to_numpy(), rtol=1e-9)
+
+
+@pytest.mark.parametrize("name", ["stoch", "adx", "macd", "rsi", "bbands"])
+def test_registry_indicators_on_padded_panel(sample_lkoh_dataframe, name):
+    # Ряд короче дополнен слева NaN, как в IndicatorPanel
+    df = sample_lkoh_dataframe
+    prices = [df[column].to_numpy() for column in ("HIGH", "LOW", "CLOSE")]
+    padded = [
+        np.stack([values, np.concatenate([np.full(100, np.nan), values[100:]])])
+        for values in prices
+    ]
+    lengths = TAParamsDTO().indicator_lengths
+
+    panel = compute_indicators((name,), *padded, lengths, first=np.array([0, 100]))
+    single = compute_indicators((name,), *(values[100:] for values in prices), lengths)
+
+    assert tuple(panel) == get_indicator(name).columns
+    for column, values in single.items():
+        np.testing.assert_array_equal(panel[column][1, 100:], values)
@@ -0,0 +1,302 @@
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.app.schemas.company import CompanyDTO, CompanyStopDTO, TAParamsDTO
+from backend.app.schemas.enums import DecisionEnum, PeriodEnum
+from backend.app.schemas.ta import DecisionDTO
+from backend.app.services.ta_service import TAService
+from backend.app.utils.ta import ta_indicators
+from backend.app.utils.ta.ta_calculator import TACalculator
+from backend.app.utils.ta.ta_panel import (
+    REQUIRED_PERIODS,
+    IndicatorPanel,
+    IndicatorPanels,
+)
+
+
+@pytest.fixture
+def sample_lkoh_dataframe():
+    file_path = Path(__file__).parent.parent / "data/mocked_lkoh_history.csv"
+    df = pd.read_csv(file_path)
+    df["DATE"] = pd.to_datetime(df["DATE"])
+    df.set_index("DATE", inplace=True)
+    return df
+
+
+@pytest.fixture
+def histories(sample_lkoh_dataframe):
+    df = sample_lkoh_dataframe
+    with_gaps = df.drop(df.index[100:140]).copy()
+    with_gaps.iloc[::50, 0:4] = np.nan
+
+    # Разная длина, окончание и пропуски, чтобы получить разные решения
+    return {
+        f"T{end}": df.iloc[: len(df.index) - end] * (1 + end / 100)
+        for end in range(0, 400, 20)
+    } | {
+        "LKOH": df,
+        "GAPS": with_gaps,
+        "SHORT": df.iloc[-10:],
+        "EMPTY": pd.DataFrame(),
+    }
+
+
+def get_companies(histories: dict) -> list[CompanyDTO]:
+    companies = [CompanyDTO(name=tiker, tiker=tiker) for tiker in histories]
+    companies[1].stops = [
+        CompanyStopDTO(period=PeriodEnum.DAY, value=1_000_000),
+        CompanyStopDTO(period=PeriodEnum.MONTH, value=1),
+    ]
+    return companies
+
+
+def get_panel_decisions(
+    companies: list[CompanyDTO],
+    period: str,
+    histories: dict,
+) -> dict[str, dict[str, DecisionDTO]]:
+    """Решения в два этапа: снимки панелью, затем правила для всех компаний."""
+    calculator = TACalculator()
+    snapshots = calculator.get_indicator_snapshots(
+        histories,
+        REQUIRED_PERIODS[period],
+        companies,
+    )
+    return calculator.get_snapshot_ta_decisions(companies, period, snapshots)
+
+
+@pytest.mark.parametrize("period", ["D", "W", "M"])
+def test_panel_indicators_equal_single_company(histories, period):
+    calculator = TACalculator()
+
+    panel = IndicatorPanel.from_histories(histories, period)
+
+    for tiker, df in histories.items():
+        expected = (
+            calculator.generate_ta_indicators(df, period)
+            if not df.empty
+            else pd.DataFrame()
+        )
+        result = panel.to_frame(tiker)
+        if expected.empty:
+            assert result.empty
+            continue
+        np.testing.assert_array_equal(
+            result.index.to_numpy(),
+            expected.index.to_numpy(),
+        )
+        np.testing.assert_array_equal(result.to_numpy(), expected.to_numpy())
+
+
+@pytest.mark.parametrize("period", ["D", "W", "M", "All"])
+def test_panel_decisions_equal_single_company(histories, period):
+    calculator = TACalculator()
+    companies = get_companies(histories)
+
+    decisions = get_panel_decisions(companies, period, histories)
+
+    for company in companies:
+        expected = calculator.get_company_ta_decisions(
+            company,
+            period,
+            histories[company.tiker],
+        )
+        assert decisions[company.tiker] == expected
+
+
+def get_companies_with_params(histories: dict) -> list[CompanyDTO]:
+    params = [
+        TAParamsDTO(),
+        TAParamsDTO(bottom_border=40, top_border=70, buy_border=30),
+        TAParamsDTO(stoch_k=9, stoch_smooth_k=2, periods=[PeriodEnum.DAY]),
+        TAParamsDTO(stoch_k=9, stoch_smooth_k=2, adx_length=10, bottom_border=35),
+    ]
+    companies = get_companies(histories)
+    for index, company in enumerate(companies):
+        company.ta_params = params[index % len(params)]
+    return companies
+
+
+@pytest.mark.parametrize("period", ["D", "W", "M", "All"])
+def test_panel_decisions_with_company_params(histories, period):
+    calculator = TACalculator()
+    companies = get_companies_with_params(histories)
+
+    with patch.object(
+        IndicatorPanels,
+        "__init__",
+        side_effect=IndicatorPanels.__init__,
+        autospec=True,
+    ) as panels_init:
+        decisions = get_panel_decisions(companies, period, histories)
+
+    # Одна панель на каждую группу длин окон
+    assert panels_init.call_count == 3
+    for company in companies:
+        expected = calculator.get_company_ta_decisions(
+            company,
+            period,
+            histories[company.tiker],
+        )
+        assert decisions[company.tiker] == expected
+
+
+def test_indicator_snapshots_with_company_params(histories):
+    calculator = TACalculator()
+    histories.pop("EMPTY")
+    companies = get_companies_with_params(histories)
+
+    snapshots = calculator.get_indicator_snapshots(histories, ("W", "D"), companies)
+    with patch(
+        "backend.app.utils.ta.ta_calculator.settings.ta_panel_decisions",
+        False,
+    ):
+        expected = calculator.get_indicator_snapshots(
+            histories,
+            ("W", "D"),
+            companies,
+        )
+
+    assert snapshots == expected
+    assert set(snapshots) == {company.snapshot_key for company in companies}
+    assert snapshots["T40:k9d3s2a14"]["D"].indicators_key == "k9d3s2a14"
+
+
+def test_indicators_computed_only_when_needed(histories):
+    calculator = TACalculator()
+    companies = get_companies(histories)
+    for company in companies[:3]:
+        company.ta_params = TAParamsDTO(indicators=["macd", "rsi"])
+    for company in companies[3:]:
+        company.ta_params = TAParamsDTO(indicators=[])
+
+    with patch(
+        "backend.app.utils.ta.ta_registry.ta_indicators.adx",
+    ) as adx, patch(
+        "backend.app.utils.ta.ta_registry.ta_indicators.macd",
+        wraps=ta_indicators.macd,
+    ) as macd:
+        calculator.get_company_ta_decisions(
+            companies[0],
+            "All",
+            histories[companies[0].tiker],
+        )
+        assert macd.call_count == 0
+
+        snapshots = calculator.get_indicator_snapshots(histories, ("D",), companies)
+
+    # Правилам нужен только Stoch, MACD - только панели первых компаний
+    adx.assert_not_called()
+    assert macd.call_count == 1
+    snapshot = snapshots[companies[0].snapshot_key]["D"]
+    assert set(snapshot.values) == {"macd", "macd_h", "macd_s", "rsi"}
+    assert snapshot.adx is None
+    assert snapshots[companies[3].snapshot_key]["D"].values == {}
+
+    panel = IndicatorPanels({"LKOH": histories["LKOH"]})["D"]
+    np.testing.assert_array_equal(
+        panel.to_frame("LKOH", ("rsi",)).rsi.to_numpy(),
+        ta_indicators.rsi(histories["LKOH"].CLOSE.to_numpy()),
+    )
+    assert set(panel.indicators) == {"rsi"}
+
+
+def test_panel_decisions_cover_all_rules(histories):
+    decisions = get_panel_decisions(
+        get_companies(histories),
+        "All",
+        histories,
+    )
+
+    found = {
+        decision.decision
+        for company_decisions in decisions.values()
+        for decision in company_decisions.values()
+    }
+    assert found == set(DecisionEnum)
+
+
+def test_service_decisions_with_panel(histories):
+    histories.pop("EMPTY")
+    companies = get_companies(histories)
+    service = TAService()
+
+    with patch.object(TACalculator, "get_histories_data", return_value=histories):
+        with patch(
+            "backend.app.utils.ta.ta_calculator.settings.ta_panel_decisions",
+            False,
+        ):
+            expected = service.apply_user_decisions(
+                companies,
+                "All",
+                service.get_indicator_snapshots(companies, "All"),
+            )
+
+        decisions = service.apply_user_decisions(
+            companies,
+            "All",
+            service.get_indicator_snapshots(companies, "All"),
+        )
+
+    assert decisions == expected
+
+
+def test_panel_decisions_without_history():
+    histories = {"EMPTY": pd.DataFrame(), "OTHER": pd.DataFrame()}
+
+    decisions = get_panel_decisions(
+        get_companies(histories),
+        "All",
+        histories,
+    )
+
+    assert {
+        decision.decision
+        for company_decisions in decisions.values()
+        for decision in company_decisions.values()
+    } == {DecisionEnum.UNKNOWN}
+
+
+@pytest.fixture
+def intraday_histories():
+    """10-минутные свечи за две недели, с 10:00 до 18:50."""
+    dates = pd.bdate_range("2024-01-01", periods=10)
+    times = pd.timedelta_range("10:00:00", "18:50:00", freq="10min")
+    index = pd.DatetimeIndex([date + time for date in dates for time in times])
+    histories = {}
+    for seed in range(12):
+        rng = np.random.default_rng(seed)
+        close = 100 + rng.standard_normal(len(index)).cumsum()
+        histories[f"T{seed}"] = pd.DataFrame(
+            {
+                "OPEN": close + rng.standard_normal(len(index)) / 2,
+                "HIGH": close + 1,
+                "LOW": close - 1,
+                "CLOSE": close,
+            },
+            index=index,
+        ).iloc[: len(index) - seed * 20]
+    histories["SHORT"] = histories["T0"].iloc[-30:]
+    return histories
+
+
+@pytest.mark.parametrize("period", ["4h", "1h"])
+def test_panel_intraday_decisions_equal_single_company(intraday_histories, period):
+    calculator = TACalculator()
+    companies = get_companies(intraday_histories)
+
+    decisions = get_panel_decisions(companies, period, intraday_histories)
+
+    for company in companies:
+        expected = calculator.get_company_ta_decisions(
+            company,
+            period,
+            intraday_histories[company.tiker],
+        )
+        assert decisions[company.tiker] == expected
+        assert list(expected) == [period]
+    assert decisions["SHORT"][period].decision == DecisionEnum.UNKNOWN
@@ -0,0 +1,147 @@
+import logging
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from pandas import DataFrame
+
+from backend.app.utils.ta.ta_resampler import (
+    OHLC_AGGREGATION,
+    OHLC_COLUMNS,
+    resample_ohlc,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def legacy_resample_ohlc(df: DataFrame, period: str) -> DataFrame:
+    """Прежняя реализация с группировкой через python-функции."""
+    if period == "W":
+
+        def period_start(date):
+            return date - pd.DateOffset(days=date.weekday())
+
+    else:
+
+        def period_start(date):
+            return date.replace(day=1)
+
+    return df.groupby(period_start)[["OPEN", "CLOSE", "HIGH", "LOW"]].agg(
+        {"OPEN": "first", "CLOSE": "last", "HIGH": "max", "LOW": "min"},
+    )
+
+
+def generate_daily_history(rows: int) -> DataFrame:
+    rng = np.random.default_rng(rows)
+    close = 100 + rng.standard_normal(rows).cumsum()
+    days = pd.date_range("1700-01-01", periods=rows * 7 // 5 + 7, freq="D")
+    index = days[days.weekday < 5][:rows].rename("TRADEDATE")
+    df = DataFrame(
+        {
+            "OPEN": close + rng.standard_normal(rows),
+            "HIGH": close + 2,
+            "LOW": close - 2,
+            "CLOSE": close,
+            "VOLUME": rng.integers(0, 1000, rows),
+        },
+        index=index,
+    )
+    # Пропуски в данных
+    df.iloc[::17, 0:4] = np.nan
+    return df
+
+
+def generate_intraday_history(days: int) -> DataFrame:
+    """10-минутные свечи с 10:00 до 18:50 по рабочим дням."""
+    rng = np.random.default_rng(days)
+    dates = pd.bdate_range("2024-01-01", periods=days)
+    times = pd.timedelta_range("10:00:00", "18:50:00", freq="10min")
+    index = pd.DatetimeIndex(
+        [date + time for date in dates for time in times],
+        name="BEGIN",
+    )
+    close = 100 + rng.standard_normal(len(index)).cumsum()
+    df = DataFrame(
+        {
+            "OPEN": close + rng.standard_normal(len(index)),
+            "HIGH": close + 1,
+            "LOW": close - 1,
+            "CLOSE": close,
+            "VOLUME": rng.integers(0, 1000, len(index)),
+        },
+        index=index,
+    )
+    df.iloc[::23, 0:4] = np.nan
+    return df
+
+
+@pytest.fixture
+def sample_lkoh_dataframe():
+    file_path = Path(__file__).parent.parent / "data/mocked_lkoh_history.csv"
+    df = pd.read_csv(file_path)
+    df["DATE"] = pd.to_datetime(df["DATE"])
+    df.set_index("DATE", inplace=True)
+    return df
+
+
+@pytest.mark.parametrize("period", ["W", "M"])
+def test_resample_ohlc_equals_legacy(sample_lkoh_dataframe, period):
+    expected = legacy_resample_ohlc(sample_lkoh_dataframe, period)
+    result = resample_ohlc(sample_lkoh_dataframe, period)
+
+    pd.testing.assert_frame_equal(result, expected)
+
+
+@pytest.mark.parametrize("period", ["W", "M"])
+def test_resample_ohlc_equals_legacy_with_gaps(period):
+    df = generate_daily_history(1000)
+
+    pd.testing.assert_frame_equal(
+        resample_ohlc(df, period),
+        legacy_resample_ohlc(df, period),
+    )
+
+
+@pytest.mark.parametrize("period", ["1h", "4h"])
+def test_resample_ohlc_intraday(period):
+    df = generate_intraday_history(20)
+
+    result = resample_ohlc(df, period)
+
+    # Как resample по часовой сетке от полуночи, но без пустых интервалов
+    # между сессиями
+    expected = df.resample(period)[OHLC_COLUMNS].agg(OHLC_AGGREGATION)
+    expected = expected[expected.index.isin(result.index)]
+    pd.testing.assert_frame_equal(result, expected, check_freq=False)
+    assert result.index[0] == pd.Timestamp(
+        "2024-01-01 10:00" if period == "1h" else "2024-01-01 08:00"
+    )
+    assert len(result.index) == 20 * (9 if period == "1h" else 3)
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("rows", [1_000, 10_000, 100_000])
+@pytest.mark.parametrize("period", ["W", "M"])
+def test_resample_ohlc_benchmark(rows, period):
+    df = generate_daily_history(rows)
+
+    t0 = time.perf_counter()
+    expected = legacy_resample_ohlc(df, period)
+    legacy_time = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    result = resample_ohlc(df, period)
+    vectorized_time = time.perf_counter() - t0
+
+    logger.info(
+        "resample %s, %d rows: legacy %.4fs, vectorized %.4fs",
+        period,
+        rows,
+        legacy_time,
+        vectorized_time,
+    )
+    pd.testing.assert_frame_equal(result, expected)
+    if rows >= 10_000:
+        assert vectorized_time < legacy_time
@@ -0,0 +1,145 @@
+import pytest
+import redis
+
+from backend.app.schemas.enums import DecisionEnum, PeriodEnum, TAGenerateStageEnum
+from backend.app.schemas.ta import DecisionDTO, TAGenerateProgress
+from backend.app.utils.ta.ta_run import MAX_WAIT_SECONDS, TARunReader, TARunTracker
+from backend.tests.utils.fake_redis import FakeAsyncRedis, FakeRedis
+
+RUN_ID = "run-id"
+
+
+class BrokenRedis:
+    def pipeline(self, transaction=True):
+        raise redis.ConnectionError("Connection refused")
+
+    async def xread(self, streams, count=None, block=None):
+        raise redis.ConnectionError("Connection refused")
+
+
+def get_decision(tiker: str) -> DecisionDTO:
+    return DecisionDTO(
+        tiker=tiker,
+        decision=DecisionEnum.BUY,
+        period=PeriodEnum.DAY,
+        last_price=100.0,
+        k=10.0,
+        d=5.0,
+    )
+
+
+def start_run(tracker: TARunTracker):
+    tracker.start_run(
+        RUN_ID,
+        TAGenerateProgress(
+            stage=TAGenerateStageEnum.INDICATORS,
+            users=2,
+            tikers=3,
+            chunks=2,
+        ),
+    )
+
+
+def test_ta_run_progress():
+    client = FakeRedis()
+    tracker = TARunTracker(client, ttl=100)
+
+    assert tracker.get_run(RUN_ID) is None
+
+    start_run(tracker)
+    tracker.add_chunk(RUN_ID, tikers=2, computed=2, seconds=0.5)
+    tracker.add_chunk(RUN_ID, tikers=1, computed=0, seconds=0.25)
+    run = tracker.get_run(RUN_ID)
+    assert run.progress.stage == TAGenerateStageEnum.INDICATORS
+    assert run.progress.processed_chunks == 2
+    assert run.progress.processed_tikers == 3
+    assert run.progress.failed_tikers == 1
+    assert run.progress.indicators_seconds == 0.75
+    assert run.decisions == {}
+
+    tracker.start_decisions(RUN_ID)
+    tracker.add_user_decisions(RUN_ID, 1, [get_decision("SBER")], seconds=0.1)
+    # Частичный результат: решения первого пользователя уже доступны
+    run = tracker.get_run(RUN_ID)
+    assert run.progress.stage == TAGenerateStageEnum.DECISIONS
+    assert run.decisions == {1: [get_decision("SBER")]}
+
+    tracker.add_user_decisions(RUN_ID, 2, None, seconds=0.1)
+    tracker.finish_run(RUN_ID)
+    run = tracker.get_run(RUN_ID)
+    assert run.progress.stage == TAGenerateStageEnum.DONE
+    assert run.progress.processed_users == 2
+    assert run.progress.failed_users == 1
+    assert run.progress.decisions == 1
+    assert run.progress.started_at <= run.progress.finished_at
+    assert run.cursor == "7-0"
+    assert set(client.ttl.values()) == {100}
+
+
+@pytest.mark.anyio
+async def test_ta_run_wait():
+    client = FakeRedis()
+    tracker = TARunTracker(client)
+    reader = TARunReader(FakeAsyncRedis(client))
+
+    # Расчет еще не начат: ждем первое событие
+    assert await reader.wait_run(RUN_ID, timeout=5) is None
+    assert client.blocks == [5000]
+
+    start_run(tracker)
+    run = await reader.wait_run(RUN_ID)
+    assert run.progress.stage == TAGenerateStageEnum.INDICATORS
+    assert len(client.blocks) == 1
+
+    # Статус не менялся - ждем следующее событие не дольше MAX_WAIT_SECONDS
+    same = await reader.wait_run(RUN_ID, run.cursor, timeout=600)
+    assert same.cursor == run.cursor
+    assert client.blocks[-1] == MAX_WAIT_SECONDS * 1000
+
+    tracker.add_chunk(RUN_ID, tikers=1, computed=1, seconds=0.1)
+    next_run = await reader.wait_run(RUN_ID, run.cursor)
+    assert next_run.cursor != run.cursor
+    assert next_run.progress.processed_chunks == 1
+    assert len(client.blocks) == 2
+
+    # Завершенный расчет возвращается сразу
+    tracker.finish_run(RUN_ID)
+    done = await reader.wait_run(RUN_ID, next_run.cursor)
+    assert (await reader.wait_run(RUN_ID, done.cursor)).progress.stage == "DONE"
+    assert len(client.blocks) == 2
+
+
+@pytest.mark.anyio
+async def test_ta_run_decisions_offset():
+    client = FakeRedis()
+    tracker = TARunTracker(client)
+    reader = TARunReader(FakeAsyncRedis(client))
+    start_run(tracker)
+    tracker.add_user_decisions(RUN_ID, 1, [get_decision("SBER")], seconds=0.1)
+
+    run = await reader.get_run(RUN_ID)
+    assert run.decisions == {1: [get_decision("SBER")]}
+    assert run.offset == 1
+
+    # Следующий ответ содержит только решения, добавленные после offset
+    tracker.add_user_decisions(RUN_ID, 2, [get_decision("LKOH")], seconds=0.1)
+    next_run = await reader.wait_run(RUN_ID, run.cursor, offset=run.offset)
+    assert next_run.decisions == {2: [get_decision("LKOH")]}
+    assert next_run.offset == 2
+
+    tracker.finish_run(RUN_ID)
+    done = await reader.wait_run(RUN_ID, next_run.cursor, offset=next_run.offset)
+    assert done.decisions == {}
+    assert done.offset == 2
+
+
+@pytest.mark.anyio
+async def test_ta_run_unavailable():
+    tracker = TARunTracker(BrokenRedis())
+    reader = TARunReader(BrokenRedis())
+
+    start_run(tracker)
+    tracker.add_chunk(RUN_ID, tikers=1, computed=1, seconds=0.1)
+    assert tracker.get_run(RUN_ID) is None
+    assert await reader.get_run(RUN_ID) is None
+    assert await reader.wait_run(RUN_ID, timeout=1) is None
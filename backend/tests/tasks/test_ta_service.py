@@ -1,12 +1,15 @@
 from typing import Any
+from unittest.mock import patch
 
 import pytest
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from backend.app.db.dao.ta_decisions import TADecisionDAO
+from backend.app.db.dao.ta_params import TAParamsDAO
 from backend.app.services.ta_service import TAService
-from backend.app.schemas.company import CompanyDTO
+from backend.app.schemas.company import CompanyDTO, TAParamsDTO
 from backend.app.schemas.enums import DecisionEnum, PeriodEnum
-from backend.app.schemas.ta import DecisionDTO
+from backend.app.schemas.ta import DecisionDTO, TAFinalMessage
 from backend.tests.utils.common import (
     create_test_company,
     create_test_briefcase,
@@ -116,6 +119,10 @@ async def test_fill_send_start_generate_message(
 
     # для company1 добавляет акцию (share)
     await create_test_briefcase_share(dbsession, user_id=user.id, company=company1)
+    await TAParamsDAO(dbsession).save_params(
+        {"bottom_border": 40},
+        company_id=company1.id,
+    )
 
     ta_sync_service = TAService(dbsession)
     message = await ta_sync_service.fill_send_start_generate_message(
@@ -130,9 +137,83 @@ async def test_fill_send_start_generate_message(
     assert len(message.companies) == 2
     assert message.companies[0].has_shares
     assert not message.companies[1].has_shares
+    assert message.companies[0].ta_params == TAParamsDTO(bottom_border=40)
+    assert message.companies[1].ta_params == TAParamsDTO()
     assert not message.send_message
     assert not message.update_db
     assert not message.send_test_message
+    assert message.chat_id is None
+
+
+@patch("backend.app.services.ta_service.settings.chat_id", "chat")
+def test_build_digest() -> None:
+    def get_decisions(sber: DecisionEnum, price: float) -> list[DecisionDTO]:
+        return [
+            DecisionDTO(
+                decision=sber,
+                period=PeriodEnum.DAY,
+                tiker="SBER",
+                last_price=price,
+            ),
+            DecisionDTO(
+                decision=DecisionEnum.SELL,
+                period=PeriodEnum.WEEK,
+                tiker="LKOH",
+                last_price=price,
+            ),
+            DecisionDTO(
+                decision=DecisionEnum.RELAX,
+                period=PeriodEnum.MONTH,
+                tiker="TST",
+                last_price=price,
+            ),
+        ]
+
+    params = TAFinalMessage(
+        user_id=1,
+        send_message=True,
+        update_db=False,
+        send_test_message=False,
+    )
+    ta_service = TAService()
+    digest = ta_service.build_digest(get_decisions(DecisionEnum.BUY, 100), params)
+
+    # Группы всех периодов пользователя - одним сообщением в общий чат
+    assert digest.chat_id == "chat"
+    assert len(digest.messages) == 1
+    assert "SBER" in digest.messages[0] and "LKOH" in digest.messages[0]
+    assert "TST" not in digest.messages[0]
+
+    # Новые цены - не изменение, новое решение - изменение
+    assert (
+        ta_service.build_digest(
+            get_decisions(DecisionEnum.BUY, 110), params
+        ).fingerprint
+        == digest.fingerprint
+    )
+    assert (
+        ta_service.build_digest(
+            get_decisions(DecisionEnum.SELL, 100), params
+        ).fingerprint
+        != digest.fingerprint
+    )
+
+    user_chat = params.model_copy(update={"chat_id": "user-chat"})
+    assert ta_service.build_digest([], user_chat).chat_id == "user-chat"
+    assert not ta_service.build_digest([], user_chat).messages
+    test_params = params.model_copy(update={"send_test_message": True})
+    # Тестовая отправка не запоминается, пустая - не нужна
+    test_digest = ta_service.build_digest(
+        get_decisions(DecisionEnum.BUY, 100),
+        test_params,
+    )
+    assert test_digest.messages and not test_digest.fingerprint
+    assert ta_service.build_digest([], test_params) is None
+    with patch("backend.app.services.ta_service.settings.chat_id", ""):
+        assert (
+            ta_service.build_digest(get_decisions(DecisionEnum.BUY, 100), params)
+            is None
+        )
 
 
 @pytest.mark.anyio
@@ -144,3 +225,33 @@ async def test_generate_bulk_tg_messages_no_decisions() -> None:
     )
 
     assert len(messages) == 0
+
+
+@pytest.mark.anyio
+async def test_save_ta_decisions(
+    dbsession: AsyncSession,
+    user_token_headers: dict[str, Any],
+) -> None:
+    user, headers = user_token_headers.values()
+    company = await create_test_company(dbsession, user_id=user.id)
+
+    saved_count = await TAService(dbsession).save_ta_decisions(
+        user_id=user.id,
+        decisions=[
+            DecisionDTO(
+                decision=DecisionEnum.BUY,
+                period=PeriodEnum.WEEK,
+                tiker=company.tiker,
+                k=10.0,
+                d=5.0,
+            ),
+        ],
+    )
+
+    assert saved_count == 1
+    decisions = await TADecisionDAO(dbsession).get_ta_decision_models_by_company_id(
+        company.id,
+    )
+    assert len(decisions) == 1
+    assert decisions[0].decision == "BUY"
+    assert decisions[0].period == "W"
@@ -0,0 +1,80 @@
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.app.utils.ta.ta_backtest import Backtest
+from backend.app.utils.ta.ta_sweep import (
+    SweepGrid,
+    best_params,
+    rank_params,
+    run_sweep,
+)
+from backend.tests.tasks.test_ta_backtest import histories  # noqa: F401
+
+
+@pytest.fixture
+def grid():
+    return SweepGrid(
+        periods=("D", "W"),
+        bottom_border=(None, 40),
+        top_border=(70, 80),
+        stop_loss=(None, 0.1),
+        k=(9, 14),
+    )
+
+
+def test_run_sweep(histories, grid):  # noqa: F811
+    with patch(
+        "backend.app.utils.ta.ta_sweep.Backtest",
+        wraps=Backtest,
+    ) as backtest_mock:
+        results = run_sweep(histories, grid, max_workers=1, chunk_size=3)
+
+    # Индикаторы считаются один раз на каждую группу длин stoch
+    assert backtest_mock.call_count == 2
+    assert len(results.index) == grid.size * 4
+    assert set(results.tiker) == {"LKOH", "GAPS", "T20", "SHORT"}
+
+    row = results[
+        (results.k == 9)
+        & (results.period == "W")
+        & results.bottom_border.isna()
+        & (results.top_border == 70)
+        & (results.stop_loss == 0.1)
+    ].reset_index(drop=True)
+    expected = Backtest(histories, {"k": 9}).run(
+        "W",
+        top_border=70,
+        stop_loss=0.1,
+    )
+    pd.testing.assert_frame_equal(row[expected.columns], expected)
+
+
+def test_run_sweep_in_pool(histories, grid):  # noqa: F811
+    results = run_sweep(histories, grid, max_workers=2)
+
+    pd.testing.assert_frame_equal(
+        results,
+        run_sweep(histories, grid, max_workers=1),
+    )
+
+
+def test_rank_params(histories, grid):  # noqa: F811
+    results = run_sweep(histories, grid, max_workers=1)
+
+    assert len(rank_params(results, min_trades=0).index) == grid.size
+    ranked = rank_params(results)
+    assert (ranked.tikers > 0).all()
+    assert ranked.total_return.is_monotonic_decreasing
+
+    by_drawdown = rank_params(results, by="max_drawdown")
+    assert by_drawdown.max_drawdown.is_monotonic_increasing
+
+    best = best_params(results, min_trades=1)
+    assert list(best.tiker) == ["GAPS", "GAPS", "LKOH", "LKOH", "T20", "T20"]
+    for _, row in best.iterrows():
+        same = results[(results.tiker == row.tiker) & (results.period == row.period)]
+        assert row.total_return == same[same.trades >= 1].total_return.max()
+        assert not np.isnan(row.hit_rate)
@@ -1,26 +1,44 @@
+import datetime
+import json
+from collections import defaultdict
+from pathlib import Path
 from unittest.mock import patch
 
+import pandas as pd
 import pytest
-from sqlalchemy.ext.asyncio import AsyncSession
 
 from backend.app.db.dao.ta_decisions import TADecisionDAO
 from backend.app.schemas.company import CompanyDTO, CompanyStopDTO
-from backend.app.schemas.enums import PeriodEnum, DecisionEnum
+from backend.app.schemas.enums import PeriodEnum, DecisionEnum, TAGenerateStageEnum
 from backend.app.schemas.ta import (
     TAStartGenerateMessage,
+    TAStartUsersGenerateMessage,
+    TAGenerateProgress,
     TAFinalMessage,
-    TAGenerateMessage,
+    TAGenerateChunkMessage,
     DecisionDTO,
+    TADigest,
 )
 from backend.app.worker.tasks import (
+    _get_decisions_chunks,
+    _get_snapshot_tasks,
+    _get_tikers,
+    _start_stream,
     start_generate_task,
-    ta_generate_task,
-    ta_final_task,
-    send_telegram_task,
+    ta_user_decisions_task,
+    ta_users_decisions_task,
+    ta_history_cleanup_task,
+    ta_rebuild_indicators_task,
+    ta_stream_watchdog_task,
     update_db_task,
     # update_db_decisions,
 )
-from backend.tests.utils.common import create_test_user, create_test_company
+from backend.app.services.ta_service import TAService
+from backend.app.utils.ta.ta_calculator import TACalculator
+from backend.app.worker import codec, worker
+from backend.app.utils.ta.ta_aggregator import TADecisionAggregator
+from backend.app.utils.ta.ta_run import TARunTracker
+from backend.tests.utils.fake_redis import FakeRedis
 
 
 @pytest.mark.integrations
@@ -52,86 +70,155 @@ def test_start_generate_task(celery_local_app):
     assert result.status in ("PENDING", "SUCCESS")
 
 
-def test_ta_generate_task(celery_local_app):
-    tiker = "TST"
-    name = "Test"
-    period = PeriodEnum.DAY
-    payload_obj = TAGenerateMessage(
-        period=period,
-        company=CompanyDTO(name=name, tiker=tiker),
-    )
-    user_id = 1
-    payload_str = str(payload_obj.model_dump_json())
-    result = ta_generate_task.apply(
-        args=(
-            payload_str,
-            user_id,
+def read_history(file_name: str) -> pd.DataFrame:
+    df = pd.read_csv(Path(__file__).parent.parent / "data" / file_name)
+    df["DATE"] = pd.to_datetime(df["DATE"])
+    df.set_index("DATE", inplace=True)
+    return df
+
+
+def test_get_snapshot_tasks_dedupes_tikers():
+    companies = [
+        CompanyDTO(
+            name=f"Test{num}",
+            tiker=f"TST{num}",
+            has_shares=True,
+            stops=[CompanyStopDTO(period=PeriodEnum.DAY, value=100.0)],
         )
-    )
+        for num in range(5)
+    ]
 
-    assert result.successful()
-    decision = DecisionDTO.model_validate_json(result.result[0])
-    assert decision.tiker == tiker
-    assert decision.period == period
-    assert decision.decision == DecisionEnum.UNKNOWN
+    with patch("backend.app.worker.tasks.settings.ta_chunk_size", 2):
+        tasks = _get_snapshot_tasks(companies + companies[:3], PeriodEnum.ALL)
 
+    assert [task.task for task in tasks] == ["ta_snapshot_task"] * 3
+    chunks = [
+        TAGenerateChunkMessage.model_validate_json(task.args[0]) for task in tasks
+    ]
+    assert [company.tiker for chunk in chunks for company in chunk.companies] == [
+        f"TST{num}" for num in range(5)
+    ]
+    # Данные пользователя в первый этап не попадают
+    assert all(
+        not company.has_shares and company.stops is None
+        for chunk in chunks
+        for company in chunk.companies
+    )
 
-@pytest.mark.integrations
-@patch("backend.app.worker.tasks.send_sync_tg_message")
-def test_final_task(celery_app):
-    payload_obj = TAFinalMessage(
+
+@patch("backend.app.worker.tasks.settings.chat_id", "chat")
+@patch("backend.app.worker.tasks.update_db_task.delay")
+@patch("backend.app.worker.tasks.send_telegram_digests_task.delay")
+def test_two_stage_generation_same_as_single_company(
+    mock_send_telegram,
+    mock_update_db,
+    celery_app,
+):
+    histories = {
+        "LKOH": read_history("mocked_lkoh_history.csv"),
+        "TST": read_history("mocked_data.csv"),
+    }
+    companies = [
+        CompanyDTO(name="Лукойл", tiker="LKOH", has_shares=True),
+        CompanyDTO(
+            name="Test",
+            tiker="TST",
+            stops=[CompanyStopDTO(period=PeriodEnum.DAY, value=1000.0)],
+        ),
+        CompanyDTO(name="Broken", tiker="BRKN"),
+    ]
+    message = TAStartGenerateMessage(
         user_id=1,
+        period=PeriodEnum.ALL,
+        companies=companies,
+        update_db=True,
         send_message=True,
-        update_db=False,
         send_test_message=True,
     )
-    payload_str = str(payload_obj.model_dump_json())
-
-    decisions: list[DecisionDTO] = [
-        DecisionDTO(
-            tiker="TST",
-            decision=DecisionEnum.SELL,
-            period=PeriodEnum.DAY,
-            last_price=100.0,
-            k=50.0,
-            d=50.0,
-        )
+    service = TAService()
+    expected = [
+        dec.model_dump_json()
+        for company in companies
+        for dec in service._filter_sell_decisions(
+            company,
+            TACalculator().get_company_ta_decisions(
+                company,
+                PeriodEnum.ALL,
+                histories.get(company.tiker, pd.DataFrame()).copy(),
+            ),
+        ).values()
     ]
-    results_str = [[dec.model_dump_json() for dec in decisions]]
 
-    result = ta_final_task.apply(
-        args=(
-            results_str,
-            payload_str,
-        )
+    with patch(
+        "backend.app.utils.moex.moex_reader.MoexReader.get_companies_history",
+        return_value={tiker: df.copy() for tiker, df in histories.items()},
+    ), patch(
+        "backend.app.utils.moex.moex_reader.MoexReader.get_company_history",
+        return_value=pd.DataFrame(),
+    ):
+        with patch("backend.app.worker.tasks.settings.ta_chunk_size", 2):
+            snapshots = [
+                task.apply().result
+                for task in _get_snapshot_tasks(companies, PeriodEnum.ALL)
+            ]
+
+    result = ta_user_decisions_task.apply(
+        args=(snapshots, message.model_dump_json()),
     )
 
     assert result.successful()
+    assert len(result.result) == 9
+    assert result.result == expected
+    # Все сообщения расчета уходят одной задачей
+    mock_send_telegram.assert_called_once()
+    mock_update_db.assert_called_once()
 
 
+@patch("backend.app.worker.tasks.settings.ta_update_db_mode", "http")
 @patch("backend.app.worker.tasks.send_update_db_request")
-@pytest.mark.integrations
-@pytest.mark.anyio
-async def test_final_task_update_db(
+def test_update_db_task(
     mock_send_update_db_request,
     celery_app,
-    dbsession: AsyncSession,
 ):
     mock_send_update_db_request.return_value = ""
-    user = await create_test_user(dbsession)
-    company = await create_test_company(dbsession, user_id=user.id)
+    payload_str = '[{"tiker": "TST", "decision": "SELL", "last_price": 100.0, "k": 50.0, "d": 50.0, "period": "D"}]'
+    result = update_db_task.apply(
+        args=(
+            payload_str,
+            1,
+        )
+    )
+    assert result.successful()
+    mock_send_update_db_request.assert_called_once()
 
-    payload_obj = TAFinalMessage(
-        user_id=user.id,
-        send_message=False,
-        update_db=True,
-        send_test_message=False,
+
+@patch("backend.app.worker.tasks.settings.ta_update_db_mode", "db")
+@patch("backend.app.worker.tasks.send_update_db_request")
+@patch("backend.app.services.ta_service.TAService.save_ta_decisions")
+@patch("backend.app.worker.tasks.worker_session")
+def test_update_db_task_db_mode(
+    mock_worker_session,
+    mock_save_ta_decisions,
+    mock_send_update_db_request,
+    celery_app,
+):
+    mock_save_ta_decisions.return_value = 1
+    payload_str = '[{"tiker": "TST", "decision": "SELL", "last_price": 100.0, "k": 50.0, "d": 50.0, "period": "D"}]'
+    result = update_db_task.apply(
+        args=(
+            payload_str,
+            1,
+        )
     )
-    payload_str = str(payload_obj.model_dump_json())
 
-    decisions: list[DecisionDTO] = [
+    assert result.successful()
+    mock_worker_session.assert_called_once()
+    mock_send_update_db_request.assert_not_called()
+    decisions = mock_save_ta_decisions.call_args.kwargs["decisions"]
+    assert mock_save_ta_decisions.call_args.kwargs["user_id"] == 1
+    assert decisions == [
         DecisionDTO(
-            tiker=company.tiker,
+            tiker="TST",
             decision=DecisionEnum.SELL,
             period=PeriodEnum.DAY,
             last_price=100.0,
@@ -139,40 +226,543 @@ async def test_final_task_update_db(
             d=50.0,
         )
     ]
-    results_str = [[dec.model_dump_json() for dec in decisions]]
 
-    result = ta_final_task.apply(
-        args=(
-            results_str,
-            payload_str,
-        )
-    )
+
+@patch("backend.app.worker.tasks.settings.ta_decision_history_days", 30)
+@patch("backend.app.worker.tasks.TADecisionHistoryDAO.delete_before")
+@patch("backend.app.worker.tasks.worker_session")
+def test_ta_history_cleanup_task(
+    mock_worker_session,
+    mock_delete_before,
+    celery_app,
+):
+    mock_delete_before.return_value = 5
+    result = ta_history_cleanup_task.apply()
 
     assert result.successful()
+    assert result.result == 5
+    mock_worker_session.assert_called_once()
+    date = mock_delete_before.call_args.args[0]
+    assert (datetime.datetime.utcnow() - date).days == 30
+
+    with patch("backend.app.worker.tasks.settings.ta_decision_history_days", 0):
+        assert ta_history_cleanup_task.apply().result == 0
+    mock_delete_before.assert_called_once()
+
+
+def test_ta_history_cleanup_is_scheduled():
+    (schedule,) = [
+        entry["schedule"]
+        for entry in worker.celery_app.conf.beat_schedule.values()
+        if entry["task"] == ta_history_cleanup_task.name
+    ]
 
+    assert schedule.hour == {worker.settings.ta_history_cleanup_hour}
+
+
+@patch("backend.app.worker.tasks.TACalculator.rebuild_incremental_indicators")
+def test_ta_rebuild_indicators_task(mock_rebuild):
+    ta_rebuild_indicators_task(["LKOH", "SBER"])
+
+    assert [call.args for call in mock_rebuild.call_args_list] == [
+        ("LKOH",),
+        ("SBER",),
+    ]
 
-@patch("backend.app.worker.tasks.send_sync_tg_message")
-def test_send_telegram_task(
-    mock_send_sync_tg_message,
+
+@patch("backend.app.worker.tasks.settings.ta_changes_only", False)
+@patch("backend.app.worker.tasks.update_db_task.delay")
+@patch("backend.app.worker.tasks.send_telegram_digests_task.delay")
+def test_users_generation_same_as_user_generation(
+    mock_send_telegram,
+    mock_update_db,
     celery_app,
 ):
-    mock_send_sync_tg_message.return_value = ""
-    payload_str = "Test message"
-    result = send_telegram_task.apply(args=(payload_str,))
+    histories = {
+        "LKOH": read_history("mocked_lkoh_history.csv"),
+        "TST": read_history("mocked_data.csv"),
+    }
+    user_messages = [
+        TAStartGenerateMessage(
+            user_id=1,
+            period=PeriodEnum.ALL,
+            companies=[
+                CompanyDTO(name="Лукойл", tiker="LKOH", has_shares=True),
+                CompanyDTO(name="Test", tiker="TST"),
+            ],
+            update_db=True,
+        ),
+        TAStartGenerateMessage(
+            user_id=2,
+            period=PeriodEnum.ALL,
+            companies=[
+                CompanyDTO(
+                    name="Test",
+                    tiker="TST",
+                    stops=[CompanyStopDTO(period=PeriodEnum.DAY, value=1000.0)],
+                ),
+                CompanyDTO(name="Broken", tiker="BRKN"),
+            ],
+            update_db=True,
+        ),
+    ]
+    message = TAStartUsersGenerateMessage(
+        period=PeriodEnum.ALL,
+        messages=user_messages,
+    )
+
+    tracker = TARunTracker(FakeRedis())
+    tracker.start_run(
+        "run-id",
+        TAGenerateProgress(stage=TAGenerateStageEnum.INDICATORS, users=2, tikers=3),
+    )
+
+    with patch(
+        "backend.app.utils.moex.moex_reader.MoexReader.get_companies_history",
+        return_value={tiker: df.copy() for tiker, df in histories.items()},
+    ) as mock_get_companies_history, patch(
+        "backend.app.utils.moex.moex_reader.MoexReader.get_company_history",
+        return_value=pd.DataFrame(),
+    ), patch(
+        "backend.app.worker.tasks.get_ta_run_tracker",
+        return_value=tracker,
+    ):
+        snapshots = [
+            task.apply().result
+            for task in _get_snapshot_tasks(
+                _get_tikers(message),
+                PeriodEnum.ALL,
+                "run-id",
+            )
+        ]
+
+    # Общий тикер двух пользователей загружен один раз
+    loaded = [
+        tiker
+        for call in mock_get_companies_history.call_args_list
+        for tiker in call.kwargs["tikers"]
+    ]
+    assert sorted(loaded) == ["BRKN", "LKOH", "TST"]
+
+    expected = {}
+    for user_message in user_messages:
+        result = ta_user_decisions_task.apply(
+            args=(snapshots, user_message.model_dump_json()),
+        )
+        expected[user_message.user_id] = [
+            DecisionDTO.model_validate_json(dec).model_dump() for dec in result.result
+        ]
+    mock_update_db.reset_mock()
+
+    with patch(
+        "backend.app.worker.tasks.get_ta_run_tracker",
+        return_value=tracker,
+    ):
+        result = ta_users_decisions_task.apply(
+            args=(snapshots, message.model_dump_json(), "run-id"),
+        )
+
     assert result.successful()
+    assert result.result == 12
+    saved = {
+        call.args[1]: json.loads(call.args[0]) for call in mock_update_db.call_args_list
+    }
+    assert saved == expected
 
+    run = tracker.get_run("run-id")
+    assert run.progress.stage == TAGenerateStageEnum.DONE
+    assert run.progress.processed_tikers == 3
+    assert run.progress.failed_tikers == 1
+    assert run.progress.processed_users == 2
+    assert run.progress.decisions == 12
+    assert {
+        user_id: [dec.model_dump() for dec in decisions]
+        for user_id, decisions in run.decisions.items()
+    } == expected
 
-@patch("backend.app.worker.tasks.send_update_db_request")
-def test_update_db_task(
-    mock_send_update_db_request,
+
+def get_users_message() -> TAStartUsersGenerateMessage:
+    return TAStartUsersGenerateMessage(
+        period=PeriodEnum.ALL,
+        messages=[
+            TAStartGenerateMessage(
+                user_id=1,
+                period=PeriodEnum.ALL,
+                companies=[
+                    CompanyDTO(name="Лукойл", tiker="LKOH", has_shares=True),
+                    CompanyDTO(name="Test", tiker="TST"),
+                ],
+                update_db=True,
+                send_message=True,
+                send_test_message=True,
+                chat_id="user-chat",
+            ),
+            TAStartGenerateMessage(
+                user_id=2,
+                period=PeriodEnum.ALL,
+                companies=[
+                    CompanyDTO(name="Broken", tiker="BRKN"),
+                    CompanyDTO(
+                        name="Test",
+                        tiker="TST",
+                        stops=[CompanyStopDTO(period=PeriodEnum.DAY, value=1000.0)],
+                    ),
+                ],
+                update_db=True,
+                send_message=True,
+                send_test_message=True,
+            ),
+        ],
+    )
+
+
+def patch_saved_decisions(saved: dict[int, list[DecisionDTO]]):
+    """Сохраненные решения пользователей вместо БД воркера."""
+
+    async def load_decision_changes(users_decisions):
+        return {
+            user_id: TAService.diff_decisions(saved.get(user_id, []), decisions)
+            for user_id, decisions in users_decisions.items()
+        }
+
+    return patch(
+        "backend.app.worker.tasks._load_decision_changes",
+        new=load_decision_changes,
+    )
+
+
+def get_sent_digests(mock_send_telegram) -> list[TADigest]:
+    return [
+        digest
+        for call in mock_send_telegram.call_args_list
+        for digest in codec.loads_list(call.args[0], TADigest)
+    ]
+
+
+def get_digest_groups(digest: TADigest) -> list[str]:
+    return [
+        group.strip() for message in digest.messages for group in message.split("\n\n")
+    ]
+
+
+def test_get_decisions_chunks():
+    message = get_users_message()
+
+    with patch("backend.app.worker.tasks.settings.ta_chunk_size", 2):
+        chunks = _get_decisions_chunks(message)
+
+    assert [[c.tiker for c in chunk.companies] for chunk in chunks] == [
+        ["LKOH", "TST"],
+        ["BRKN"],
+    ]
+    assert [
+        {user.user_id: [c.tiker for c in user.companies] for user in chunk.users}
+        for chunk in chunks
+    ] == [{1: ["LKOH", "TST"], 2: ["TST"]}, {2: ["BRKN"]}]
+    # Стопы пользователя остаются только в его части пачки
+    assert chunks[0].users[1].companies[0].stops
+    assert all(not company.stops for company in chunks[0].companies)
+
+
+@patch("backend.app.worker.tasks.ta_stream_watchdog_task.apply_async")
+@patch("backend.app.worker.tasks.settings.chat_id", "chat")
+@patch("backend.app.worker.tasks.update_db_task.delay")
+@patch("backend.app.worker.tasks.send_telegram_digests_task.delay")
+def test_stream_generation_same_as_user_generation(
+    mock_send_telegram,
+    mock_update_db,
+    mock_watchdog,
     celery_app,
 ):
-    mock_send_update_db_request.return_value = ""
-    payload_str = '[{"tiker": "TST", "decision": "SELL", "last_price": 100.0, "k": 50.0, "d": 50.0, "period": "D"}]'
-    result = update_db_task.apply(
-        args=(
-            payload_str,
-            1,
-        )
+    histories = {
+        "LKOH": read_history("mocked_lkoh_history.csv"),
+        "TST": read_history("mocked_data.csv"),
+    }
+    message = get_users_message()
+    client = FakeRedis()
+    tracker = TARunTracker(client)
+    aggregator = TADecisionAggregator(client)
+
+    with patch(
+        "backend.app.utils.moex.moex_reader.MoexReader.get_companies_history",
+        side_effect=lambda tikers, **kwargs: {
+            tiker: histories[tiker].copy() for tiker in tikers if tiker in histories
+        },
+    ), patch(
+        "backend.app.utils.moex.moex_reader.MoexReader.get_company_history",
+        return_value=pd.DataFrame(),
+    ):
+        snapshots = [
+            task.apply().result
+            for task in _get_snapshot_tasks(_get_tikers(message), PeriodEnum.ALL)
+        ]
+        expected_db = {}
+        expected_digests = []
+        for user_message in message.messages:
+            ta_user_decisions_task.apply(
+                args=(snapshots, user_message.model_dump_json()),
+            )
+            expected_db[user_message.user_id] = json.loads(
+                mock_update_db.call_args.args[0],
+            )
+            expected_digests.extend(get_sent_digests(mock_send_telegram))
+            mock_send_telegram.reset_mock()
+        mock_update_db.reset_mock()
+
+        with patch(
+            "backend.app.worker.tasks.get_ta_aggregator",
+            return_value=aggregator,
+        ), patch(
+            "backend.app.worker.tasks.get_ta_run_tracker",
+            return_value=tracker,
+        ), patch(
+            "backend.app.worker.tasks.group",
+        ) as mock_group, patch(
+            "backend.app.worker.tasks.settings.ta_chunk_size",
+            2,
+        ):
+            assert _start_stream("run-id", message)
+            tasks = list(mock_group.call_args.args[0])
+            mock_group.return_value.delay.assert_called_once()
+            mock_watchdog.assert_called_once_with(
+                ("run-id",),
+                countdown=60 * 60,
+            )
+
+            # Сообщения отправляются после последней пачки
+            tasks[0].apply()
+            mock_send_telegram.assert_not_called()
+            tasks[1].apply()
+
+    # Решения сохраняются пачками по мере готовности
+    assert mock_update_db.call_count == 3
+    saved = defaultdict(list)
+    for call in mock_update_db.call_args_list:
+        saved[call.args[1]].extend(json.loads(call.args[0]))
+    assert {
+        user_id: sorted(decisions, key=lambda dec: (dec["tiker"], dec["period"]))
+        for user_id, decisions in saved.items()
+    } == {
+        user_id: sorted(decisions, key=lambda dec: (dec["tiker"], dec["period"]))
+        for user_id, decisions in expected_db.items()
+    }
+    # Дайджесты всех пользователей уходят одной задачей, каждый в свой чат
+    mock_send_telegram.assert_called_once()
+    digests = get_sent_digests(mock_send_telegram)
+    # Порядок групп в дайджесте зависит от порядка пачек
+    assert {
+        (digest.user_id, digest.chat_id): sorted(get_digest_groups(digest))
+        for digest in digests
+    } == {
+        (digest.user_id, digest.chat_id): sorted(get_digest_groups(digest))
+        for digest in expected_digests
+    }
+    assert [digest.chat_id for digest in expected_digests] == ["user-chat", "chat"]
+
+    run = tracker.get_run("run-id")
+    assert run.progress.stage == TAGenerateStageEnum.DONE
+    assert run.progress.processed_chunks == 2
+    assert run.progress.processed_users == 2
+    assert run.progress.decisions == 12
+    # Данные сборщика удалены после отправки
+    assert not any(key.startswith("ta:aggregate") for key in client.lists)
+    assert not any(key.startswith("ta:aggregate") for key in client.hashes)
+
+
+@patch("backend.app.worker.tasks.ta_stream_watchdog_task.apply_async")
+@patch("backend.app.worker.tasks.update_db_task.delay")
+@patch("backend.app.worker.tasks.send_telegram_digests_task.delay")
+def test_chunk_decisions_task_finishes_run_on_error(
+    mock_send_telegram,
+    mock_update_db,
+    mock_watchdog,
+    celery_app,
+):
+    message = get_users_message()
+    client = FakeRedis()
+    tracker = TARunTracker(client)
+    aggregator = TADecisionAggregator(client)
+
+    with patch(
+        "backend.app.worker.tasks.get_ta_aggregator",
+        return_value=aggregator,
+    ), patch(
+        "backend.app.worker.tasks.get_ta_run_tracker",
+        return_value=tracker,
+    ), patch(
+        "backend.app.worker.tasks.group",
+    ) as mock_group, patch.object(
+        TAService,
+        "get_indicator_snapshots",
+        side_effect=RuntimeError("ISS is unavailable"),
+    ):
+        assert _start_stream("run-id", message)
+        (task,) = mock_group.call_args.args[0]
+        result = task.apply()
+
+    assert result.failed()
+    mock_update_db.assert_not_called()
+    mock_send_telegram.assert_not_called()
+    assert tracker.get_run("run-id").progress.stage == TAGenerateStageEnum.DONE
+
+
+@patch("backend.app.worker.tasks.send_telegram_digests_task.delay")
+def test_stream_watchdog_finishes_stuck_run(mock_send_telegram, celery_app):
+    client = FakeRedis()
+    tracker = TARunTracker(client)
+    aggregator = TADecisionAggregator(client)
+    decision = DecisionDTO(tiker="LKOH", decision=DecisionEnum.BUY, period="D")
+    tracker.start_run(
+        "run-id",
+        TAGenerateProgress(stage=TAGenerateStageEnum.INDICATORS, users=1, tikers=2),
     )
-    assert result.successful()
+    aggregator.start(
+        "run-id",
+        [
+            TAFinalMessage(
+                user_id=1,
+                send_message=True,
+                update_db=True,
+                send_test_message=False,
+                chat_id="chat",
+            ),
+        ],
+        chunks=2,
+    )
+    # Первая пачка обработана, задача второй погибла без finally
+    aggregator.add_decisions("run-id", 1, [decision])
+    assert not aggregator.finish_chunk("run-id")
+
+    with patch(
+        "backend.app.worker.tasks.get_ta_aggregator",
+        return_value=aggregator,
+    ), patch(
+        "backend.app.worker.tasks.get_ta_run_tracker",
+        return_value=tracker,
+    ):
+        ta_stream_watchdog_task.apply(args=("run-id",))
+        ta_stream_watchdog_task.apply(args=("run-id",))
+
+    # Сообщения по собранным решениям отправлены один раз
+    (digest,) = get_sent_digests(mock_send_telegram)
+    assert digest.chat_id == "chat"
+    assert "LKOH" in digest.messages[0]
+    assert tracker.get_run("run-id").progress.stage == TAGenerateStageEnum.DONE
+    # Запоздавшая последняя пачка расчет повторно не завершает
+    assert aggregator.finish_chunk("run-id")
+    assert not aggregator.claim_finish("run-id")
+
+
+@patch("backend.app.worker.tasks.ta_stream_watchdog_task.apply_async")
+@patch("backend.app.worker.tasks.settings.chat_id", "chat")
+@patch("backend.app.worker.tasks.update_db_task.delay")
+@patch("backend.app.worker.tasks.send_telegram_digests_task.delay")
+def test_generation_sends_only_changes(
+    mock_send_telegram,
+    mock_update_db,
+    mock_watchdog,
+    celery_app,
+):
+    histories = {
+        "LKOH": read_history("mocked_lkoh_history.csv"),
+        "TST": read_history("mocked_data.csv"),
+    }
+    message = get_users_message()
+    message.messages = [
+        user_message.model_copy(update={"send_test_message": False})
+        for user_message in message.messages
+    ]
+
+    def get_sent():
+        rows = defaultdict(list)
+        for call in mock_update_db.call_args_list:
+            rows[call.args[1]].extend(codec.loads_list(call.args[0], DecisionDTO))
+        rows = {
+            user_id: sorted(decisions, key=lambda dec: (dec.tiker, dec.period))
+            for user_id, decisions in rows.items()
+        }
+        digests = {
+            digest.user_id: digest for digest in get_sent_digests(mock_send_telegram)
+        }
+        mock_update_db.reset_mock()
+        mock_send_telegram.reset_mock()
+        return rows, digests
+
+    with patch(
+        "backend.app.utils.moex.moex_reader.MoexReader.get_companies_history",
+        side_effect=lambda tikers, **kwargs: {
+            tiker: histories[tiker].copy() for tiker in tikers if tiker in histories
+        },
+    ), patch(
+        "backend.app.utils.moex.moex_reader.MoexReader.get_company_history",
+        return_value=pd.DataFrame(),
+    ):
+        snapshots = [
+            task.apply().result
+            for task in _get_snapshot_tasks(_get_tikers(message), PeriodEnum.ALL)
+        ]
+        # Сохраненных решений нет - записываются все
+        with patch_saved_decisions({}):
+            ta_users_decisions_task.apply(args=(snapshots, codec.dumps(message)))
+        decisions, _ = get_sent()
+        assert sum(map(len, decisions.values())) == 12
+
+        # У первого пользователя изменилось одно решение, у второго - ничего
+        changed = next(
+            dec
+            for dec in decisions[1]
+            if dec.decision in {DecisionEnum.BUY, DecisionEnum.SELL}
+        )
+        saved = {
+            1: [
+                (
+                    dec.model_copy(update={"decision": DecisionEnum.RELAX})
+                    if dec == changed
+                    else dec
+                )
+                for dec in decisions[1]
+            ],
+            2: decisions[2],
+        }
+
+        tracker = TARunTracker(FakeRedis())
+        tracker.start_run(
+            "run-id",
+            TAGenerateProgress(stage=TAGenerateStageEnum.INDICATORS, users=2, tikers=3),
+        )
+        with patch_saved_decisions(saved), patch(
+            "backend.app.worker.tasks.get_ta_run_tracker",
+            return_value=tracker,
+        ):
+            ta_users_decisions_task.apply(
+                args=(snapshots, codec.dumps(message), "run-id"),
+            )
+        rows, digests = get_sent()
+        # Записываются все решения, в сообщения попадают только изменившиеся
+        assert rows == decisions
+        assert changed.tiker in digests[1].messages[0]
+        assert len(digests[1].messages[0].strip().splitlines()) == 2
+        # Пустой дайджест не отправляется, но запоминается
+        assert not digests[2].messages
+        progress = tracker.get_run("run-id").progress
+        assert progress.decisions == 12
+        assert progress.unchanged_decisions == 11
+
+        # Расчет пачками записывает и отправляет то же самое
+        client = FakeRedis()
+        with patch_saved_decisions(saved), patch(
+            "backend.app.worker.tasks.get_ta_aggregator",
+            return_value=TADecisionAggregator(client),
+        ), patch(
+            "backend.app.worker.tasks.get_ta_run_tracker",
+            return_value=TARunTracker(client),
+        ), patch(
+            "backend.app.worker.tasks.group",
+        ) as mock_group, patch(
+            "backend.app.worker.tasks.settings.ta_chunk_size",
+            2,
+        ):
+            assert _start_stream("run-id", message)
+            for task in mock_group.call_args.args[0]:
+                task.apply()
+        assert get_sent() == (rows, digests)
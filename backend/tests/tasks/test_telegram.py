@@ -0,0 +1,207 @@
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from backend.app.schemas.ta import TADigest
+from backend.app.utils.telegram.telegram_digest import TelegramDigestStore
+from backend.app.utils.telegram.telegramm_client import (
+    MAX_MESSAGE_LENGTH,
+    TelegramSender,
+    TokenBucket,
+    pack_messages,
+    split_message,
+)
+from backend.app.worker import codec
+from backend.app.worker.tasks import send_telegram_digests_task
+from backend.tests.utils.fake_redis import FakeRedis
+from backend.tests.utils.telegram_stub import TelegramStub
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def get_sender(stub: TelegramStub, sleeps: list, **kwargs) -> TelegramSender:
+    return TelegramSender(
+        "TOKEN",
+        api_url=stub.url,
+        timeout=5,
+        sleep=sleeps.append,
+        **kwargs,
+    )
+
+
+def test_token_bucket():
+    clock = FakeClock()
+    bucket = TokenBucket(2, capacity=2, clock=clock, sleep=clock.sleep)
+
+    # Запас на всплеск, дальше не чаще rate в секунду
+    assert [bucket.acquire() for _ in range(4)] == [0, 0, 0.5, 0.5]
+    assert clock.now == 1
+
+    clock.now += 10
+    assert [bucket.acquire() for _ in range(3)] == [0, 0, 0.5]
+
+
+def test_split_message():
+    lines = [f"line {num}\n" for num in range(10)]
+
+    assert split_message("".join(lines), limit=len(lines[0]) * 3) == [
+        "".join(lines[:3]),
+        "".join(lines[3:6]),
+        "".join(lines[6:9]),
+        lines[9],
+    ]
+    # Строка длиннее лимита делится без учета строк
+    assert split_message("a" * 10, limit=4) == ["aaaa", "aaaa", "aa"]
+    assert split_message("") == []
+
+
+def test_pack_messages():
+    messages = ["first\n", "second\n", "", "a" * (MAX_MESSAGE_LENGTH - 5)]
+
+    assert pack_messages(messages) == [
+        "first\n\nsecond\n",
+        "a" * (MAX_MESSAGE_LENGTH - 5),
+    ]
+    assert all(len(part) <= 10 for part in pack_messages(messages, limit=10))
+    assert (
+        pack_messages(["x" * MAX_MESSAGE_LENGTH] * 2) == ["x" * MAX_MESSAGE_LENGTH] * 2
+    )
+
+
+def test_sender_uses_pool_and_rate_limit():
+    sleeps = []
+    messages = [f"Акции - Покупать ({num})!\n" + "x" * 3000 for num in range(3)]
+
+    with TelegramStub() as stub:
+        sender = get_sender(stub, sleeps, chat_rate=1000)
+        assert sender.send_messages(messages, "chat") == 3
+        assert sender.send_chats({"first": ["one", "two"], "second": ["three"]}) == (
+            2,
+            [],
+        )
+        sender.close()
+
+    assert [msg["text"] for msg in stub.messages[:3]] == messages
+    assert {msg["chat_id"] for msg in stub.messages} == {"chat", "first", "second"}
+    assert sorted(msg["text"] for msg in stub.messages[3:]) == ["one\ntwo", "three"]
+    # Сообщения одного чата идут через одно соединение
+    assert len(set(stub.clients[:3])) == 1
+    assert not sleeps
+
+
+def test_sender_retries_rate_limited():
+    sleeps = []
+
+    with TelegramStub(rate_limited=2, retry_after=3) as stub:
+        sender = get_sender(stub, sleeps, chat_rate=1000, retries=2)
+        sender.send_message("message", "chat")
+        sender.close()
+
+    assert sleeps == [3, 3]
+    assert [msg["text"] for msg in stub.messages] == ["message"]
+
+
+def test_sender_gives_up_after_retries():
+    sleeps = []
+
+    with TelegramStub(rate_limited=5) as stub:
+        sender = get_sender(stub, sleeps, chat_rate=1000, retries=1)
+        with pytest.raises(httpx.HTTPStatusError):
+            sender.send_message("message", "chat")
+        sender.close()
+
+    assert len(stub.clients) == 2
+    assert not stub.messages
+
+
+def test_sender_reports_failed_chats():
+    with TelegramStub(blocked_chats=("blocked",)) as stub:
+        sender = get_sender(stub, [], chat_rate=1000)
+        sent, failed = sender.send_chats(
+            {"first": ["one"], "blocked": ["two"], "second": ["three"]},
+        )
+        sender.close()
+
+    # Ошибка в одном чате не мешает остальным
+    assert (sent, failed) == (2, ["blocked"])
+    assert sorted(msg["chat_id"] for msg in stub.messages) == ["first", "second"]
+
+
+def test_send_telegram_digests_task_failed_chat(celery_app):
+    store = TelegramDigestStore(FakeRedis(), ttl=100)
+    digests = [
+        TADigest(user_id=1, chat_id="first", messages=["one"], fingerprint="a"),
+        TADigest(user_id=2, chat_id="blocked", messages=["two"], fingerprint="b"),
+    ]
+
+    def send(blocked_chats=()):
+        with TelegramStub(blocked_chats=blocked_chats) as stub, patch(
+            "backend.app.worker.tasks.get_telegram_sender",
+            return_value=get_sender(stub, [], chat_rate=1000),
+        ), patch(
+            "backend.app.worker.tasks.get_telegram_digests",
+            return_value=store,
+        ):
+            result = send_telegram_digests_task.apply(
+                args=(codec.dumps_list(digests, TADigest),),
+            )
+        return result.result, [msg["chat_id"] for msg in stub.messages]
+
+    assert send(blocked_chats=("blocked",)) == (["blocked"], ["first"])
+    # Доставленный дайджест не повторяется, недоставленный уходит снова
+    assert send() == ([], ["blocked"])
+    assert send() == ([], [])
+
+
+def test_send_telegram_digests_task(celery_app):
+    client = FakeRedis()
+    store = TelegramDigestStore(client, ttl=100)
+    digests = [
+        TADigest(user_id=1, chat_id="first", messages=["one"], fingerprint="a"),
+        TADigest(user_id=2, chat_id="first", messages=["two"], fingerprint="b"),
+        TADigest(user_id=3, chat_id="second", messages=["three"], fingerprint="c"),
+    ]
+
+    def send(digests):
+        with TelegramStub() as stub, patch(
+            "backend.app.worker.tasks.get_telegram_sender",
+            return_value=get_sender(stub, [], chat_rate=1000),
+        ), patch(
+            "backend.app.worker.tasks.get_telegram_digests",
+            return_value=store,
+        ):
+            result = send_telegram_digests_task.apply(
+                args=(codec.dumps_list(digests, TADigest),),
+            )
+        assert result.successful()
+        return sorted((msg["chat_id"], msg["text"]) for msg in stub.messages)
+
+    # Дайджесты одного чата склеиваются в одно сообщение
+    assert send(digests) == [("first", "one\ntwo"), ("second", "three")]
+    assert set(client.ttl.values()) == {100}
+
+    # Ничего не изменилось - ничего не отправляется
+    assert send(digests) == []
+
+    # Изменился один пользователь; пустой дайджест только запоминается
+    digests[0] = digests[0].model_copy(update={"fingerprint": "new"})
+    digests[1] = digests[1].model_copy(update={"messages": [], "fingerprint": "empty"})
+    assert send(digests) == [("first", "one")]
+    digests[1] = digests[1].model_copy(update={"messages": ["two"], "fingerprint": "b"})
+    assert send(digests) == [("first", "two")]
+
+    # Тестовая отправка (без отпечатка) не проверяется
+    test_digest = TADigest(user_id=4, chat_id="second", messages=["test"])
+    assert send([test_digest]) == send([test_digest]) == [("second", "test")]
@@ -1,8 +1,12 @@
 import uuid
 from typing import Any
+from unittest.mock import patch
 
 import pytest
 from backend.app.db.dao.companies import CompanyDAO
+from backend.app.db.dao.ta_params import TAParamsDAO
+from backend.app.schemas.company import TAParamsDTO
+from backend.app.schemas.enums import PeriodEnum
 from backend.tests.utils.common import create_test_company
 from fastapi import FastAPI
 from httpx import AsyncClient
@@ -122,3 +126,50 @@ async def test_updating(
     assert updated_company.name == company.name
     assert len(updated_company.stops) == 2
     assert len(updated_company.strategies) == 1
+
+
+@pytest.mark.anyio
+async def test_update_company_ta_params(
+    fastapi_app: FastAPI,
+    client: AsyncClient,
+    dbsession: AsyncSession,
+    user_token_headers: dict[str, Any],
+) -> None:
+    user, headers = user_token_headers.values()
+    company = await create_test_company(dbsession, user_id=user.id)
+
+    url = fastapi_app.url_path_for("update_company_ta_params", company_id=company.id)
+    with patch(
+        "backend.app.api.company.views.settings.ta_incremental_indicators",
+        True,
+    ), patch(
+        "backend.app.api.company.views.ta_rebuild_indicators_task.delay",
+    ) as rebuild_delay:
+        response = await client.put(
+            url,
+            json={"bottom_border": 40, "stoch_k": 9, "periods": ["W", "D"]},
+            headers=headers,
+        )
+
+    assert response.status_code == status.HTTP_200_OK
+    rebuild_delay.assert_called_once_with([company.tiker])
+    params = await TAParamsDAO(dbsession).get_companies_params([company.id])
+    assert params[company.id] == TAParamsDTO(
+        bottom_border=40,
+        stoch_k=9,
+        periods=[PeriodEnum.WEEK, PeriodEnum.DAY],
+    )
+
+    # Длины окон не изменились - состояния индикаторов не сбрасываются
+    with patch(
+        "backend.app.api.company.views.settings.ta_incremental_indicators",
+        True,
+    ), patch(
+        "backend.app.api.company.views.ta_rebuild_indicators_task.delay",
+    ) as rebuild_delay:
+        await client.put(url, json={"stoch_k": 9, "top_border": 70}, headers=headers)
+
+    rebuild_delay.assert_not_called()
+
+    response = await client.put(url, json={"indicators": ["unknown"]}, headers=headers)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -1,10 +1,16 @@
 from typing import Any
+from unittest.mock import Mock, patch
 
 import pytest
 
 from backend.app.db.dao.ta_decisions import TADecisionDAO
 from backend.app.schemas.enums import PeriodEnum
-from backend.tests.utils.common import create_test_company, create_test_briefcase
+from backend.app.schemas.ta import TAStartUsersGenerateMessage
+from backend.tests.utils.common import (
+    create_test_company,
+    create_test_briefcase,
+    create_test_user,
+)
 from fastapi import FastAPI
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -36,6 +42,61 @@ async def test_internal_start_generate_ta_decisions(
     assert response.json()["id"]
 
 
+@pytest.mark.anyio
+async def test_internal_cleanup_ta_history(
+    fastapi_app: FastAPI,
+    client: AsyncClient,
+) -> None:
+    url = fastapi_app.url_path_for("internal_cleanup_ta_history")
+    with patch(
+        "backend.app.api.internal.views.ta_history_cleanup_task.delay",
+    ) as mock_delay:
+        mock_delay.return_value.id = "task-id"
+        mock_delay.return_value.status = "PENDING"
+        response = await client.post(url)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"id": "task-id", "status": "PENDING"}
+    mock_delay.assert_called_once_with()
+
+
+@pytest.mark.anyio
+async def test_internal_get_decision_changes(
+    fastapi_app: FastAPI,
+    client: AsyncClient,
+    dbsession: AsyncSession,
+    user_token_headers: dict[str, Any],
+) -> None:
+    user, headers = user_token_headers.values()
+    company1 = await create_test_company(dbsession, user_id=user.id)
+    company2 = await create_test_company(dbsession, user_id=user.id)
+    ta_dao = TADecisionDAO(dbsession)
+    await ta_dao.update_or_create_ta_decision_model(company1, "D", "BUY")
+    await ta_dao.update_or_create_ta_decision_model(company2, "D", "RELAX")
+    await dbsession.flush()
+
+    url = fastapi_app.url_path_for("internal_get_decision_changes")
+    response = await client.post(
+        url,
+        json={
+            str(user.id): [
+                {"tiker": company1.tiker, "period": "D", "decision": "BUY"},
+                {"tiker": company2.tiker, "period": "D", "decision": "SELL"},
+                {"tiker": company2.tiker, "period": "W", "decision": "BUY"},
+            ],
+        },
+    )
+    assert response.status_code == status.HTTP_200_OK
+
+    changes = response.json()[str(user.id)]
+    assert [(dec["period"], dec["decision"]) for dec in changes["changed"]] == [
+        ("D", "SELL"),
+        ("W", "BUY"),
+    ]
+    assert changes["unchanged"] == 1
+    assert changes["transitions"] == {"RELAX->SELL": 1, "NONE->BUY": 1}
+
+
 @pytest.mark.anyio
 async def test_internal_update_db_decisions(
     fastapi_app: FastAPI,
@@ -73,3 +134,42 @@ async def test_internal_update_db_decisions(
     assert decisions[0].period == PeriodEnum.DAY
     assert decisions[0].company_id == company.id
     assert decisions[0].company.tiker == company.tiker
+
+
+@pytest.mark.anyio
+async def test_internal_start_users_generate_ta_decisions(
+    fastapi_app: FastAPI,
+    client: AsyncClient,
+    dbsession: AsyncSession,
+) -> None:
+    user = await create_test_user(dbsession)
+    company = await create_test_company(dbsession, need_add_stop=True, user_id=user.id)
+    await create_test_briefcase(dbsession, user_id=user.id)
+    # Пользователь без портфеля пропускается
+    no_briefcase_user = await create_test_user(dbsession)
+    inactive_user = await create_test_user(dbsession, is_active=False)
+    await create_test_briefcase(dbsession, user_id=inactive_user.id)
+
+    url = fastapi_app.url_path_for("internal_start_users_generate_ta_decisions")
+    with patch(
+        "backend.app.api.internal.views.start_users_generate_task.delay",
+        return_value=Mock(id="task-id", status="PENDING"),
+    ) as mock_delay:
+        response = await client.post(
+            url,
+            params={
+                "user_ids": [user.id, no_briefcase_user.id, inactive_user.id],
+                "period": "D",
+            },
+        )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"id": "task-id", "status": "PENDING"}
+
+    message = TAStartUsersGenerateMessage.model_validate_json(
+        mock_delay.call_args.args[0],
+    )
+    assert message.period == PeriodEnum.DAY
+    assert [user_message.user_id for user_message in message.messages] == [user.id]
+    assert message.messages[0].send_message and message.messages[0].update_db
+    assert [c.tiker for c in message.messages[0].companies] == [company.tiker]
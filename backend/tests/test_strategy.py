@@ -1,12 +1,15 @@
 import uuid
 from typing import Any
+from unittest.mock import patch
 
 import pytest
 from backend.app.db.dao.companies import CompanyDAO
 from backend.app.db.dao.strategies import StrategiesDAO
-from backend.tests.utils.common import get_user_token_headers
+from backend.app.db.models.company import TAParamsModel
+from backend.tests.utils.common import create_test_company, get_user_token_headers
 from fastapi import FastAPI
 from httpx import AsyncClient
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
@@ -349,3 +352,66 @@ async def test_check_permissions_delete_strategy_model(
     deleted_strategy = await strategy_dao.get_strategy_model(strategy.id)
 
     assert deleted_strategy == strategy
+
+
+@pytest.mark.anyio
+async def test_update_strategy_ta_params(
+    fastapi_app: FastAPI,
+    client: AsyncClient,
+    dbsession: AsyncSession,
+    user_token_headers: dict[str, Any],
+) -> None:
+    user, headers = user_token_headers.values()
+    strategies_dao = StrategiesDAO(dbsession)
+    strategy = await strategies_dao.create_strategy_model(
+        name=uuid.uuid4().hex,
+        description="TA params",
+        user_id=user.id,
+    )
+    await dbsession.flush()
+
+    url = fastapi_app.url_path_for("update_strategy_ta_params", strategy_id=strategy.id)
+    response = await client.put(
+        url,
+        json={"top_border": 70, "indicators": ["macd"]},
+        headers=headers,
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    raw_params = await dbsession.execute(
+        select(TAParamsModel).where(TAParamsModel.strategy_id == strategy.id),
+    )
+    model = raw_params.scalars().one()
+    assert model.top_border == 70
+    assert model.indicators == "macd"
+    assert model.bottom_border is None
+
+
+@pytest.mark.anyio
+async def test_update_strategy_ta_params_rebuilds_indicators(
+    fastapi_app: FastAPI,
+    client: AsyncClient,
+    dbsession: AsyncSession,
+    user_token_headers: dict[str, Any],
+) -> None:
+    user, headers = user_token_headers.values()
+    company = await create_test_company(
+        dbsession,
+        need_add_strategy=True,
+        user_id=user.id,
+    )
+    strategy = company.strategies[0]
+    strategy.user_id = user.id
+    await dbsession.flush()
+
+    url = fastapi_app.url_path_for("update_strategy_ta_params", strategy_id=strategy.id)
+    with patch(
+        "backend.app.api.strategy.views.settings.ta_incremental_indicators",
+        True,
+    ), patch(
+        "backend.app.api.strategy.views.ta_rebuild_indicators_task.delay",
+    ) as rebuild_delay:
+        response = await client.put(url, json={"adx_length": 21}, headers=headers)
+
+    assert response.status_code == status.HTTP_200_OK
+    rebuild_delay.assert_called_once_with([company.tiker])
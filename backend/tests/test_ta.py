@@ -1,9 +1,14 @@
 from typing import Any
+from unittest.mock import Mock, patch
 
 import pytest
 
 from backend.app.db.dao.ta_decisions import TADecisionDAO
+from backend.app.schemas.enums import TAGenerateStageEnum
+from backend.app.schemas.ta import DecisionDTO, TAGenerateProgress
+from backend.app.utils.ta.ta_run import TARunReader, TARunTracker
 from backend.tests.utils.common import create_test_company, create_test_briefcase
+from backend.tests.utils.fake_redis import FakeAsyncRedis, FakeRedis
 from fastapi import FastAPI
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -115,3 +120,82 @@ async def test_get_ts_decisions(
     assert body["d"] == 0.2
     assert body["period"] == "D"
     assert body["last_price"] is None
+
+
+@pytest.fixture
+def run_tracker() -> TARunTracker:
+    tracker = TARunTracker(FakeRedis())
+    tracker.start_run(
+        "run-id",
+        TAGenerateProgress(stage=TAGenerateStageEnum.INDICATORS, users=1, tikers=10),
+    )
+    return tracker
+
+
+@pytest.mark.anyio
+async def test_get_task_status_progress(
+    fastapi_app: FastAPI,
+    client: AsyncClient,
+    run_tracker: TARunTracker,
+) -> None:
+    run_tracker.add_chunk("run-id", tikers=5, computed=4, seconds=1.5)
+
+    url = fastapi_app.url_path_for("get_task_status", task_id="run-id")
+    with patch(
+        "backend.app.api.ta.views.start_generate_task.AsyncResult",
+        return_value=Mock(id="run-id", status="SUCCESS", result=None),
+    ), patch(
+        "backend.app.api.ta.views.get_ta_run_tracker",
+        return_value=run_tracker,
+    ):
+        response = await client.get(url)
+
+    assert response.status_code == status.HTTP_200_OK
+    body = response.json()
+    assert body["status"] == "SUCCESS"
+    assert body["progress"]["stage"] == "INDICATORS"
+    assert body["progress"]["processed_tikers"] == 5
+    assert body["progress"]["failed_tikers"] == 1
+    assert body["progress"]["indicators_seconds"] == 1.5
+
+
+@pytest.mark.anyio
+async def test_get_run_status(
+    fastapi_app: FastAPI,
+    client: AsyncClient,
+    run_tracker: TARunTracker,
+) -> None:
+    url = fastapi_app.url_path_for("get_run_status", run_id="run-id")
+    with patch(
+        "backend.app.api.ta.views.get_ta_run_reader",
+        return_value=TARunReader(FakeAsyncRedis(run_tracker.client)),
+    ):
+        response = await client.get(url)
+        cursor = response.json()["cursor"]
+        offset = response.json()["offset"]
+
+        run_tracker.start_decisions("run-id")
+        run_tracker.add_user_decisions(
+            "run-id",
+            1,
+            [DecisionDTO(tiker="SBER", decision="BUY", period="D")],
+            seconds=0.1,
+        )
+        # Ждем изменения после cursor и получаем частичные решения
+        response = await client.get(
+            url,
+            params={"cursor": cursor, "offset": offset, "timeout": 5},
+        )
+
+        missing = await client.get(
+            fastapi_app.url_path_for("get_run_status", run_id="missing"),
+            params={"timeout": 1},
+        )
+
+    assert response.status_code == status.HTTP_200_OK
+    body = response.json()
+    assert body["cursor"] != cursor
+    assert body["progress"]["stage"] == "DECISIONS"
+    assert body["decisions"]["1"][0]["tiker"] == "SBER"
+    assert body["offset"] == offset + 1
+    assert missing.status_code == status.HTTP_404_NOT_FOUND
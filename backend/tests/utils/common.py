@@ -158,6 +158,7 @@ async def create_test_user(
     password: str = None,
     is_superuser: bool = False,
     is_active: bool = True,
+    telegram_chat_id: str = None,
 ) -> UserModel:
     name = name if name else random_lower_string()
     email = email if email else random_email()
@@ -165,7 +166,14 @@ async def create_test_user(
 
     dao = UserDAO(dbsession)
 
-    await dao.create_user_model(name, email, password, is_superuser, is_active)
+    await dao.create_user_model(
+        name,
+        email,
+        password,
+        is_superuser,
+        is_active,
+        telegram_chat_id,
+    )
     user = await dao.get_user_by_name(name)
 
     assert user
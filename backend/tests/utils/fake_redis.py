@@ -0,0 +1,134 @@
+from collections import defaultdict
+
+
+class FakeRedis:
+    """Redis в памяти для хранилищ TA и Telegram (decode_responses)."""
+
+    def __init__(self):
+        self.values = {}
+        self.hashes = defaultdict(dict)
+        self.lists = defaultdict(list)
+        self.streams = defaultdict(list)
+        self.ttl = {}
+        self.blocks = []
+        self.sequence = 0
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def set(self, key, value, ex=None, nx=False):  # noqa: WPS125
+        if nx and key in self.values:
+            return None
+        self.values[key] = str(value)
+        self.ttl[key] = ex
+        return True
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def mget(self, keys):
+        return [self.values.get(key) for key in keys]
+
+    def decr(self, key):
+        value = int(self.values.get(key, 0)) - 1
+        self.values[key] = str(value)
+        return value
+
+    def delete(self, *keys):
+        for storage in (self.values, self.hashes, self.lists, self.streams):
+            for key in keys:
+                storage.pop(key, None)
+        return len(keys)
+
+    def hset(self, key, field=None, value=None, mapping=None):
+        items = dict(mapping or {})
+        if field is not None:
+            items[field] = value
+        self.hashes[key].update({name: str(item) for name, item in items.items()})
+        return len(items)
+
+    def hincrby(self, key, field, amount=1):
+        value = int(self.hashes[key].get(field, 0)) + amount
+        self.hashes[key][field] = str(value)
+        return value
+
+    def hincrbyfloat(self, key, field, amount=1.0):
+        value = float(self.hashes[key].get(field, 0)) + amount
+        self.hashes[key][field] = str(value)
+        return value
+
+    def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    def rpush(self, key, *values):
+        self.lists[key].extend(values)
+        return len(self.lists[key])
+
+    def lrange(self, key, start, end):
+        values = self.lists.get(key, [])
+        return values[start:] if end == -1 else values[start : end + 1]
+
+    def xadd(self, key, fields, maxlen=None):
+        self.sequence += 1
+        entry_id = f"{self.sequence}-0"
+        self.streams[key].append((entry_id, dict(fields)))
+        if maxlen:
+            self.streams[key] = self.streams[key][-maxlen:]
+        return entry_id
+
+    def xrevrange(self, key, count=None):
+        return list(reversed(self.streams.get(key, [])))[:count]
+
+    def xread(self, streams, count=None, block=None):
+        # Не блокирует: запоминает ожидание и возвращает события новее курсора
+        self.blocks.append(block)
+        result = []
+        for key, cursor in streams.items():
+            last = int(cursor.split("-")[0])
+            entries = [
+                entry
+                for entry in self.streams.get(key, [])
+                if int(entry[0].split("-")[0]) > last
+            ]
+            if entries:
+                result.append([key, entries[:count]])
+        return result
+
+    def expire(self, key, ttl):
+        self.ttl[key] = ttl
+        return True
+
+
+class FakePipeline:
+    def __init__(self, client: FakeRedis):
+        self.client = client
+        self.commands = []
+
+    def __getattr__(self, name):
+        def command(*args, **kwargs):
+            self.commands.append((getattr(self.client, name), args, kwargs))
+            return self
+
+        return command
+
+    def execute(self):
+        commands, self.commands = self.commands, []
+        return [method(*args, **kwargs) for method, args, kwargs in commands]
+
+
+class FakeAsyncRedis:
+    """Интерфейс redis.asyncio к данным FakeRedis."""
+
+    def __init__(self, client: FakeRedis):
+        self.client = client
+
+    def pipeline(self, transaction=True):
+        return FakeAsyncPipeline(self.client)
+
+    async def xread(self, streams, count=None, block=None):
+        return self.client.xread(streams, count=count, block=block)
+
+
+class FakeAsyncPipeline(FakePipeline):
+    async def execute(self):
+        return super().execute()
@@ -0,0 +1,88 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class TelegramStub:
+    """
+    Локальный сервер Bot API для тестов.
+
+    Запоминает отправленные сообщения и адрес клиента каждого запроса;
+    первые rate_limited запросов получают 429 с retry_after, сообщения в
+    blocked_chats - 403, как чат, заблокировавший бота.
+    """
+
+    def __init__(
+        self,
+        rate_limited: int = 0,
+        retry_after: int = 0,
+        blocked_chats: tuple[str, ...] = (),
+    ):
+        self.messages: list[dict] = []
+        self.clients: list[tuple] = []
+        self.rate_limited = rate_limited
+        self.retry_after = retry_after
+        self.blocked_chats = set(blocked_chats)
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._get_handler())
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "TelegramStub":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _get_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive: переиспользование соединений видно по адресу клиента
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):  # noqa: N802
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                stub.clients.append(self.client_address)
+                if stub.rate_limited > 0:
+                    stub.rate_limited -= 1
+                    self._reply(
+                        429,
+                        {
+                            "ok": False,
+                            "error_code": 429,
+                            "parameters": {"retry_after": stub.retry_after},
+                        },
+                    )
+                    return
+                message = json.loads(body)
+                if message["chat_id"] in stub.blocked_chats:
+                    self._reply(
+                        403,
+                        {
+                            "ok": False,
+                            "error_code": 403,
+                            "description": "Forbidden: bot was blocked by the user",
+                        },
+                    )
+                    return
+                stub.messages.append(message)
+                self._reply(200, {"ok": True, "result": {}})
+
+            def log_message(self, *args):
+                """Без вывода запросов в лог тестов."""
+
+            def _reply(self, status: int, data: dict):
+                payload = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler